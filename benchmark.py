@@ -0,0 +1,218 @@
+# -------------------------------------------------------------------
+# benchmark.py
+# -------------------------------------------------------------------
+# Benchmarks offline contra o fake_maps.py (nada acessa o Google):
+#   - scanner: palavras-chave/hora de run_scanner
+#   - filtro: perfis/hora de run_filter (e perfis/hora por GB de RAM do
+#     navegador, comparando as quantidades de abas de --abas)
+#   - excel: linhas/segundo do PlanilhaSink com 1k, 10k e 100k linhas
+#
+# Uso: python benchmark.py [--so scanner,filtro,excel] [--latencia-ms 150]
+#      [--resultados 60] [--containers 8] [--keywords 5] [--saida bench.json]
+#      [--perfil completo|leve|leve_com_imagens] [--workers-filtro 4]
+#      [--abas 1,2,4] [--abas-scanner 3]
+# Toda mudança de performance deve ser comparada com esta linha de base.
+# -------------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger("benchmark")
+
+
+def _apontar_para(url, dados_dir):
+    """
+    Direciona scanner/filterer/licença para o servidor falso. Precisa
+    acontecer antes de importar esses módulos (lêem o ambiente no import).
+    """
+    os.environ["MAPS_BASE_URL"] = f"{url}/maps"
+    os.environ["PAINEL_URL"] = f"{url}/command"
+    os.environ["IP_URL"] = f"{url}/ip"
+    os.environ["LICENCA_CACHE"] = os.path.join(dados_dir, "licenca.json")
+
+
+def _consumo(pagina, entrada):
+    """
+    Consumo médio por página e, para perfis enxutos, a economia em relação
+    ao "completo" (rode uma vez com --perfil completo para ter a base).
+    """
+    import metrics
+    from lean_profile import perfil_para, economia
+    perfil = perfil_para(entrada)
+    return {
+        "perfil": perfil,
+        "requisicoes_por_pagina": metrics.REQUISICOES_PAGINA.media(pagina=pagina),
+        "bytes_por_pagina": metrics.BYTES_PAGINA.media(pagina=pagina),
+        "economia_vs_completo": economia(pagina, perfil) if perfil != "completo" else None,
+    }
+
+
+def _pico_rss_mb(**filtro):
+    import metrics
+    pico = metrics.PICO_RSS_NAVEGADOR.maximo(**filtro)
+    return round(pico / 1024 / 1024, 1) if pico else None
+
+
+def bench_scanner(dados_dir, keywords, abas=None):
+    from scanner import run_scanner
+
+    inicio = time.monotonic()
+    run_scanner(keywords, dados_dir, abas=abas)
+    duracao = time.monotonic() - inicio
+    with open(os.path.join(dados_dir, "links.txt"), "r", encoding="utf-8") as f:
+        links = sum(1 for l in f if l.strip())
+    return {
+        "keywords": len(keywords),
+        "links": links,
+        "segundos": round(duracao, 2),
+        "keywords_por_hora": round(len(keywords) * 3600 / duracao, 1),
+        "links_por_hora": round(links * 3600 / duracao, 1),
+        "abas": abas or 1,
+        "pico_rss_mb": _pico_rss_mb(),
+        **_consumo("busca", "scanner"),
+    }
+
+
+def bench_filtro(dados_dir, workers=None, abas=None):
+    import metrics
+    from filterer import run_filter
+
+    antes = metrics.PERFIS_PROCESSADOS.total()
+    salvos_antes = metrics.PERFIS_PROCESSADOS.total(estado="concluido")
+    inicio = time.monotonic()
+    run_filter(dados_dir, retomar=False, workers=workers, abas=abas)
+    duracao = time.monotonic() - inicio
+    perfis = metrics.PERFIS_PROCESSADOS.total() - antes
+    perfis_por_hora = round(perfis * 3600 / duracao, 1)
+    # Pico do navegador do filtro serial (o pipeline mede em outros processos)
+    pico_rss_mb = _pico_rss_mb(supervisor="filtro") if (workers or 1) == 1 else None
+    return {
+        "perfis": perfis,
+        "salvos": metrics.PERFIS_PROCESSADOS.total(estado="concluido") - salvos_antes,
+        "segundos": round(duracao, 2),
+        "perfis_por_hora": perfis_por_hora,
+        "workers": workers or 1,
+        "abas": abas or 1,
+        "pico_rss_mb": pico_rss_mb,
+        "perfis_por_hora_por_gb": (
+            round(perfis_por_hora * 1024 / pico_rss_mb, 1) if pico_rss_mb else None
+        ),
+        **_consumo("perfil", "filtro"),
+    }
+
+
+def bench_filtro_abas(dados_dir, workers, abas):
+    """
+    Roda bench_filtro para cada quantidade de `abas`, cada uma em uma cópia
+    da pasta de dados (o índice marca os lugares já processados), e compara
+    perfis/hora por GB com a primeira.
+    """
+    resultados = []
+    for n in abas:
+        pasta = os.path.join(dados_dir, f"abas_{n}")
+        os.makedirs(pasta, exist_ok=True)
+        shutil.copy(os.path.join(dados_dir, "links.txt"), pasta)
+        r = bench_filtro(pasta, workers, n)
+        base = resultados[0]["perfis_por_hora_por_gb"] if resultados else None
+        if base and r["perfis_por_hora_por_gb"]:
+            r["ganho_por_gb"] = round(r["perfis_por_hora_por_gb"] / base, 2)
+        resultados.append(r)
+        logger.info(f"📊 filtro ({n} abas): {r}")
+    return resultados
+
+
+def bench_excel(dados_dir, linhas):
+    from excel_sink import PlanilhaSink
+
+    caminho = os.path.join(dados_dir, f"bench_{linhas}.xlsx")
+    inicio = time.monotonic()
+    with PlanilhaSink(caminho, tamanho_lote=500) as sink:
+        for i in range(linhas):
+            sink.adicionar({
+                "nome": f"Lugar {i}",
+                "telefone": f"(73) 9{i:08d}",
+                "estrelas": "4,5",
+                "avaliacoes": f"{i % 900} avaliações",
+                "endereco": f"Rua {i % 500}, Centro",
+                "nicho": "Dentista, Clínica",
+                "data_atualizacao": "Atualizado pelo proprietário - jan. de 2024",
+                "link": f"https://www.google.com/maps/place/data=!1s0x0:0x{i:x}",
+            })
+    duracao = time.monotonic() - inicio
+    return {
+        "linhas": linhas,
+        "segundos": round(duracao, 2),
+        "linhas_por_segundo": round(linhas / duracao, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline do scanner/filterer.")
+    parser.add_argument("--so", default="scanner,filtro,excel")
+    parser.add_argument("--latencia-ms", type=int, default=150)
+    parser.add_argument("--resultados", type=int, default=60)
+    parser.add_argument("--containers", type=int, default=8)
+    parser.add_argument("--keywords", type=int, default=5)
+    parser.add_argument("--linhas", default="1000,10000,100000")
+    parser.add_argument("--saida")
+    parser.add_argument("--workers-filtro", type=int, help="processos do filtro (filter_pipeline.py)")
+    parser.add_argument("--perfil", help="perfil de navegador (ver lean_profile.py)")
+    parser.add_argument("--abas", default="1", help="abas do filtro, ex.: 1,2,4 (ver multitab.py)")
+    parser.add_argument("--abas-scanner", type=int, help="abas por navegador no scanner")
+    args = parser.parse_args()
+    if args.perfil:
+        os.environ["PERFIL_NAVEGADOR"] = args.perfil
+    etapas = set(args.so.split(","))
+
+    dados_dir = tempfile.mkdtemp(prefix="bench_maps_")
+    resultados = {"config": vars(args)}
+    try:
+        if etapas & {"scanner", "filtro"}:
+            from fake_maps import ServidorFake
+            with ServidorFake(
+                latencia_ms=args.latencia_ms, resultados=args.resultados,
+                containers=args.containers
+            ) as servidor:
+                _apontar_para(servidor.url, dados_dir)
+                keywords = [f"dentista {i}" for i in range(args.keywords)]
+                resultados["scanner"] = bench_scanner(dados_dir, keywords, args.abas_scanner)
+                logger.info(f"📊 scanner: {resultados['scanner']}")
+                if "filtro" in etapas:
+                    abas = [int(n) for n in args.abas.split(",")]
+                    if len(abas) == 1:
+                        resultados["filtro"] = bench_filtro(dados_dir, args.workers_filtro, abas[0])
+                        logger.info(f"📊 filtro: {resultados['filtro']}")
+                    else:
+                        resultados["filtro_abas"] = bench_filtro_abas(
+                            dados_dir, args.workers_filtro, abas)
+                        resultados["filtro"] = resultados["filtro_abas"][0]
+
+        if "excel" in etapas:
+            resultados["excel"] = []
+            for linhas in (int(n) for n in args.linhas.split(",")):
+                r = bench_excel(dados_dir, linhas)
+                resultados["excel"].append(r)
+                logger.info(f"📊 excel: {r}")
+    finally:
+        shutil.rmtree(dados_dir, ignore_errors=True)
+
+    saida = json.dumps(resultados, ensure_ascii=False, indent=2)
+    print(saida)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(saida)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+# -------------------------------------------------------------------
+# browser_pool.py
+# -------------------------------------------------------------------
+# Pool reutilizável de instâncias headless do Firefox, compartilhado
+# por scanner.py e main.py para processar várias palavras-chave ao
+# mesmo tempo.
+# -------------------------------------------------------------------
+
+import os
+import time
+import functools
+import queue
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from selenium import webdriver
+from selenium.webdriver.firefox.service import Service
+from selenium.webdriver.firefox.options import Options
+from webdriver_manager.firefox import GeckoDriverManager
+import metrics
+from lean_profile import aplicar_perfil
+from instrumented_driver import instrumentar
+from supervisor import Supervisor, CAIU
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# Tamanho padrão do pool (vai buscar em variável de ambiente)
+# -------------------------------------------------------------
+POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "2"))
+
+# Caminho do geckodriver: fixo via GECKODRIVER_PATH ou resolvido uma vez
+# pelo webdriver-manager e lembrado em arquivo por GECKODRIVER_CACHE_TTL.
+GECKODRIVER_PATH = os.environ.get("GECKODRIVER_PATH")
+GECKODRIVER_CACHE = os.path.join(tempfile.gettempdir(), "automacao_maps_geckodriver.txt")
+GECKODRIVER_CACHE_TTL = float(os.environ.get("GECKODRIVER_CACHE_TTL", "86400"))
+
+_geckodriver_lock = threading.Lock()
+_geckodriver = None
+
+
+def caminho_geckodriver():
+    """
+    Resolve o binário do geckodriver uma única vez por processo (e reaproveita
+    o último caminho resolvido entre execuções), evitando a consulta de versão
+    que GeckoDriverManager().install() faz a cada chamada.
+    """
+    global _geckodriver
+    with _geckodriver_lock:
+        if _geckodriver:
+            return _geckodriver
+        if GECKODRIVER_PATH:
+            _geckodriver = GECKODRIVER_PATH
+            return _geckodriver
+        try:
+            if time.time() - os.path.getmtime(GECKODRIVER_CACHE) < GECKODRIVER_CACHE_TTL:
+                with open(GECKODRIVER_CACHE, "r", encoding="utf-8") as f:
+                    caminho = f.read().strip()
+                if caminho and os.path.exists(caminho):
+                    _geckodriver = caminho
+                    return _geckodriver
+        except OSError:
+            pass
+        _geckodriver = GeckoDriverManager().install()
+        try:
+            with open(GECKODRIVER_CACHE, "w", encoding="utf-8") as f:
+                f.write(_geckodriver)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o cache do geckodriver: {e}")
+        return _geckodriver
+
+
+def criar_driver(perfil="completo"):
+    """
+    Cria uma instância headless do Firefox com as mesmas opções usadas
+    antes em scanner.py, filterer.py e main.py, mais as regras de bloqueio
+    do `perfil` (ver lean_profile.py). Com TRACE_DRIVER, os comandos do
+    driver são gravados (ver instrumented_driver.py).
+    """
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    # Abas em segundo plano (multitab.py) carregam sem timers estrangulados
+    options.set_preference("dom.min_background_timeout_value", 4)
+    options.set_preference("dom.timeout.enable_budget_timer_throttling", False)
+    aplicar_perfil(options, perfil)
+    service = Service(caminho_geckodriver())
+    with metrics.INICIO_DRIVER.cronometrar(perfil=perfil):
+        driver = webdriver.Firefox(service=service, options=options)
+    driver.perfil_navegador = perfil
+    return instrumentar(driver)
+
+
+def resetar_sessao(driver, url_inicial=None):
+    """
+    Limpa o estado deixado por um job sem reiniciar o navegador: fecha abas
+    extras, limpa sessionStorage e volta para a página inicial.
+    """
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+    driver.execute_script("try { window.sessionStorage.clear(); } catch (e) {}")
+    if url_inicial:
+        driver.get(url_inicial)
+
+
+def driver_saudavel(driver) -> bool:
+    """
+    Health check simples: o navegador ainda responde a comandos?
+    """
+    try:
+        return driver.execute_script("return 1") == 1
+    except Exception:
+        return False
+
+
+class BrowserPool:
+    """
+    Pool de navegadores com semântica de empréstimo/devolução:
+      - `lease()` entrega um driver saudável (criando sob demanda até `tamanho`)
+      - `devolver(driver)` devolve o driver ao pool
+      - `sessao()` faz as duas coisas em um bloco `with`
+    Drivers que falham no health check são descartados e substituídos.
+    Com `resetar=True` (pools de vida longa), cada driver devolvido passa por
+    `resetar_sessao` em segundo plano antes de voltar a ficar livre.
+    Com `perfil`, a fábrica recebe o perfil de navegador (lean_profile.py).
+    Cada devolução passa pelo `supervisor` (supervisor.py): navegadores acima
+    do limite de RSS ou de páginas são encerrados e recriados sob demanda.
+    """
+
+    def __init__(self, tamanho=None, url_inicial=None, fabrica=criar_driver, resetar=False,
+                 perfil=None):
+        self.tamanho = max(1, tamanho or POOL_SIZE)
+        self.url_inicial = url_inicial
+        self.fabrica = fabrica if perfil is None else functools.partial(fabrica, perfil=perfil)
+        self.perfil = perfil
+        self._resetador = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="reset") if resetar else None
+        )
+        self._livres = queue.LifoQueue()
+        self._criados = 0
+        self._lock = threading.Lock()
+        self._todos = set()
+        self._substitutos = {}   # driver emprestado -> quem o substituiu
+        self._fechado = False
+        self.supervisor = Supervisor(nome=f"pool {perfil or 'completo'}")
+
+    def _novo_driver(self):
+        """
+        Cria e registra um navegador. Em caso de erro ele é encerrado aqui,
+        mas a vaga em `_criados` é devolvida por quem a reservou.
+        """
+        driver = self.fabrica()
+        self.supervisor.anotar(driver)
+        if self.url_inicial:
+            try:
+                with metrics.CARREGAMENTO_PAGINA.cronometrar(pagina="inicial"):
+                    driver.get(self.url_inicial)
+            except Exception:
+                self.supervisor.encerrar(driver, CAIU)
+                raise
+        with self._lock:
+            fechado = self._fechado
+            if not fechado:
+                self._todos.add(driver)
+        if fechado:
+            self.supervisor.encerrar(driver)
+            raise RuntimeError("BrowserPool fechado durante a criação do navegador.")
+        logger.info(f"🦊 Navegador criado ({len(self._todos)}/{self.tamanho}).")
+        return driver
+
+    def aquecer(self, quantidade=None):
+        """
+        Cria em paralelo até `quantidade` navegadores (padrão: o tamanho do
+        pool) e os deixa livres, para que o primeiro `lease()` não espere.
+        """
+        with self._lock:
+            faltam = min(quantidade or self.tamanho, self.tamanho) - self._criados
+            faltam = max(0, faltam)
+            self._criados += faltam
+        if not faltam:
+            return
+
+        def _criar(_):
+            try:
+                self._livres.put(self._novo_driver())
+            except Exception as e:
+                with self._lock:
+                    self._criados -= 1
+                logger.error(f"Erro ao criar navegador: {e}")
+
+        with ThreadPoolExecutor(max_workers=faltam) as executor:
+            list(executor.map(_criar, range(faltam)))
+
+    def _descartar(self, driver, motivo=None):
+        with self._lock:
+            if driver not in self._todos:
+                return
+            self._todos.discard(driver)
+            self._criados -= 1
+        # Mata também os processos do Firefox que o quit() deixar para trás
+        self.supervisor.encerrar(driver, motivo)
+
+    def lease(self, timeout=None):
+        """
+        Empresta um driver do pool. Bloqueia até `timeout` segundos se todos
+        estiverem em uso; levanta queue.Empty se o tempo acabar.
+        """
+        if self._fechado:
+            raise RuntimeError("BrowserPool já foi fechado.")
+        while True:
+            try:
+                driver = self._livres.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    pode_criar = self._criados < self.tamanho
+                    if pode_criar:
+                        self._criados += 1
+                if pode_criar:
+                    try:
+                        return self._novo_driver()
+                    except Exception:
+                        with self._lock:
+                            self._criados -= 1
+                        raise
+                driver = self._livres.get(timeout=timeout)
+
+            if driver_saudavel(driver):
+                return driver
+            logger.warning("⚠️ Navegador não respondeu ao health check. Substituindo.")
+            self._descartar(driver, CAIU)
+
+    def adotar(self, antigo, novo):
+        """
+        Registra que o driver emprestado `antigo`, já encerrado pelo
+        supervisor, foi trocado por `novo` fora do pool (ex.: ProcessadorAbas
+        reciclando o navegador). A vaga passa para `novo`, que é quem volta
+        ao pool quando `antigo` for devolvido.
+        """
+        if novo is antigo:
+            return
+        with self._lock:
+            self._todos.discard(antigo)
+            self._todos.add(novo)
+            self._substitutos[antigo] = novo
+
+    def devolver(self, driver, descartar=False, motivo=None):
+        """
+        Devolve o driver ao pool. Com `descartar=True` (ou pool já fechado)
+        o navegador é encerrado e a vaga liberada para um novo; `motivo`
+        entra no relatório de reciclagens do supervisor.
+        """
+        with self._lock:
+            driver = self._substitutos.pop(driver, driver)
+        if descartar or self._fechado:
+            self._descartar(driver, motivo if descartar else None)
+            return
+        motivo = self.supervisor.verificar(driver)
+        if motivo:
+            self._descartar(driver, motivo)
+        elif self._resetador:
+            self._resetador.submit(self._resetar_e_liberar, driver)
+        else:
+            self._livres.put(driver)
+
+    def _resetar_e_liberar(self, driver):
+        try:
+            resetar_sessao(driver, self.url_inicial)
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao resetar navegador ({e}). Descartando.")
+            self._descartar(driver)
+            return
+        if self._fechado:
+            self._descartar(driver)
+        else:
+            self._livres.put(driver)
+
+    @contextmanager
+    def sessao(self, timeout=None):
+        driver = self.lease(timeout=timeout)
+        try:
+            yield driver
+        except Exception:
+            self.devolver(driver, descartar=not driver_saudavel(driver), motivo=CAIU)
+            raise
+        else:
+            self.devolver(driver)
+
+    def fechar(self):
+        self._fechado = True
+        if self._resetador:
+            self._resetador.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            drivers = list(self._todos)
+        for driver in drivers:
+            self._descartar(driver)
+        self.supervisor.logar_relatorio()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def executar_em_paralelo(pool, itens, tarefa):
+    """
+    Distribui `itens` entre os navegadores do pool. Para cada item chama
+    `tarefa(driver, item)` e gera pares (item, resultado) à medida que
+    terminam. Erros de um item são logados e não interrompem os demais.
+    """
+    def _executar(item):
+        # Se o navegador morrer no meio do item (ex.: OOM), o item é refeito
+        # uma vez em um navegador novo em vez de ser perdido
+        for tentativa in (1, 2):
+            driver = pool.lease()
+            try:
+                resultado = tarefa(driver, item)
+            except Exception:
+                saudavel = driver_saudavel(driver)
+                pool.devolver(driver, descartar=not saudavel, motivo=CAIU)
+                if saudavel or tentativa == 2:
+                    raise
+                logger.warning(f"💥 Navegador caiu em '{item}'. Refazendo em outro navegador.")
+                continue
+            pool.devolver(driver)
+            return resultado
+
+    with ThreadPoolExecutor(max_workers=pool.tamanho) as executor:
+        futuros = {executor.submit(_executar, item): item for item in itens}
+        for futuro in as_completed(futuros):
+            item = futuros[futuro]
+            try:
+                yield item, futuro.result()
+            except Exception as e:
+                logger.error(f"Erro ao processar '{item}': {e}")
@@ -0,0 +1,78 @@
+# -------------------------------------------------------------------
+# browser_service.py
+# -------------------------------------------------------------------
+# Serviço de navegadores de vida longa para o app Flask: resolve o
+# geckodriver uma vez, mantém navegadores aquecidos na página do Maps
+# e empresta sessões aos jobs, resetando-as na devolução em vez de
+# relançar o Firefox a cada busca.
+# -------------------------------------------------------------------
+
+import os
+import time
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from browser_pool import BrowserPool, POOL_SIZE, caminho_geckodriver
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# Configuração (vai buscar em variáveis de ambiente)
+# -------------------------------------------------------------
+NAVEGADORES_QUENTES = int(os.environ.get("NAVEGADORES_QUENTES", str(POOL_SIZE)))
+MAPS_URL_SERVICO = os.environ.get(
+    "MAPS_URL_SERVICO",
+    os.environ.get("MAPS_BASE_URL", "https://www.google.com/maps") + "?hl=pt-BR"
+)
+
+
+class ServicoNavegadores:
+    """
+    Mantém um BrowserPool com `resetar=True` durante toda a vida do processo.
+      - `iniciar()` aquece `quentes` navegadores em segundo plano
+      - `sessao()` empresta um navegador já na página do Maps
+      - `pool` pode ser usado com browser_pool.executar_em_paralelo
+    """
+
+    def __init__(self, tamanho=None, quentes=None, url_inicial=None, perfil=None):
+        self.pool = BrowserPool(
+            tamanho=tamanho, url_inicial=url_inicial or MAPS_URL_SERVICO, resetar=True,
+            perfil=perfil
+        )
+        self.quentes = quentes if quentes is not None else NAVEGADORES_QUENTES
+        self._iniciado = False
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        """
+        Resolve o geckodriver e aquece os navegadores sem bloquear quem chamou.
+        """
+        with self._lock:
+            if self._iniciado:
+                return
+            self._iniciado = True
+
+        def _aquecer():
+            inicio = time.monotonic()
+            try:
+                caminho_geckodriver()
+                self.pool.aquecer(self.quentes)
+                logger.info(
+                    f"🔥 {self.quentes} navegadores aquecidos em "
+                    f"{time.monotonic() - inicio:.1f}s."
+                )
+            except Exception as e:
+                logger.error(f"Erro ao aquecer navegadores: {e}")
+
+        threading.Thread(target=_aquecer, name="aquecer-navegadores", daemon=True).start()
+        atexit.register(self.fechar)
+
+    @contextmanager
+    def sessao(self, timeout=None):
+        self.iniciar()
+        with self.pool.sessao(timeout=timeout) as driver:
+            yield driver
+
+    def fechar(self):
+        self.pool.fechar()
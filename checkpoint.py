@@ -0,0 +1,181 @@
+# -------------------------------------------------------------------
+# checkpoint.py
+# -------------------------------------------------------------------
+# Leitura preguiçosa dos links de dados/*.txt e journal de progresso do
+# filterer, para que uma execução interrompida continue exatamente de
+# onde parou (por URL e por container) em vez de recomeçar do zero.
+# -------------------------------------------------------------------
+
+import os
+import json
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+NOME_JOURNAL = "progresso_filtro.jsonl"
+
+CONCLUIDO = "concluido"
+PULADO = "pulado"
+FALHOU = "falhou"
+
+# Entradas de container que não aguardam a planilha (PULADO/FALHOU) são
+# escritas na hora, mas o fsync delas é agrupado: no máximo um a cada
+# INTERVALO_FSYNC segundos, além do feito em confirmar() e fechar().
+INTERVALO_FSYNC = 2.0
+
+
+def iterar_links(dados_dir):
+    """
+    Gera (arquivo, url) lendo os .txt de `dados_dir` linha a linha, sem
+    carregar tudo em memória. Arquivos em ordem alfabética, para que a
+    ordem seja a mesma entre execuções.
+    """
+    for arquivo in sorted(os.listdir(dados_dir)):
+        if not arquivo.endswith(".txt"):
+            continue
+        caminho_arquivo = os.path.join(dados_dir, arquivo)
+        logger.info(f"📄 Lendo {arquivo}…")
+        with open(caminho_arquivo, "r", encoding="utf-8") as f:
+            for linha in f:
+                url = linha.strip()
+                if url:
+                    yield arquivo, url
+
+
+class JournalProgresso:
+    """
+    Journal append-only (JSONL) com o estado de cada URL e de cada container:
+      {"url": ..., "estado": "concluido" | "pulado" | "falhou", "motivo": ...}
+      {"url": ..., "container": "3", "estado": ...}
+    Ao abrir, o journal é relido e a última entrada de cada chave vale.
+    Entradas com `aguardar_flush` (containers salvos na planilha e URLs
+    com registros ainda no buffer) ficam pendentes até `confirmar()`,
+    chamado depois que o lote correspondente foi gravado em disco.
+    Containers pulados ou com falha não vão para os pendentes, mas o fsync
+    deles é adiado e agrupado com o próximo flush da planilha; perdê-los
+    numa queda só faz o container ser visitado de novo.
+    """
+
+    def __init__(self, caminho, retomar=True):
+        self.caminho = caminho
+        self._urls = {}
+        self._containers = {}
+        self._pendentes = []
+        self._sujo = False
+        self._ultimo_fsync = time.monotonic()
+        if retomar:
+            self._carregar()
+        elif os.path.exists(caminho):
+            os.replace(caminho, caminho + f".{int(time.time())}.bak")
+        self._arquivo = open(caminho, "a", encoding="utf-8")
+
+    @classmethod
+    def para_dados(cls, dados_dir, retomar=True):
+        return cls(os.path.join(dados_dir, NOME_JOURNAL), retomar=retomar)
+
+    def _carregar(self):
+        if not os.path.exists(self.caminho):
+            return
+        with open(self.caminho, "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    entrada = json.loads(linha)
+                except ValueError:
+                    continue
+                self._aplicar(entrada)
+        logger.info(
+            f"📒 Journal retomado: {len(self._urls)} URLs, "
+            f"{len(self.falhas())} com falha."
+        )
+
+    def _aplicar(self, entrada):
+        url = entrada["url"]
+        if "container" in entrada:
+            self._containers.setdefault(url, {})[entrada["container"]] = entrada["estado"]
+        else:
+            self._urls[url] = entrada["estado"]
+
+    def _gravar(self, entradas, sincronizar=True):
+        for entrada in entradas:
+            entrada["em"] = time.time()
+            self._arquivo.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            self._aplicar(entrada)
+        self._arquivo.flush()
+        self._sujo = True
+        if sincronizar or time.monotonic() - self._ultimo_fsync >= INTERVALO_FSYNC:
+            self._sincronizar()
+
+    def _sincronizar(self):
+        if self._sujo:
+            os.fsync(self._arquivo.fileno())
+            self._sujo = False
+        self._ultimo_fsync = time.monotonic()
+
+    def estado_url(self, url):
+        return self._urls.get(url)
+
+    def estado_container(self, url, chave):
+        return self._containers.get(url, {}).get(str(chave))
+
+    def estados_containers(self, url):
+        """
+        Cópia de {chave: estado} dos containers já registrados para `url`.
+        """
+        return dict(self._containers.get(url, {}))
+
+    def containers_com_falha(self, url):
+        return {
+            chave for chave, estado in self._containers.get(url, {}).items()
+            if estado == FALHOU
+        }
+
+    def falhas(self):
+        """
+        URLs que falharam por inteiro ou têm algum container com falha.
+        """
+        urls = [u for u, estado in self._urls.items() if estado == FALHOU]
+        urls += [
+            u for u, conts in self._containers.items()
+            if FALHOU in conts.values() and self._urls.get(u) != FALHOU
+        ]
+        return urls
+
+    def registrar_url(self, url, estado, motivo=None, aguardar_flush=False):
+        entrada = {"url": url, "estado": estado}
+        if motivo:
+            entrada["motivo"] = motivo
+        self._registrar(entrada, aguardar_flush)
+
+    def registrar_container(self, url, chave, estado, aguardar_flush=False):
+        entrada = {"url": url, "container": str(chave), "estado": estado}
+        self._registrar(entrada, aguardar_flush, sincronizar=False)
+
+    def _registrar(self, entrada, aguardar_flush, sincronizar=True):
+        if aguardar_flush:
+            self._pendentes.append(entrada)
+        else:
+            self._gravar([entrada], sincronizar=sincronizar)
+
+    def confirmar(self):
+        """
+        Grava as entradas pendentes (o lote delas já está no disco) e as
+        retorna, na ordem em que foram registradas.
+        """
+        confirmadas, self._pendentes = self._pendentes, []
+        if confirmadas:
+            self._gravar(confirmadas)
+        else:
+            self._sincronizar()
+        return confirmadas
+
+    def fechar(self):
+        self._arquivo.flush()
+        self._sincronizar()
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
@@ -0,0 +1,220 @@
+# -------------------------------------------------------------------
+# excel_sink.py
+# -------------------------------------------------------------------
+# Destino em lote para os registros do filterer: acumula em memória,
+# grava lotes em um journal append-only (durável) e consolida tudo no
+# informacoes.xlsx em uma única passada, com formatação e larguras.
+# -------------------------------------------------------------------
+
+import os
+import json
+import time
+import logging
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Alignment, Border, Side
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Ordem das colunas na planilha: (chave do registro, cabeçalho)
+COLUNAS = [
+    ("nome", "Nome"),
+    ("telefone", "Telefone"),
+    ("estrelas", "Estrelas"),
+    ("avaliacoes", "Avaliações"),
+    ("endereco", "Endereço"),
+    ("nicho", "Nicho"),
+    ("data_atualizacao", "Data Última Atualização"),
+    ("link", "Link"),
+]
+
+
+class PlanilhaSink:
+    """
+    Recebe registros (dicts com as chaves de COLUNAS) e os grava em lotes:
+      - `adicionar()` bufferiza e descarta telefones repetidos
+      - `flush()` é disparado a cada `tamanho_lote` registros ou a cada
+        `intervalo_flush` segundos e anexa o lote ao journal com fsync
+      - `flush_se_vencido()` faz o flush por tempo fora de `adicionar()`:
+        o chamador o usa nos pontos ociosos (entre URLs, fila vazia), para
+        que o último lote não espere o próximo registro
+      - `fechar()` faz o último flush e consolida o journal no Excel
+    Se o processo cair, o journal pendente é consolidado na próxima abertura.
+    Com um `indice` (IndiceLugares), telefones já salvos em outras execuções
+    também são descartados, e cada lote gravado é registrado nele.
+    """
+
+    def __init__(self, caminho, tamanho_lote=50, intervalo_flush=30.0, indice=None):
+        self.caminho = caminho
+        self.indice = indice
+        self.journal = caminho + ".pendentes.jsonl"
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_flush = intervalo_flush
+        self._buffer = []
+        self._ultimo_flush = time.monotonic()
+        self._telefones = set()
+        self.ao_flush = None
+
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        if os.path.exists(self.journal):
+            logger.warning("⚠️ Journal pendente encontrado. Consolidando execução anterior…")
+            self.consolidar()
+        self._telefones = self._carregar_telefones()
+
+    def _carregar_telefones(self):
+        if not os.path.exists(self.caminho):
+            return set()
+        wb = load_workbook(self.caminho, read_only=True)
+        try:
+            return {
+                row[1] for row in wb.active.iter_rows(min_row=2, values_only=True)
+                if len(row) > 1 and row[1]
+            }
+        finally:
+            wb.close()
+
+    def _ler_journal(self):
+        if not os.path.exists(self.journal):
+            return []
+        registros = []
+        with open(self.journal, "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    registros.append(json.loads(linha))
+                except ValueError:
+                    # Última linha truncada por uma queda no meio da escrita
+                    logger.warning("⚠️ Linha incompleta ignorada no journal.")
+        return registros
+
+    def contem_telefone(self, telefone):
+        return telefone in self._telefones
+
+    def adicionar(self, registro) -> bool:
+        """
+        Enfileira o registro. Retorna False se o telefone já existir.
+        """
+        telefone = registro.get("telefone")
+        if telefone in self._telefones or (
+                self.indice is not None and self.indice.telefone_existe(telefone)):
+            logger.warning(f"⚠️ Registro com telefone {telefone} já existe.")
+            return False
+        self._telefones.add(telefone)
+        self._buffer.append(registro)
+        if len(self._buffer) >= self.tamanho_lote:
+            self.flush()
+        else:
+            self.flush_se_vencido()
+        return True
+
+    @property
+    def pendentes(self):
+        """
+        Registros no buffer, ainda não gravados no journal.
+        """
+        return len(self._buffer)
+
+    def flush_se_vencido(self):
+        """
+        Grava o buffer se já passou `intervalo_flush` desde o último flush.
+        """
+        if self._buffer and time.monotonic() - self._ultimo_flush >= self.intervalo_flush:
+            self.flush()
+
+    def flush(self):
+        """
+        Anexa o lote em memória ao journal e força a gravação em disco.
+        """
+        self._ultimo_flush = time.monotonic()
+        if not self._buffer:
+            return
+        with metrics.ESCRITA_PLANILHA.cronometrar(etapa="flush"):
+            self._gravar_lote()
+        logger.info(f"💾 Lote de {len(self._buffer)} registros gravado.")
+        self._buffer = []
+        if self.ao_flush:
+            self.ao_flush()
+
+    def _gravar_lote(self):
+        with open(self.journal, "a", encoding="utf-8") as f:
+            for registro in self._buffer:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if self.indice is not None:
+            self.indice.registrar_telefones(
+                (r.get("link"), r.get("telefone")) for r in self._buffer
+            )
+
+    def consolidar(self):
+        """
+        Anexa o journal ao Excel, aplica bordas/alinhamento e larguras de
+        coluna em uma única passada e remove o journal.
+        """
+        with metrics.ESCRITA_PLANILHA.cronometrar(etapa="consolidar"):
+            self._consolidar()
+
+    def _consolidar(self):
+        registros = self._ler_journal()
+        if not registros:
+            if os.path.exists(self.journal):
+                os.remove(self.journal)
+            return
+
+        if os.path.exists(self.caminho):
+            wb = load_workbook(self.caminho)
+            ws = wb.active
+        else:
+            wb = Workbook()
+            ws = wb.active
+            ws.append([cabecalho for _, cabecalho in COLUNAS])
+
+        existentes = {
+            ws.cell(row=r, column=2).value for r in range(2, ws.max_row + 1)
+        }
+        for registro in registros:
+            if registro.get("telefone") in existentes:
+                continue
+            existentes.add(registro.get("telefone"))
+            ws.append([registro.get(chave) for chave, _ in COLUNAS])
+
+        formatar_planilha(ws)
+
+        # Grava em arquivo temporário e troca atomicamente
+        tmp = self.caminho + ".tmp"
+        wb.save(tmp)
+        os.replace(tmp, self.caminho)
+        os.remove(self.journal)
+        logger.info(f"✅ Planilha consolidada com {len(registros)} novos registros.")
+
+    def fechar(self):
+        self.flush()
+        self.consolidar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def formatar_planilha(ws):
+    """
+    Aplica bordas, alinhamento e largura de coluna em toda a planilha.
+    """
+    thin = Side(border_style="thin", color="CCCCCC")
+    borda = Border(left=thin, right=thin, top=thin, bottom=thin)
+    alinhado = Alignment(horizontal="left", vertical="center", wrap_text=True)
+    ultima = Alignment(horizontal="left", vertical="center", wrap_text=False)
+    larguras = {}
+    # max_row/max_column varrem todas as células: calcular uma vez só
+    ultima_coluna = ws.max_column
+    for row in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=ultima_coluna):
+        for cell in row:
+            cell.border = borda
+            cell.alignment = ultima if cell.column == ultima_coluna else alinhado
+            if cell.value:
+                larguras[cell.column_letter] = max(
+                    larguras.get(cell.column_letter, 0), len(str(cell.value))
+                )
+    for letra, mx in larguras.items():
+        ws.column_dimensions[letra].width = mx * 1.2 + 2
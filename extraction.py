@@ -0,0 +1,304 @@
+# -------------------------------------------------------------------
+# extraction.py
+# -------------------------------------------------------------------
+# Extração dos campos do perfil a partir de um único snapshot do DOM.
+# O painel é capturado com um só execute_script e todo o resto é feito
+# localmente, com uma tabela de seletores configurável. Funciona sem
+# navegador: `python extraction.py perfil.html` mostra os campos.
+# -------------------------------------------------------------------
+
+import re
+import sys
+import json
+import logging
+from html.parser import HTMLParser
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# Tabela de seletores (subconjunto de CSS: tag, .classe,
+# [attr], [attr=v], [attr*=v], [attr^=v], :contains('texto') no texto
+# próprio do elemento, descendente com espaço e alternativas com vírgula).
+# Se o Google trocar uma classe, basta ajustar a linha aqui.
+# -------------------------------------------------------------
+SELETORES = {
+    "data_atualizacao": "div.lchoPb, div.mqX5ad",
+    "telefone": "button.CsEnBe[aria-label*='Telefone:'] .Io6YTe",
+    "estrelas": "div.fontDisplayLarge",
+    "avaliacoes": "span:contains('avaliações')",
+    "titulo": "h1",
+    "nicho": "button.DkEaL",
+    "endereco": "div.Io6YTe",
+}
+
+# Campos que juntam o texto de todos os elementos encontrados
+CAMPOS_MULTIPLOS = {"nicho"}
+
+# Sem estes campos o registro não é salvo
+CAMPOS_OBRIGATORIOS = ("titulo", "telefone")
+
+# Elemento raiz capturado do navegador: o painel do lugar. Com a lista de
+# resultados aberta, ela também é um role=main (com o role=feed dentro) e
+# vem antes do painel; vale o último role=main que não contém a lista.
+SELETOR_PAINEL = "div[role='main']"
+SELETOR_LISTA = "[role='feed']"
+
+_JS_CAPTURAR = """
+const lista = arguments[1];
+const paineis = Array.from(document.querySelectorAll(arguments[0]))
+    .filter(function (el) { return !el.querySelector(lista); });
+const raiz = paineis.length ? paineis[paineis.length - 1] : document.body;
+return [raiz.outerHTML, window.location.href];
+"""
+
+_VAZIOS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+_SEM_TEXTO = {"script", "style", "noscript", "template"}
+
+
+class No:
+    __slots__ = ("tag", "attrs", "classes", "filhos", "pai")
+
+    def __init__(self, tag, attrs, pai=None):
+        self.tag = tag
+        self.attrs = attrs
+        self.classes = set(attrs.get("class", "").split())
+        self.filhos = []
+        self.pai = pai
+
+    def texto(self):
+        partes = []
+        pilha = [self]
+        while pilha:
+            item = pilha.pop()
+            if isinstance(item, str):
+                partes.append(item)
+            elif item.tag not in _SEM_TEXTO:
+                pilha.extend(reversed(item.filhos))
+        return " ".join(" ".join(partes).split())
+
+    def texto_proprio(self):
+        """
+        Só os nós de texto filhos diretos (como `text()` no XPath).
+        """
+        return " ".join(" ".join(f for f in self.filhos if isinstance(f, str)).split())
+
+    def descendentes(self):
+        pilha = list(reversed(self.filhos))
+        while pilha:
+            item = pilha.pop()
+            if isinstance(item, No):
+                yield item
+                pilha.extend(reversed(item.filhos))
+
+
+class _Construtor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.raiz = No("#documento", {})
+        self._pilha = [self.raiz]
+
+    def handle_starttag(self, tag, attrs):
+        no = No(tag, {k: (v or "") for k, v in attrs}, self._pilha[-1])
+        self._pilha[-1].filhos.append(no)
+        if tag not in _VAZIOS:
+            self._pilha.append(no)
+
+    def handle_startendtag(self, tag, attrs):
+        no = No(tag, {k: (v or "") for k, v in attrs}, self._pilha[-1])
+        self._pilha[-1].filhos.append(no)
+
+    def handle_endtag(self, tag):
+        for i in range(len(self._pilha) - 1, 0, -1):
+            if self._pilha[i].tag == tag:
+                del self._pilha[i:]
+                return
+
+    def handle_data(self, data):
+        self._pilha[-1].filhos.append(data)
+
+
+def parse_html(html):
+    construtor = _Construtor()
+    construtor.feed(html)
+    construtor.close()
+    return construtor.raiz
+
+
+# -------------------------------------------------------------
+# Seletores
+# -------------------------------------------------------------
+_RE_TAG = re.compile(r"^([a-zA-Z][\w-]*|\*)")
+_RE_CLASSE = re.compile(r"\.([\w-]+)")
+_RE_ATRIBUTO = re.compile(r"""\[\s*([\w-]+)\s*(?:([*^]?=)\s*(?:'([^']*)'|"([^"]*)"|([^\]\s]*)))?\s*\]""")
+_RE_CONTEM = re.compile(r""":contains\(\s*(?:'([^']*)'|"([^"]*)")\s*\)""")
+
+
+def _dividir(seletor, separador):
+    """
+    Divide `seletor` em `separador` (',' ou espaço) fora de [] e ().
+    """
+    partes, atual, nivel = [], "", 0
+    for ch in seletor:
+        if ch in "[(":
+            nivel += 1
+        elif ch in "])":
+            nivel -= 1
+        if nivel == 0 and (ch == separador or (separador == " " and ch.isspace())):
+            if atual.strip():
+                partes.append(atual.strip())
+            atual = ""
+        else:
+            atual += ch
+    if atual.strip():
+        partes.append(atual.strip())
+    return partes
+
+
+def _compilar_composto(texto):
+    m = _RE_TAG.match(texto)
+    tag = m.group(1).lower() if m and m.group(1) != "*" else None
+    sem_extras = _RE_CONTEM.sub("", _RE_ATRIBUTO.sub("", texto))
+    return {
+        "tag": tag,
+        "classes": set(_RE_CLASSE.findall(sem_extras)),
+        "attrs": [
+            (nome, op, next((v for v in valores if v), ""))
+            for nome, op, *valores in _RE_ATRIBUTO.findall(texto)
+        ],
+        "contem": [a or b for a, b in _RE_CONTEM.findall(texto)],
+    }
+
+
+def compilar_seletor(seletor):
+    """
+    Compila um seletor em uma lista de alternativas; cada alternativa é a
+    lista de compostos da cadeia de descendentes.
+    """
+    return [
+        [_compilar_composto(parte) for parte in _dividir(alternativa, " ")]
+        for alternativa in _dividir(seletor, ",")
+    ]
+
+
+def _casa(no, composto):
+    if composto["tag"] and no.tag != composto["tag"]:
+        return False
+    if not composto["classes"] <= no.classes:
+        return False
+    for nome, op, valor in composto["attrs"]:
+        atual = no.attrs.get(nome)
+        if atual is None:
+            return False
+        # findall devolve '' quando não há operador: só exige o atributo
+        if op == "=" and atual != valor:
+            return False
+        if op == "*=" and valor not in atual:
+            return False
+        if op == "^=" and not atual.startswith(valor):
+            return False
+    return all(trecho in no.texto_proprio() for trecho in composto["contem"])
+
+
+def _casa_cadeia(no, cadeia):
+    if not _casa(no, cadeia[-1]):
+        return False
+    i = len(cadeia) - 2
+    ancestral = no.pai
+    while i >= 0 and ancestral is not None:
+        if _casa(ancestral, cadeia[i]):
+            i -= 1
+        ancestral = ancestral.pai
+    return i < 0
+
+
+def selecionar(raiz, seletor):
+    """
+    Todos os nós sob `raiz` que casam com `seletor`, na ordem do documento.
+    """
+    alternativas = compilar_seletor(seletor) if isinstance(seletor, str) else seletor
+    return [
+        no for no in raiz.descendentes()
+        if any(_casa_cadeia(no, cadeia) for cadeia in alternativas)
+    ]
+
+
+# -------------------------------------------------------------
+# Extração
+# -------------------------------------------------------------
+def painel_do_lugar(raiz):
+    """
+    O mesmo painel que _JS_CAPTURAR escolhe no navegador, para HTML de
+    página inteira (ex.: salvo pelo CLI). Sem painel, a própria `raiz`.
+    """
+    paineis = [
+        no for no in selecionar(raiz, SELETOR_PAINEL)
+        if not selecionar(no, SELETOR_LISTA)
+    ]
+    return paineis[-1] if paineis else raiz
+
+
+def extrair_campos(html, seletores=None):
+    """
+    Aplica a tabela de seletores ao painel do lugar no HTML e retorna
+    {campo: texto ou None}.
+    """
+    seletores = seletores or SELETORES
+    raiz = painel_do_lugar(parse_html(html))
+    campos = {}
+    for campo, seletor in seletores.items():
+        nos = selecionar(raiz, seletor)
+        if campo in CAMPOS_MULTIPLOS:
+            textos = [t for t in (n.texto() for n in nos) if t]
+            campos[campo] = ", ".join(textos) if textos else None
+        else:
+            campos[campo] = nos[0].texto() if nos else None
+    return campos
+
+
+def montar_registro(campos, link):
+    """
+    Converte os campos extraídos no registro aceito por PlanilhaSink.
+    Levanta ValueError se faltar algum campo de CAMPOS_OBRIGATORIOS.
+    """
+    faltando = [c for c in CAMPOS_OBRIGATORIOS if not campos.get(c)]
+    if faltando:
+        raise ValueError(f"Campos não encontrados: {', '.join(faltando)}")
+    titulo = campos["titulo"]
+    return {
+        "nome": titulo.split("–")[0].strip() if "–" in titulo else titulo,
+        "telefone": campos.get("telefone"),
+        "estrelas": campos.get("estrelas"),
+        "avaliacoes": campos.get("avaliacoes"),
+        "endereco": campos.get("endereco"),
+        "nicho": campos.get("nicho") or "",
+        "data_atualizacao": campos.get("data_atualizacao"),
+        "link": link,
+    }
+
+
+def capturar_painel(driver, seletor_painel=None):
+    """
+    Uma única chamada ao navegador: devolve (html do painel, url atual).
+    """
+    html, url = driver.execute_script(_JS_CAPTURAR, seletor_painel or SELETOR_PAINEL, SELETOR_LISTA)
+    return html, url
+
+
+def extrair_registro(driver, seletores=None):
+    """
+    Captura o painel do perfil aberto e monta o registro localmente.
+    """
+    html, url = capturar_painel(driver)
+    return montar_registro(extrair_campos(html, seletores), url)
+
+
+if __name__ == "__main__":
+    # Uso: python extraction.py perfil.html [url]
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        campos = extrair_campos(f.read())
+    print(json.dumps(campos, ensure_ascii=False, indent=2))
+    if len(sys.argv) > 2:
+        print(json.dumps(montar_registro(campos, sys.argv[2]), ensure_ascii=False, indent=2))
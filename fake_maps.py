@@ -0,0 +1,427 @@
+# -------------------------------------------------------------------
+# fake_maps.py
+# -------------------------------------------------------------------
+# Servidor local que imita as partes do Google Maps usadas pelo
+# scanner e pelo filterer (mesmos ids/classes), com latência e número
+# de resultados configuráveis e conteúdo determinístico. Também serve
+# um painel de liberação e um "ipify" de teste. As páginas embutem os
+# dados em window.APP_INITIALIZATION_STATE no formato lido pelo
+# http_backend.py (servem de fixture para o parser).
+#
+# Uso: python fake_maps.py --porta 8765 --latencia-ms 200 --resultados 120
+# -------------------------------------------------------------------
+
+import os
+import re
+import json
+import math
+import time
+import zlib
+import random
+import argparse
+import itertools
+import threading
+from datetime import date
+from urllib.parse import quote
+from flask import Flask, request, jsonify, render_template_string
+from werkzeug.serving import make_server
+
+# -------------------------------------------------------------
+# Configuração padrão (pode ser alterada por argumentos, variáveis
+# de ambiente ou por query string: ?latencia_ms=...&resultados=...)
+# -------------------------------------------------------------
+CONFIG = {
+    "latencia_ms": int(os.environ.get("FAKE_LATENCIA_MS", "150")),
+    "resultados": int(os.environ.get("FAKE_RESULTADOS", "60")),
+    "containers": int(os.environ.get("FAKE_CONTAINERS", "8")),
+    "pagina": 20,
+    # Responde às páginas seguintes da lista em /search?tbm=map
+    "paginacao": os.environ.get("FAKE_PAGINACAO", "1") == "1",
+    # Teto de resultados por busca (como o Maps) e zoom em que uma busca
+    # devolve `resultados`; cada nível de zoom a mais divide a área por 4
+    "limite": int(os.environ.get("FAKE_LIMITE", "120")),
+    "zoom_base": 14,
+    # Responde com a página de "tráfego incomum" a cada N páginas (0 = nunca)
+    "bloqueio_a_cada": int(os.environ.get("FAKE_BLOQUEIO_A_CADA", "0")),
+    "tiles": int(os.environ.get("FAKE_TILES", "12")),
+    # Como o Maps, remove do DOM os resultados mais antigos (0 = nunca)
+    "janela_lista": int(os.environ.get("FAKE_JANELA_LISTA", "40")),
+    # Mostra data/Street View também na lista (pré-filtro do filterer)
+    "metadados_lista": os.environ.get("FAKE_METADADOS_LISTA", "1") == "1",
+    "bytes_recurso": int(os.environ.get("FAKE_BYTES_RECURSO", "30000")),
+    "ativo": os.environ.get("FAKE_ATIVO", "1") == "1",
+}
+
+MESES = ["jan.", "fev.", "mar.", "abr.", "mai.", "jun.",
+         "jul.", "ago.", "set.", "out.", "nov.", "dez."]
+
+app = Flask(__name__)
+_paginas = itertools.count(1)
+
+
+def _cfg(chave):
+    return request.args.get(chave, CONFIG[chave], type=type(CONFIG[chave]))
+
+
+def _latencia():
+    time.sleep(_cfg("latencia_ms") / 1000.0)
+
+
+def _semente(*partes):
+    return zlib.crc32("|".join(str(p) for p in partes).encode("utf-8"))
+
+
+def _feature_id(q, i):
+    return f"0x{_semente(q):x}:0x{_semente(q, i):x}"
+
+
+def _link_lugar(q, i):
+    fid = _feature_id(q, i)
+    return f"{request.host_url}maps/place/{quote(f'{q} {i}')}/data=!4m2!3m1!1s{fid}?hl=pt-BR"
+
+
+def _viewport_canonico(viewport):
+    """
+    "@lat,lng,zoomz" sempre com a mesma formatação, para que a página de
+    pesquisa e as páginas seguintes (que recebem o viewport no "pb")
+    gerem os mesmos lugares.
+    """
+    m = re.match(r"@(-?[\d.]+),(-?[\d.]+),([\d.]+)z", viewport)
+    if not m:
+        return viewport
+    lat, lng, zoom = (float(v) for v in m.groups())
+    return f"@{lat:.7f},{lng:.7f},{zoom:g}z"
+
+
+def _lugares_da_busca(q, viewport, inicio, fim):
+    place_id = f"{_semente(q + viewport):x}"
+    return [
+        _array_lugar(_lugar(place_id, i), f"{q + viewport} {i}", _feature_id(q + viewport, i))
+        for i in range(inicio, min(fim, _total_resultados(viewport)))
+    ]
+
+
+def _total_resultados(viewport):
+    total = _cfg("resultados")
+    zoom = re.search(r",(\d+(?:\.\d+)?)z", viewport)
+    if zoom:
+        total = int(total / 4 ** (float(zoom.group(1)) - CONFIG["zoom_base"]))
+    return min(total, CONFIG["limite"])
+
+
+def _lugar(place_id, i):
+    """
+    Dados determinísticos do i-ésimo container da página `place_id`:
+    ~1/2 desatualizados, ~1/3 recentes e o resto sem data (Street View).
+    """
+    rnd = random.Random(_semente(place_id, i))
+    hoje = date.today()
+    tipo = rnd.random()
+    if tipo < 0.5:
+        atras = rnd.randint(4, 30)
+    elif tipo < 0.85:
+        atras = rnd.randint(0, 2)
+    else:
+        atras = None
+    data = None
+    if atras is not None:
+        total = hoje.year * 12 + hoje.month - 1 - atras
+        data = f"Atualizado pelo proprietário - {MESES[total % 12]} de {total // 12}"
+    return {
+        "nome": f"Lugar {place_id[:6]}-{i}",
+        "categoria": rnd.choice(["Dentista", "Clínica", "Restaurante", "Oficina"]),
+        "estrelas": f"{rnd.randint(30, 50) / 10:.1f}".replace(".", ","),
+        "avaliacoes": f"{rnd.randint(1, 900)} avaliações",
+        "endereco": f"Rua {rnd.randint(1, 500)}, Centro",
+        "telefone": f"(73) 9{_semente(place_id, i) % 10**8:08d}",
+        "data": data,
+    }
+
+
+def _array_lugar(l, nome, feature_id):
+    """
+    Lugar no formato de array posicional do Maps (ver http_backend.INDICES).
+    """
+    lugar = [None] * 181
+    avaliacoes = [None] * 9
+    avaliacoes[7] = float(l["estrelas"].replace(",", "."))
+    avaliacoes[8] = int(l["avaliacoes"].split()[0])
+    lugar[4] = avaliacoes
+    lugar[10] = feature_id
+    lugar[11] = nome
+    lugar[13] = [l["categoria"]]
+    lugar[39] = l["endereco"]
+    lugar[178] = [[l["telefone"]]]
+    if l["data"]:
+        lugar[180] = [l["data"]]
+    return lugar
+
+
+def _estado_inicial(busca=None, lugar=None):
+    """
+    JSON de window.APP_INITIALIZATION_STATE com os blocos ")]}'" da busca
+    ([3][2]) e do lugar ([3][6]).
+    """
+    bloco = [None] * 7
+    if busca is not None:
+        bloco[2] = ")]}'\n" + json.dumps([[None, [None] + [[None] * 14 + [l] for l in busca]]])
+    if lugar is not None:
+        bloco[6] = ")]}'\n" + json.dumps([None] * 6 + [lugar])
+    return json.dumps([None, None, None, bloco])
+
+
+PAGINA_BLOQUEIO = """<!doctype html>
+<html><head><meta charset="utf-8"><title>https://www.google.com/sorry/index</title></head>
+<body><div id="captcha-form">Nossos sistemas detectaram tráfego incomum na sua rede de computadores.</div></body></html>
+"""
+
+
+def _bloqueado():
+    n = CONFIG["bloqueio_a_cada"]
+    return n and next(_paginas) % n == 0
+
+
+PAGINA_BUSCA = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Fake Maps</title>
+<style>#feed{height:600px;overflow:auto} a.hfpxzc{display:block;height:80px}
+@font-face{font-family:Fake;src:url(/fonts/fake.woff2)} body{font-family:Fake}
+#mapa img{width:64px;height:64px}</style></head>
+<body>
+<div id="mapa">{% for t in range(tiles) %}<img src="/maps/vt?x={{ t }}">{% endfor %}</div>
+<input id="searchboxinput" value="{{ q }}">
+<div id="feed" role="feed"></div>
+<script>window.APP_INITIALIZATION_STATE={{ estado|safe }};window.APP_FLAGS=[];</script>
+<script>
+var cfg = "latencia_ms={{ latencia_ms }}&resultados={{ resultados }}";
+var janela = {{ janela_lista }};
+var viewport = {{ viewport|tojson }};
+var estado = {q: null, offset: 0, carregando: false, fim: false};
+var feed = document.getElementById("feed");
+var observador = new IntersectionObserver(function (itens) {
+  itens.forEach(function (it) { if (it.isIntersecting) carregar(); });
+});
+function carregar() {
+  if (estado.carregando || estado.fim || !estado.q) return;
+  estado.carregando = true;
+  fetch("/api/busca?q=" + encodeURIComponent(estado.q) + "&offset=" + estado.offset + "&v=" + encodeURIComponent(viewport) + "&" + cfg)
+    .then(function (r) { return r.json(); })
+    .then(function (j) {
+      j.links.forEach(function (l) {
+        var a = document.createElement("a");
+        a.className = "hfpxzc"; a.href = l.href; a.setAttribute("aria-label", l.nome);
+        a.textContent = l.nome; feed.appendChild(a);
+      });
+      while (janela && feed.children.length > janela) feed.removeChild(feed.firstChild);
+      estado.offset += j.links.length; estado.fim = j.fim; estado.carregando = false;
+      if (feed.lastChild) observador.observe(feed.lastChild);
+    });
+}
+function buscar(q) {
+  feed.innerHTML = ""; estado = {q: q, offset: 0, carregando: false, fim: false}; carregar();
+}
+document.getElementById("searchboxinput").addEventListener("keydown", function (e) {
+  if (e.key === "Enter") buscar(this.value);
+});
+{% if q %}buscar({{ q|tojson }});{% endif %}
+</script></body></html>
+"""
+
+PAGINA_LUGAR = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{{ place_id }}</title>
+<style>.ofKBgf{height:120px} .DaSXdd{width:80px;height:80px;display:block}
+@font-face{font-family:Fake;src:url(/fonts/fake.woff2)} body{font-family:Fake}</style></head>
+<body>
+<script>window.APP_INITIALIZATION_STATE={{ estado|safe }};window.APP_FLAGS=[];</script>
+<div id="lista">
+{% for l in lugares %}
+  <div class="ofKBgf" data-i="{{ loop.index0 }}" aria-label="{{ l.nome }}"><img class="DaSXdd" src="/fotos/{{ place_id }}/{{ loop.index0 }}.jpg" alt="foto {{ loop.index0 }}" onclick="abrir({{ loop.index0 }})">
+  {% if metadados %}{% if l.data %}<div class="lchoPb">{{ l.data }}</div>{% else %}<div class="ilzTS">Google Street View</div>{% endif %}{% endif %}</div>
+{% endfor %}
+</div>
+<div role="main" id="painel"></div>
+<script>
+var cfg = "latencia_ms={{ latencia_ms }}";
+function abrir(i) {
+  fetch("/api/lugar/{{ place_id }}/" + i + "?" + cfg).then(function (r) { return r.text(); })
+    .then(function (html) { document.getElementById("painel").innerHTML = html; });
+}
+function detalhes(i) {
+  fetch("/api/lugar/{{ place_id }}/" + i + "/telefone?" + cfg).then(function (r) { return r.text(); })
+    .then(function (html) { document.getElementById("contato").innerHTML = html; });
+}
+</script></body></html>
+"""
+
+PAINEL = """<h1 class="DUwDvf">{{ l.nome }} – {{ l.categoria }}</h1>
+<div class="F7nice"><div class="fontDisplayLarge">{{ l.estrelas }}</div><span>{{ l.avaliacoes }}</span></div>
+<button class="DkEaL">{{ l.categoria }}</button>
+{% if l.data %}<div class="lchoPb">{{ l.data }}</div>{% else %}<div class="ilzTS">Google Street View</div>{% endif %}
+<button class="CsEnBe" aria-label="Endereço: {{ l.endereco }}"><div class="Io6YTe">{{ l.endereco }}</div></button>
+<button class="fKm1Mb" onclick="detalhes({{ i }})">Visão geral</button>
+<div id="contato"></div>
+"""
+
+TELEFONE = """<button class="CsEnBe" aria-label="Telefone: {{ l.telefone }}"><div class="Io6YTe">{{ l.telefone }}</div></button>"""
+
+
+@app.route("/maps")
+@app.route("/maps/<path:_viewport>")
+def pagina_busca(_viewport=None):
+    _latencia()
+    if _bloqueado():
+        return PAGINA_BLOQUEIO, 429
+    q = viewport = ""
+    if _viewport and _viewport.startswith("search/"):
+        partes = _viewport.split("/")
+        q = partes[1].replace("+", " ")
+        viewport = _viewport_canonico(partes[2]) if len(partes) > 2 else ""
+    # Primeira página de resultados já vem embutida, como no Maps (nomes
+    # iguais aos dos links de _link_lugar)
+    busca = _lugares_da_busca(q, viewport, 0, CONFIG["pagina"]) if q else None
+    return render_template_string(
+        PAGINA_BUSCA, q=q, viewport=viewport, estado=_estado_inicial(busca=busca), tiles=CONFIG["tiles"], janela_lista=CONFIG["janela_lista"], latencia_ms=_cfg("latencia_ms"), resultados=_cfg("resultados")
+    )
+
+
+@app.route("/maps/place/<path:caminho>")
+def pagina_lugar(caminho):
+    _latencia()
+    if _bloqueado():
+        return PAGINA_BLOQUEIO, 429
+    nome = caminho.split('/')[0]
+    place_id = f"{_semente(nome):x}"
+    fid = re.search(r"!1s([^!?/]+)", caminho)
+    estado = _estado_inicial(
+        lugar=_array_lugar(_lugar(place_id, 0), nome, fid.group(1) if fid else place_id)
+    )
+    return render_template_string(
+        PAGINA_LUGAR, place_id=place_id, estado=estado, metadados=CONFIG["metadados_lista"],
+        lugares=[_lugar(place_id, i) for i in range(_cfg("containers"))],
+        latencia_ms=_cfg("latencia_ms")
+    )
+
+
+@app.route("/search")
+def pagina_seguinte():
+    """
+    Páginas seguintes da lista, no formato de /search?tbm=map do Maps:
+    o viewport e o offset vêm no parâmetro "pb".
+    """
+    _latencia()
+    if _bloqueado():
+        return PAGINA_BLOQUEIO, 429
+    if request.args.get("tbm") != "map" or not CONFIG["paginacao"]:
+        return "", 404
+    q = request.args.get("q", "")
+    pb = request.args.get("pb", "")
+    campos = dict(re.findall(r"!(\d[a-z])([^!]*)", pb))
+    offset = int(campos.get("8i", 0))
+    viewport = ""
+    if "1d" in campos:
+        zoom = round(math.log2(40075016.686 / float(campos["1d"])), 2)
+        viewport = _viewport_canonico(f"@{campos['3d']},{campos['2d']},{zoom}z")
+    lugares = _lugares_da_busca(q, viewport, offset, offset + CONFIG["pagina"])
+    d = ")]}'\n" + json.dumps([[q, [None] + [[None] * 14 + [l] for l in lugares]]])
+    return app.response_class(
+        ")]}'\n" + json.dumps({"c": 0, "d": d, "e": "fake", "p": True}) + '/*""*/',
+        mimetype="application/json",
+    )
+
+
+@app.route("/api/busca")
+def api_busca():
+    _latencia()
+    q = request.args.get("q", "")
+    viewport = _viewport_canonico(request.args.get("v", ""))
+    offset = request.args.get("offset", 0, type=int)
+    total = _total_resultados(viewport)
+    fim_pagina = min(offset + CONFIG["pagina"], total)
+    links = [
+        {"href": _link_lugar(q + viewport, i), "nome": f"{q} {i}"}
+        for i in range(offset, fim_pagina)
+    ]
+    return jsonify(links=links, fim=fim_pagina >= total)
+
+
+@app.route("/api/lugar/<place_id>/<int:i>")
+def api_lugar(place_id, i):
+    _latencia()
+    return render_template_string(PAINEL, l=_lugar(place_id, i), i=i)
+
+
+@app.route("/api/lugar/<place_id>/<int:i>/telefone")
+def api_telefone(place_id, i):
+    _latencia()
+    return render_template_string(TELEFONE, l=_lugar(place_id, i))
+
+
+def _recurso(tipo):
+    """
+    Imagens, tiles e fontes falsos: só ocupam banda (para medir os perfis
+    enxutos do lean_profile.py).
+    """
+    corpo = bytes(CONFIG["bytes_recurso"])
+    return app.response_class(corpo, mimetype=tipo, headers={"Cache-Control": "no-store"})
+
+
+@app.route("/maps/vt")
+def tile():
+    return _recurso("image/png")
+
+
+@app.route("/fotos/<place_id>/<nome>")
+def foto(place_id, nome):
+    return _recurso("image/jpeg")
+
+
+@app.route("/fonts/<nome>")
+def fonte(nome):
+    return _recurso("font/woff2")
+
+
+@app.route("/command")
+def painel():
+    return jsonify(ativo=CONFIG["ativo"], mac=request.args.get("mac"))
+
+
+@app.route("/ip")
+def ip():
+    return request.remote_addr or "127.0.0.1"
+
+
+class ServidorFake:
+    """
+    Sobe o servidor em uma thread; `url` é a base (ex.: http://127.0.0.1:8765).
+    Os ajustes passados em `config` valem só enquanto o servidor está de pé:
+    CONFIG é restaurado ao sair do `with`.
+    """
+
+    def __init__(self, porta=0, **config):
+        self._config = {k: v for k, v in config.items() if v is not None}
+        self._config_anterior = None
+        self._servidor = make_server("127.0.0.1", porta, app, threaded=True)
+        self.url = f"http://127.0.0.1:{self._servidor.server_port}"
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._config_anterior = dict(CONFIG)
+        CONFIG.update(self._config)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        CONFIG.clear()
+        CONFIG.update(self._config_anterior)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Google Maps falso para testes e benchmarks.")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia-ms", type=int)
+    parser.add_argument("--resultados", type=int)
+    parser.add_argument("--containers", type=int)
+    args = parser.parse_args()
+    CONFIG.update({k: v for k, v in vars(args).items() if v is not None and k != "porta"})
+    app.run(host="127.0.0.1", port=args.porta, threaded=True)
@@ -0,0 +1,378 @@
+# -------------------------------------------------------------------
+# filter_pipeline.py
+# -------------------------------------------------------------------
+# Versão paralela do run_filter em três estágios:
+#   - fonte: o processo principal lê os links pendentes sob demanda
+#   - extração: N processos, cada um com o seu Firefox, rodam
+#     process_profiles e mandam registros/estados por uma fila
+#   - escrita: o processo principal é o único dono do PlanilhaSink,
+#     do journal de progresso e do índice de lugares
+# Cada processo de extração tem a sua fila de tarefas e o escritor
+# anota o que entregou a cada um: a queda de um processo devolve as URLs
+# dele para a fila, sem depender de aviso do próprio processo. As filas
+# são limitadas (backpressure).
+# -------------------------------------------------------------------
+
+import os
+import time
+import queue
+import signal
+import logging
+import itertools
+import collections
+import multiprocessing
+from excel_sink import PlanilhaSink
+from place_index import IndiceLugares
+from checkpoint import JournalProgresso, CONCLUIDO, PULADO, FALHOU
+from browser_pool import criar_driver, driver_saudavel
+from lean_profile import perfil_para, medir_pagina
+from supervisor import Supervisor, CAIU, limpar_orfaos
+from licenca import verificar_em_segundo_plano, liberado
+from filterer import (
+    process_profiles, _links_pendentes, _registrar_url, _ao_flush, FILTRO_WORKERS
+)
+from rate_control import (
+    ControladorTaxa, detectar_bloqueio, resolver_consentimento,
+    CONSENTIMENTO, QUARENTENA, RODADAS_MAX
+)
+from waits import REGISTRO
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# Configuração (vai buscar em variáveis de ambiente)
+# -------------------------------------------------------------
+# URLs aguardando na fila por worker; registros aguardando o escritor
+LINKS_POR_WORKER = 2
+FILA_SAIDA_MAX = int(os.environ.get("FILTRO_FILA_SAIDA", "500"))
+# Quantas vezes uma URL volta para a fila após a queda de um worker
+TENTATIVAS_URL = 2
+# Quedas seguidas (sem nenhuma URL concluída) antes de desistir
+QUEDAS_SEGUIDAS_MAX = 10
+
+# Espera pelo fim de cada worker ao encerrar, antes do SIGTERM
+TIMEOUT_ENCERRAR = float(os.environ.get("FILTRO_TIMEOUT_ENCERRAR", "30"))
+
+# Mensagens dos workers para o escritor
+REGISTRO_PLANILHA = "registro"
+CONTAINER = "container"
+BLOQUEIO = "bloqueio"
+FIM = "fim"
+
+
+class _SinkFila:
+    """
+    Lado do worker do PlanilhaSink: manda o registro para o escritor.
+    Telefones repetidos são descartados lá (o container vira PULADO).
+    """
+
+    def __init__(self, fila, url):
+        self.fila = fila
+        self.url = url
+
+    def adicionar(self, registro) -> bool:
+        self.fila.put((REGISTRO_PLANILHA, self.url, registro))
+        return True
+
+
+class _ProgressoFila:
+    """
+    Lado do worker do JournalProgresso: consulta os estados enviados com a
+    tarefa e manda os novos estados para o escritor.
+    """
+
+    def __init__(self, fila, estados):
+        self.fila = fila
+        self.estados = estados
+
+    def estado_container(self, url, chave):
+        return self.estados.get(str(chave))
+
+    def registrar_container(self, url, chave, estado, aguardar_flush=False):
+        self.fila.put((CONTAINER, url, str(chave), estado, aguardar_flush))
+
+
+class _Worker:
+    """
+    Um processo de extração, a fila de tarefas só dele e as URLs que o
+    escritor entregou a ele e que ainda não voltaram (FIM/BLOQUEIO), na
+    ordem de entrega: a fila é FIFO, então a primeira é a que está em
+    processamento.
+    """
+    __slots__ = ("processo", "fila", "urls")
+
+    def __init__(self, processo, fila):
+        self.processo = processo
+        self.fila = fila
+        self.urls = collections.deque()
+
+
+def _sair(signum, frame):
+    # SIGTERM vira SystemExit: o finally do worker fecha o navegador
+    raise SystemExit(0)
+
+
+def _trabalhador(numero, fila_links, fila_saida, perfil):
+    """
+    Processo de extração: consome (url, somente, estados) até receber None.
+    O navegador é reciclado pelo supervisor (memória/páginas); se ele morrer
+    no meio de uma URL, ela volta para a fila como BLOQUEIO com motivo CAIU.
+    Um SIGTERM do escritor também passa pelo finally e fecha o navegador.
+    """
+    signal.signal(signal.SIGTERM, _sair)
+    driver = None
+    supervisor = Supervisor(nome=f"filtro-{numero}")
+    try:
+        while True:
+            tarefa = fila_links.get()
+            if tarefa is None:
+                break
+            url, somente, estados = tarefa
+            ok = False
+            try:
+                if driver is None or not driver_saudavel(driver):
+                    if driver is not None:
+                        supervisor.encerrar(driver, CAIU)
+                    driver = criar_driver(perfil)
+                    supervisor.anotar(driver)
+                with metrics.CARREGAMENTO_PAGINA.cronometrar(pagina="perfil"):
+                    driver.get(url)
+                motivo = detectar_bloqueio(driver)
+                if motivo == CONSENTIMENTO and resolver_consentimento(driver):
+                    driver.get(url)
+                    motivo = detectar_bloqueio(driver)
+                if motivo is None:
+                    ok = process_profiles(
+                        driver, _SinkFila(fila_saida, url), _ProgressoFila(fila_saida, estados),
+                        url, somente
+                    )
+                    medir_pagina(driver, "perfil")
+                    if not ok:
+                        motivo = detectar_bloqueio(driver)
+            except Exception as e:
+                logger.error(f"[worker {numero}] Erro ao acessar {url}: {e}")
+                motivo = detectar_bloqueio(driver) if driver is not None else None
+            if not ok and driver is not None and not driver_saudavel(driver):
+                supervisor.encerrar(driver, CAIU)
+                driver, motivo = None, CAIU
+            if motivo:
+                # O escritor devolve a URL para a fila; esta sessão descansa
+                fila_saida.put((BLOQUEIO, numero, url, motivo))
+                if motivo != CAIU:
+                    time.sleep(QUARENTENA)
+                continue
+            fila_saida.put((FIM, numero, url, ok))
+            motivo = supervisor.verificar(driver) if driver is not None else None
+            if motivo:
+                supervisor.encerrar(driver, motivo)
+                driver = None
+    finally:
+        if driver is not None:
+            supervisor.encerrar(driver)
+        supervisor.logar_relatorio()
+
+
+def run_filter_paralelo(dados_dir, workers=None, retomar=True, apenas_falhas=False):
+    """
+    Mesmo contrato de filterer.run_filter, com `workers` processos de
+    extração (padrão: FILTRO_WORKERS) e um único escritor.
+    """
+    licenca = verificar_em_segundo_plano()
+    workers = max(1, workers or FILTRO_WORKERS)
+
+    if not os.path.exists(dados_dir):
+        logger.error(f"Pasta 'dados' não encontrada em {dados_dir}")
+        return
+
+    indice = IndiceLugares.para_dados(dados_dir)
+    progresso = JournalProgresso.para_dados(dados_dir, retomar=retomar or apenas_falhas)
+    if apenas_falhas:
+        links = iter(progresso.falhas())
+    else:
+        if not retomar:
+            indice.limpar_processados()
+        links = _links_pendentes(dados_dir, indice, progresso)
+
+    primeiro = next(links, None)
+    if primeiro is None:
+        logger.warning("Nenhum link pendente nos arquivos da pasta 'dados'.")
+        progresso.fechar()
+        indice.fechar()
+        return
+    links = itertools.chain([primeiro], links)
+
+    # spawn: os workers não herdam threads nem a conexão SQLite do escritor
+    ctx = multiprocessing.get_context("spawn")
+    fila_saida = ctx.Queue(maxsize=FILA_SAIDA_MAX)
+    perfil = perfil_para("filtro")
+    numeros = itertools.count()
+    trabalhadores = {}         # número -> _Worker (cada substituto ganha um número novo)
+
+    def _iniciar():
+        numero = next(numeros)
+        fila = ctx.Queue(maxsize=LINKS_POR_WORKER)
+        p = ctx.Process(target=_trabalhador, args=(numero, fila, fila_saida, perfil),
+                        name=f"filtro-{numero}", daemon=True)
+        p.start()
+        trabalhadores[numero] = _Worker(p, fila)
+
+    def _encerrar_trabalhadores():
+        # None na fila de cada um: o worker termina a tarefa atual e fecha
+        # o navegador pelo supervisor; SIGTERM só para quem não responder
+        for t in trabalhadores.values():
+            try:
+                t.fila.put(None, timeout=5)
+            except queue.Full:
+                pass
+        for t in trabalhadores.values():
+            t.processo.join(timeout=TIMEOUT_ENCERRAR)
+            if t.processo.is_alive():
+                t.processo.terminate()
+                t.processo.join(timeout=TIMEOUT_ENCERRAR)
+        limpar_orfaos()
+
+    # Os processos sobem enquanto o painel responde
+    for _ in range(workers):
+        _iniciar()
+    if not liberado(licenca):
+        _encerrar_trabalhadores()
+        progresso.fechar()
+        indice.fechar()
+        return
+    logger.info(f"🧵 Filtro com {workers} processos de extração.")
+
+    # Concorrência e ritmo de envio ajustados pelos bloqueios (AIMD)
+    ritmo = ControladorTaxa(workers)
+    reenviar = collections.deque()
+    tentativas = collections.Counter()
+    bloqueios = collections.Counter()
+    telefone_repetido = set()  # URLs cujo último registro foi descartado
+    fonte_esgotada = False
+    containers = quedas = quedas_seguidas = 0
+    inicio = time.monotonic()
+
+    def _tarefa(url):
+        somente = None
+        if apenas_falhas and progresso.estado_url(url) != FALHOU:
+            somente = progresso.containers_com_falha(url)
+        return url, somente, progresso.estados_containers(url)
+
+    try:
+        with PlanilhaSink(os.path.join(dados_dir, "informacoes.xlsx"), indice=indice) as sink:
+            sink.ao_flush = _ao_flush(progresso, indice)
+            while True:
+                # Fonte: entrega links ao worker menos ocupado (sem ler tudo)
+                while reenviar or not fonte_esgotada:
+                    livres = [t for t in trabalhadores.values() if len(t.urls) < LINKS_POR_WORKER]
+                    if not livres or not ritmo.tentar_iniciar():
+                        break
+                    if reenviar:
+                        url = reenviar[0]
+                    else:
+                        url = next(links, None)
+                        if url is None:
+                            fonte_esgotada = True
+                            ritmo.terminar()
+                            break
+                        reenviar.append(url)
+                    destino = min(livres, key=lambda t: len(t.urls))
+                    try:
+                        destino.fila.put_nowait(_tarefa(url))
+                    except queue.Full:
+                        ritmo.terminar()
+                        break
+                    reenviar.popleft()
+                    destino.urls.append(url)
+
+                if (fonte_esgotada and not reenviar
+                        and not any(t.urls for t in trabalhadores.values())):
+                    break
+
+                # Escritor: aplica as mensagens dos workers; sem mensagem, o
+                # lote parado no buffer ainda vai para o disco por tempo
+                try:
+                    mensagem = fila_saida.get(timeout=0.5)
+                except queue.Empty:
+                    mensagem = None
+                    sink.flush_se_vencido()
+                if mensagem:
+                    tipo = mensagem[0]
+                    if tipo == REGISTRO_PLANILHA:
+                        _, url, registro = mensagem
+                        if sink.adicionar(registro):
+                            telefone_repetido.discard(url)
+                        else:
+                            telefone_repetido.add(url)
+                    elif tipo == CONTAINER:
+                        _, url, chave, estado, aguardar_flush = mensagem
+                        if estado == CONCLUIDO and url in telefone_repetido:
+                            telefone_repetido.discard(url)
+                            estado, aguardar_flush = PULADO, False
+                            metrics.PULADOS.inc(motivo="telefone_repetido")
+                        progresso.registrar_container(url, chave, estado, aguardar_flush)
+                        metrics.PERFIS_PROCESSADOS.inc(estado=estado)
+                        metrics.PERFIS_POR_MINUTO.registrar()
+                        containers += 1
+                    elif tipo in (FIM, BLOQUEIO):
+                        _, numero, url, resultado = mensagem
+                        dono = trabalhadores.get(numero)
+                        if dono is None or url not in dono.urls:
+                            # Worker já dado como morto: a URL voltou para a fila
+                            continue
+                        dono.urls.remove(url)
+                        quedas_seguidas = 0
+                        ritmo.terminar()
+                        motivo = resultado if tipo == BLOQUEIO else None
+                        if motivo and motivo not in (CONSENTIMENTO, CAIU):
+                            ritmo.bloqueio(motivo)
+                        elif tipo == FIM and resultado:
+                            ritmo.sucesso()
+                        if motivo:
+                            bloqueios[url] += 1
+                            if bloqueios[url] < RODADAS_MAX:
+                                reenviar.append(url)
+                            else:
+                                _registrar_url(sink, progresso, indice, url, False,
+                                               f"bloqueio: {motivo}")
+                        else:
+                            _registrar_url(sink, progresso, indice, url, resultado,
+                                           "sem containers")
+
+                # Workers que caíram: devolve as URLs entregues a eles (a
+                # primeira estava em processamento e conta como tentativa),
+                # libera as vagas do ritmo e sobe outro no lugar
+                for numero, t in list(trabalhadores.items()):
+                    if t.processo.is_alive():
+                        continue
+                    del trabalhadores[numero]
+                    quedas += 1
+                    quedas_seguidas += 1
+                    metrics.ERROS.inc(etapa="worker_filtro", motivo=f"exit_{t.processo.exitcode}")
+                    logger.error(f"💥 Worker {numero} caiu (exit {t.processo.exitcode}) "
+                                 f"com {len(t.urls)} URLs.")
+                    for i, url in enumerate(t.urls):
+                        ritmo.terminar()
+                        if i == 0:
+                            tentativas[url] += 1
+                            if tentativas[url] >= TENTATIVAS_URL:
+                                _registrar_url(sink, progresso, indice, url, False, "worker caiu")
+                                continue
+                        reenviar.append(url)
+                    # Firefox/geckodriver do worker morto
+                    limpar_orfaos()
+                    if quedas_seguidas > QUEDAS_SEGUIDAS_MAX:
+                        raise RuntimeError("Workers do filtro caindo em sequência.")
+                    _iniciar()
+    finally:
+        _encerrar_trabalhadores()
+        progresso.fechar()
+        indice.fechar()
+
+    duracao = time.monotonic() - inicio
+    REGISTRO.logar_resumo()
+    logger.info(
+        f"🏁 Filtro paralelo concluído: {containers} containers em {duracao:.0f}s "
+        f"({containers * 3600 / max(duracao, 1e-9):.0f}/hora, {workers} workers, "
+        f"{quedas} quedas)."
+    )
@@ -5,20 +5,29 @@
 # -------------------------------------------------------------------
 
 import os
-import sys
+import re
 import time
+import itertools
 import logging
-import re
-import requests
-from selenium import webdriver
-from selenium.webdriver.firefox.service import Service
-from selenium.webdriver.firefox.options import Options
-from webdriver_manager.firefox import GeckoDriverManager
+from datetime import date
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Alignment, Border, Side
+from waits import (
+    esperar, elemento_presente, elemento_clicavel,
+    texto_atual, texto_mudou, REGISTRO
+)
+from excel_sink import PlanilhaSink
+import metrics
+from browser_pool import criar_driver, driver_saudavel
+from supervisor import Supervisor, CAIU
+from lean_profile import perfil_para, medir_pagina, logar_consumo
+from instrumented_driver import contexto, logar_resumo_do_processo
+from licenca import verificar_em_segundo_plano, liberado
+from rate_control import ControladorTaxa, detectar_bloqueio, RODADAS_MAX
+from place_index import IndiceLugares, extrair_place_id
+from extraction import extrair_registro
+from multitab import ProcessadorAbas, ABAS_FILTRO
+from checkpoint import JournalProgresso, iterar_links, CONCLUIDO, PULADO, FALHOU
 
 # -------------------------------------------------------------
 # Configuração de logging
@@ -30,48 +39,98 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # -------------------------------------------------------------
-# URL do painel remoto (vai buscar em variável de ambiente)
+# Seletores e timeouts (segundos) de cada etapa de espera
 # -------------------------------------------------------------
-PAINEL_URL = os.environ.get("PAINEL_URL", "https://painel-api-k2v2.onrender.com/command")
+# Painel do lugar aberto: o último role=main que não é a lista de
+# resultados (mesma regra de extraction.SELETOR_PAINEL). As buscas abaixo
+# ficam dentro dele para não ler a data/Street View de outro container.
+XPATH_PAINEL = "(//div[@role='main'][not(.//*[@role='feed'])])[last()]"
+XPATH_DATA_ATUALIZACAO = XPATH_PAINEL + "//div[contains(@class, 'lchoPb') or contains(@class, 'mqX5ad')]"
+XPATH_STREET_VIEW = XPATH_PAINEL + "//div[contains(@class, 'ilzTS')]"
+XPATH_BOTAO_TELEFONE = XPATH_PAINEL + '//button[@class="CsEnBe" and contains(@aria-label, "Telefone:")]'
+TIMEOUT_ELEMENTO = 10
+TIMEOUT_CLIQUE = 5
+TIMEOUT_PERFIL = 5
+# Processos de extração do run_filter (> 1 usa filter_pipeline.py)
+FILTRO_WORKERS = int(os.environ.get("FILTRO_WORKERS", "1"))
 
-def get_mac():
+# -------------------------------------------------------------
+# Data de atualização ("Atualizado pelo proprietário - abr. de 2025")
+# -------------------------------------------------------------
+MESES = {
+    'jan': 1, 'fev': 2, 'mar': 3, 'abr': 4, 'mai': 5, 'jun': 6,
+    'jul': 7, 'ago': 8, 'set': 9, 'out': 10, 'nov': 11, 'dez': 12
+}
+RE_DATA = re.compile(r"\b(" + "|".join(MESES) + r")\b\.?(?:\s+de\s+(\d{4}))?", re.IGNORECASE)
+MESES_DESATUALIZADO = 3
+
+def parse_data_atualizacao(texto, hoje=None):
     """
-    Retorna o endereço MAC principal do sistema (igual a scanner.get_mac).
+    Converte o texto de atualização em date (dia 1 do mês). Sem ano,
+    assume o ano corrente. Retorna None se não houver mês reconhecível.
     """
-    try:
-        if sys.platform.startswith("win"):
-            import subprocess
-            output = subprocess.check_output("getmac", encoding="cp1252", errors="ignore")
-            macs = re.findall(r"([0-9A-Fa-f]{2}[-:]){5}[0-9A-Fa-f]{2}", output)
-            return macs[0].replace("-", ":").lower() if macs else None
-        else:
-            import subprocess
-            output = subprocess.check_output("ifconfig", encoding="utf-8", errors="ignore")
-            macs = re.findall(r"([0-9A-Fa-f]{2}[:]){5}[0-9A-Fa-f]{2}", output)
-            return macs[0].lower() if macs else None
-    except Exception as e:
-        logger.error(f"Erro ao obter MAC: {e}")
+    hoje = hoje or date.today()
+    m = RE_DATA.search(texto.split(" - ", 1)[-1])
+    if not m:
         return None
+    ano = int(m.group(2)) if m.group(2) else hoje.year
+    return date(ano, MESES[m.group(1).lower()], 1)
 
-def verificar_liberacao(mac, tentativas=3, intervalo=2) -> bool:
+def data_limite(hoje=None):
     """
-    Mesmo comportamento que em scanner.verificar_liberacao.
+    Primeiro dia do mês de `MESES_DESATUALIZADO` meses atrás.
     """
-    for tentativa in range(1, tentativas + 1):
-        try:
-            ip = requests.get("https://api.ipify.org", timeout=5).text
-            r = requests.get(PAINEL_URL, params={"mac": mac, "public_ip": ip}, timeout=10)
-            r.raise_for_status()
-            return r.json().get("ativo", False)
-        except Exception as e:
-            logger.error(f"Tentativa {tentativa}/{tentativas} falhou: {e}")
-            if tentativa < tentativas:
-                time.sleep(intervalo)
-    return False
+    hoje = hoje or date.today()
+    total = hoje.year * 12 + hoje.month - 1 - MESES_DESATUALIZADO
+    return date(total // 12, total % 12 + 1, 1)
+
+# -------------------------------------------------------------
+# Pré-filtro da lista: lê os metadados visíveis de todos os
+# containers em uma única chamada e decide quais precisam de clique
+# -------------------------------------------------------------
+ABRIR_E_SALVAR = "abrir_e_salvar"        # data antiga: abre e salva direto
+ABRIR_E_VERIFICAR = "abrir_e_verificar"  # sem metadados: abre e chama data_check
+
+JS_METADADOS_CONTAINERS = """
+return Array.prototype.map.call(document.getElementsByClassName('ofKBgf'), function (c) {
+  var data = c.querySelector('.lchoPb, .mqX5ad');
+  var sv = c.querySelector('.ilzTS');
+  var img = c.querySelector('.DaSXdd');
+  var link = c.querySelector('a[href]');
+  return {
+    data: data ? data.textContent.trim() : null,
+    street_view: !!(sv && sv.textContent.indexOf('Google Street View') >= 0),
+    id: c.getAttribute('aria-label') || (link && link.href) || (img && img.getAttribute('alt')) || null
+  };
+});
+"""
+
+def classificar_containers(metadados, hoje=None):
+    """
+    Classifica os containers pelos metadados da lista. Retorna uma lista
+    (decisão, motivo) na mesma ordem: PULADO ("street_view" ou
+    "atualizado_recentemente"), ABRIR_E_SALVAR ou ABRIR_E_VERIFICAR.
+    """
+    limite = data_limite(hoje)
+    decisoes = []
+    for meta in metadados:
+        if meta.get("street_view"):
+            decisoes.append((PULADO, "street_view"))
+            continue
+        data = parse_data_atualizacao(meta["data"], hoje) if meta.get("data") else None
+        if data is None:
+            decisoes.append((ABRIR_E_VERIFICAR, None))
+        elif data >= limite:
+            decisoes.append((PULADO, "atualizado_recentemente"))
+        else:
+            decisoes.append((ABRIR_E_SALVAR, None))
+    return decisoes
 
-def salvar_infor(driver, informacoes_path):
+def salvar_infor(driver, sink):
     """
-    Extrai dados do perfil atual (já aberto no driver) e salva em Excel:
+    Extrai dados do perfil atual (já aberto no driver) com um único
+    snapshot do DOM (extraction.SELETORES) e envia ao `sink` (PlanilhaSink),
+    que grava em lote no Excel:
       - Nome
       - Telefone
       - Estrelas
@@ -80,78 +139,24 @@ def salvar_infor(driver, informacoes_path):
       - Nicho (botões de categoria)
       - Data da última atualização
       - Link
+    Retorna CONCLUIDO, PULADO (telefone repetido) ou FALHOU.
     """
     try:
-        wait = WebDriverWait(driver, 10)
-        elemento_data = wait.until(EC.presence_of_element_located((By.XPATH,
-            "//div[contains(@class, 'lchoPb') or contains(@class', 'mqX5ad')]")))
-        data_atualizacao = elemento_data.text.strip()
-        link_atual = driver.current_url
-
         driver.find_element(By.CLASS_NAME, "fKm1Mb").click()
-        time.sleep(4)
-
-        numero_texto = wait.until(EC.presence_of_element_located(
-            (By.XPATH, '//button[@class="CsEnBe" and contains(@aria-label, "Telefone:")]'))
-        ).find_element(By.CLASS_NAME, "Io6YTe").text.strip()
-
-        estrelas_texto = driver.find_element(By.CSS_SELECTOR, "div.fontDisplayLarge").text
-        avaliacoes = wait.until(EC.visibility_of_element_located(
-            (By.XPATH, "//span[contains(text(),'avaliações')]")
-        )).text
-
-        h1 = wait.until(EC.visibility_of_element_located((By.TAG_NAME, "h1")))
-        texto_completo = h1.text
-        nome = texto_completo.split("–")[0].strip() if "–" in texto_completo else texto_completo
-
-        botoes = driver.find_elements(By.CSS_SELECTOR, 'button.DkEaL')
-        nicho = ", ".join([b.text for b in botoes if b.text.strip()])
-        endereco_texto = driver.find_element(By.CSS_SELECTOR, 'div.Io6YTe').text
-
-        # Definir caminho do Excel em dados/
-        os.makedirs(os.path.dirname(informacoes_path), exist_ok=True)
-        if os.path.exists(informacoes_path):
-            wb = load_workbook(informacoes_path)
-            ws = wb.active
-        else:
-            wb = Workbook()
-            ws = wb.active
-            ws.append([
-                "Nome", "Telefone", "Estrelas", "Avaliações", "Endereço",
-                "Nicho", "Data Última Atualização", "Link"
-            ])
-
-        telefones_existentes = {
-            ws.cell(row=r, column=2).value
-            for r in range(2, ws.max_row + 1)
-        }
-        if numero_texto in telefones_existentes:
-            logger.warning(f"⚠️ Registro com telefone {numero_texto} já existe.")
-            return
-
-        ws.append([
-            nome, numero_texto, estrelas_texto, avaliacoes,
-            endereco_texto, nicho, data_atualizacao, link_atual
-        ])
-
-        thin = Side(border_style="thin", color="CCCCCC")
-        borda = Border(left=thin, right=thin, top=thin, bottom=thin)
-        for row in ws.iter_rows(
-            min_row=1, max_row=ws.max_row, min_col=1, max_col=ws.max_column
-        ):
-            for cell in row:
-                cell.border = borda
-                wrap = False if cell.column == ws.max_column else True
-                cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=wrap)
-
-        for col in ws.columns:
-            mx = max((len(str(c.value)) for c in col if c.value), default=0)
-            ws.column_dimensions[col[0].column_letter].width = mx * 1.2 + 2
-
-        wb.save(informacoes_path)
-        logger.info("✅ Planilha formatada e salva com sucesso!")
+        esperar(driver, elemento_presente(By.XPATH, XPATH_BOTAO_TELEFONE),
+                TIMEOUT_ELEMENTO, "botao_telefone", obrigatorio=True)
+
+        # Um único snapshot do painel; os campos são lidos localmente
+        registro = extrair_registro(driver)
+        if sink.adicionar(registro):
+            logger.info("✅ Registro enfileirado para a planilha.")
+            return CONCLUIDO
+        metrics.PULADOS.inc(motivo="telefone_repetido")
+        return PULADO
     except Exception as e:
         logger.error(f"Erro ao salvar info: {e}")
+        metrics.ERROS.inc(etapa="salvar_infor", motivo=type(e).__name__)
+        return FALHOU
 
 def vericar_street_view(driver):
     """
@@ -159,127 +164,302 @@ def vericar_street_view(driver):
     Retorna False (pulando) ou True (prosseguir).
     """
     try:
-        elem = driver.find_element(By.CLASS_NAME, "ilzTS")
+        elem = driver.find_element(By.XPATH, XPATH_STREET_VIEW)
         if "Google Street View" in elem.text:
             logger.info("✅ Perfil criado pelo Google. Pulando.")
+            metrics.PULADOS.inc(motivo="street_view")
             return False
         return True
     except:
         return True
 
-def data_check(driver, informacoes_path):
+def data_check(driver, sink):
     """
     Pega a data de última atualização do perfil (texto tipo “Atualizado em abr. de 2025”).
     Se for mais antiga que 3 meses a partir de hoje, chama salvar_infor.
+    Retorna o estado do container: CONCLUIDO, PULADO ou FALHOU.
     """
     try:
-        wait = WebDriverWait(driver, 10)
-        texto = wait.until(EC.presence_of_element_located((By.XPATH,
-            "//div[contains(@class, 'lchoPb') or contains(@class, 'mqX5ad')]"))).text.strip()
+        inicio = time.monotonic()
+        texto = esperar(driver, elemento_presente(By.XPATH, XPATH_DATA_ATUALIZACAO),
+                        TIMEOUT_ELEMENTO, "data_atualizacao", obrigatorio=True).text.strip()
 
-        from datetime import datetime, date
-        from dateutil.relativedelta import relativedelta
+        data_perfil = parse_data_atualizacao(texto)
+        if data_perfil is None:
+            raise ValueError(f"data não reconhecida: {texto!r}")
+        metrics.DATA_CHECK.observar(time.monotonic() - inicio)
 
-        agora = datetime.now()
-        meses = {
-            'jan.': 1, 'fev.': 2, 'mar.': 3, 'abr.': 4,
-            'mai.': 5, 'jun.': 6, 'jul.': 7, 'ago.': 8,
-            'set.': 9, 'out.': 10, 'nov.': 11, 'dez.': 12
-        }
-        part = texto.split(" - ")
-        data_str = part[1].lower() if len(part) > 1 else texto.lower()
-        m_nome, _, a_str = data_str.partition(" de ")
-        mes = meses.get(m_nome.strip())
-        ano = int(a_str.strip()) if a_str else agora.year
-        data_perfil = date(ano, mes, 1)
-        data_limite = date(agora.year, agora.month, 1) - relativedelta(months=3)
-
-        if data_perfil >= data_limite:
+        if data_perfil >= data_limite():
             logger.info("✅ Perfil atualizado nos últimos 3 meses.")
-        else:
-            logger.warning("⚠️ Perfil desatualizado há mais de 3 meses. Salvando...")
-            salvar_infor(driver, informacoes_path)
+            metrics.PULADOS.inc(motivo="atualizado_recentemente")
+            return PULADO
+        logger.warning("⚠️ Perfil desatualizado há mais de 3 meses. Salvando...")
+        return salvar_infor(driver, sink)
     except Exception as e:
         logger.error(f"Erro data_check: {e}")
+        metrics.ERROS.inc(etapa="data_check", motivo=type(e).__name__)
         if vericar_street_view(driver):
-            salvar_infor(driver, informacoes_path)
+            return salvar_infor(driver, sink)
+        return PULADO
 
-def process_profiles(driver, informacoes_path):
+def process_profiles(driver, sink, progresso=None, url=None, somente=None):
     """
-    Para cada link de perfil que já está aberto no driver,
-    clica na imagem do container, chama data_check e possivelmente salva.
+    Para cada link de perfil que já está aberto no driver, lê os metadados
+    de todos os containers de uma vez (classificar_containers) e só clica
+    nos que precisam: data antiga vai direto para salvar_infor, sem data
+    visível passa por data_check; recentes e Street View são pulados.
+    Com `progresso` (JournalProgresso), containers já concluídos/pulados são
+    ignorados e o estado de cada um é registrado; `somente` restringe a
+    execução às chaves de container informadas.
+    Retorna False se nenhum container foi encontrado. Os comandos do
+    navegador ficam no contexto ("perfil", url) do trace (TRACE_DRIVER).
     """
-    try:
-        containers = WebDriverWait(driver, 10).until(
-            EC.presence_of_all_elements_located((By.CLASS_NAME, "ofKBgf"))
-        )
-        logger.info(f"🔍 Encontrados {len(containers)} containers.")
-        for cont in containers:
-            try:
-                img = cont.find_element(By.CLASS_NAME, "DaSXdd")
-                driver.execute_script("arguments[0].scrollIntoView({block:'center'})", img)
-                time.sleep(0.5)
-                img.click()
-                time.sleep(1)
-                data_check(driver, informacoes_path)
-            except Exception as e:
-                logger.warning(f"Erro ao processar container: {e}")
-                continue
-    except Exception as e:
-        logger.error(f"Nenhum container encontrado: {e}")
+    with contexto("perfil", url or driver.current_url):
+        try:
+            containers = esperar(driver, EC.presence_of_all_elements_located((By.CLASS_NAME, "ofKBgf")),
+                                 TIMEOUT_ELEMENTO, "containers", obrigatorio=True)
+            logger.info(f"🔍 Encontrados {len(containers)} containers.")
+            metadados = driver.execute_script(JS_METADADOS_CONTAINERS) or []
+            decisoes = classificar_containers(metadados)
+            decisoes += [(ABRIR_E_VERIFICAR, None)] * (len(containers) - len(decisoes))
+            pulados = sum(1 for decisao, _ in decisoes if decisao == PULADO)
+            logger.info(
+                f"🧮 Pré-filtro: {pulados}/{len(containers)} containers pulados sem clique "
+                f"({pulados * 100 / max(1, len(containers)):.0f}%)."
+            )
+            for chave, (cont, (decisao, motivo)) in enumerate(zip(containers, decisoes)):
+                if somente is not None and str(chave) not in somente:
+                    continue
+                if progresso and progresso.estado_container(url, chave) in (CONCLUIDO, PULADO):
+                    continue
+                metrics.PRE_FILTRO.inc(decisao=decisao)
+                if decisao == PULADO:
+                    logger.info(f"⏭️ Container {chave} ({metadados[chave].get('id')}): {motivo}.")
+                    metrics.PULADOS.inc(motivo=motivo)
+                    metrics.PERFIS_PROCESSADOS.inc(estado=PULADO)
+                    if progresso:
+                        progresso.registrar_container(url, chave, PULADO)
+                    continue
+                estado = FALHOU
+                inicio = time.monotonic()
+                try:
+                    img = cont.find_element(By.CLASS_NAME, "DaSXdd")
+                    driver.execute_script("arguments[0].scrollIntoView({block:'center'})", img)
+                    esperar(driver, elemento_clicavel(img), TIMEOUT_CLIQUE, "container_clicavel")
+                    titulo_anterior = texto_atual(driver, By.TAG_NAME, "h1")
+                    img.click()
+                    esperar(driver, texto_mudou(By.TAG_NAME, "h1", titulo_anterior),
+                            TIMEOUT_PERFIL, "abrir_perfil")
+                    if decisao == ABRIR_E_SALVAR:
+                        estado = salvar_infor(driver, sink)
+                    else:
+                        estado = data_check(driver, sink)
+                except Exception as e:
+                    logger.warning(f"Erro ao processar container: {e}")
+                    metrics.ERROS.inc(etapa="container", motivo=type(e).__name__)
+                metrics.CONTAINER.observar(time.monotonic() - inicio)
+                metrics.PERFIS_PROCESSADOS.inc(estado=estado)
+                metrics.PERFIS_POR_MINUTO.registrar()
+                if progresso:
+                    # Registros salvos só contam depois que o lote for gravado
+                    progresso.registrar_container(url, chave, estado,
+                                                  aguardar_flush=estado == CONCLUIDO)
+            return True
+        except Exception as e:
+            logger.error(f"Nenhum container encontrado: {e}")
+            metrics.ERROS.inc(etapa="process_profiles", motivo="sem_containers")
+            return False
 
-def run_filter(dados_dir):
+def _links_pendentes(dados_dir, indice, progresso):
+    """
+    Gera, sem carregar os arquivos inteiros, os links ainda não processados:
+    ignora lugares repetidos, já marcados no índice ou concluídos no journal.
+    """
+    vistos = set()
+    total = pulados = 0
+    for _, url in iterar_links(dados_dir):
+        total += 1
+        place_id = extrair_place_id(url)
+        if (place_id in vistos or indice.processado(url)
+                or progresso.estado_url(url) in (CONCLUIDO, PULADO)):
+            pulados += 1
+            continue
+        vistos.add(place_id)
+        yield url
+    logger.info(f"📇 {total} links lidos, {pulados} já processados ou repetidos.")
+
+def _somente(progresso, url, apenas_falhas):
+    """
+    Em URLs que já falharam antes, as chaves dos containers com falha
+    (None = processar todos).
+    """
+    if apenas_falhas and progresso.estado_url(url) != FALHOU:
+        return progresso.containers_com_falha(url)
+    return None
+
+def _ao_flush(progresso, indice):
+    """
+    Callback do PlanilhaSink: confirma no journal as entradas que esperavam
+    o lote e marca no índice as URLs concluídas entre elas.
+    """
+    def _confirmar():
+        for entrada in progresso.confirmar():
+            if "container" not in entrada and entrada["estado"] == CONCLUIDO:
+                indice.marcar_processado(entrada["url"])
+    return _confirmar
+
+def _registrar_url(sink, progresso, indice, url, ok, motivo):
+    """
+    Marca a URL. Com registros dela ainda no buffer, a marca espera o
+    próximo flush do lote (por tamanho ou tempo, ver _ao_flush): os
+    registros precisam estar no journal antes.
+    """
+    aguardar = sink.pendentes > 0
+    if ok:
+        progresso.registrar_url(url, CONCLUIDO, aguardar_flush=aguardar)
+        if not aguardar:
+            indice.marcar_processado(url)
+    else:
+        progresso.registrar_url(url, FALHOU, motivo=motivo, aguardar_flush=aguardar)
+    sink.flush_se_vencido()
+
+def _filtrar_em_abas(processador, urls, sink, progresso, indice, ritmo, apenas_falhas):
+    """
+    Versão do loop de run_filter com várias abas (multitab.py): cada URL
+    é processada na sua aba enquanto as seguintes carregam nas outras.
+    """
+    def _processar(driver, url):
+        logger.info(f"🔗 Processando: {url}")
+        ok = False
+        try:
+            if detectar_bloqueio(driver) is None:
+                ok = process_profiles(driver, sink, progresso, url,
+                                      _somente(progresso, url, apenas_falhas))
+                medir_pagina(driver, "perfil")
+        except Exception as e:
+            logger.error(f"Erro ao acessar {url}: {e}")
+            metrics.ERROS.inc(etapa="acesso_url", motivo=type(e).__name__)
+        return ok, ritmo.avaliar(driver, vazio=not ok)
+
+    # Páginas de bloqueio/consentimento voltam para a fila
+    bloqueada = lambda resultado: resultado[1] is not None
+    for url, resultado in processador.executar(urls, _processar, bloqueada):
+        if resultado is None:
+            _registrar_url(sink, progresso, indice, url, False, motivo="navegador caiu")
+            continue
+        ok, bloqueio = resultado
+        _registrar_url(sink, progresso, indice, url, ok,
+                       f"bloqueio: {bloqueio}" if bloqueio else "sem containers")
+
+def run_filter(dados_dir, retomar=True, apenas_falhas=False, workers=None, abas=None):
     """
     Ponto de entrada para processamento:
-      - Verifica liberação no painel remoto
-      - Lê todos os arquivos .txt em dados/ (geralmente links.txt)
+      - Verifica liberação no painel remoto (em paralelo com a subida do navegador)
+      - Lê os links dos arquivos .txt em dados/ sob demanda (geralmente links.txt)
       - Para cada URL, abre no Selenium headless e chama process_profiles
       - Salva em dados/informacoes.xlsx
+    O progresso fica em dados/progresso_filtro.jsonl:
+      - `retomar=True` continua de onde a última execução parou
+      - `retomar=False` arquiva o journal, esquece as URLs marcadas como
+        processadas no índice e começa do zero
+      - `apenas_falhas=True` reprocessa só URLs/containers que falharam
+    Com `workers` > 1 (ou FILTRO_WORKERS), roda o pipeline com vários
+    processos de extração e um único escritor (filter_pipeline.py).
+    Com `abas` > 1 (ou ABAS_FILTRO), o navegador único carrega as próximas
+    URLs em outras abas enquanto processa a atual (multitab.py).
     """
-    mac = get_mac()
-    if not mac:
-        logger.error("Não foi possível obter o endereço MAC. Abortando.")
-        return
+    if (workers or FILTRO_WORKERS) > 1:
+        from filter_pipeline import run_filter_paralelo
+        return run_filter_paralelo(dados_dir, workers or FILTRO_WORKERS, retomar, apenas_falhas)
 
-    logger.info("→ Verificando liberação junto ao painel remoto…")
-    if not verificar_liberacao(mac):
-        logger.error("Cliente BLOQUEADO. Abortando.")
-        return
+    licenca = verificar_em_segundo_plano()
 
-    LINKS_PATH = os.path.join(dados_dir, "links.txt")
     INFORMACOES_PATH = os.path.join(dados_dir, "informacoes.xlsx")
 
     if not os.path.exists(dados_dir):
         logger.error(f"Pasta 'dados' não encontrada em {dados_dir}")
         return
 
-    # Lê todos os links de todos os .txt dentro de dados_dir
-    links = []
-    for arquivo in os.listdir(dados_dir):
-        if arquivo.endswith(".txt"):
-            caminho_arquivo = os.path.join(dados_dir, arquivo)
-            with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-                novos_links = [l.strip() for l in f if l.strip()]
-                logger.info(f"📄 {arquivo}: {len(novos_links)} links carregados.")
-                links.extend(novos_links)
-
-    if not links:
-        logger.warning("Nenhum link encontrado nos arquivos da pasta 'dados'.")
+    indice = IndiceLugares.para_dados(dados_dir)
+    progresso = JournalProgresso.para_dados(dados_dir, retomar=retomar or apenas_falhas)
+    if apenas_falhas:
+        links = iter(progresso.falhas())
+    else:
+        if not retomar:
+            indice.limpar_processados()
+        links = _links_pendentes(dados_dir, indice, progresso)
+
+    primeiro = next(links, None)
+    if primeiro is None:
+        logger.warning("Nenhum link pendente nos arquivos da pasta 'dados'.")
+        progresso.fechar()
+        indice.fechar()
         return
 
-    # Configura Selenium Firefox em modo headless
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    service = Service(GeckoDriverManager().install())
-    driver = webdriver.Firefox(service=service, options=options)
-
-    for url in links:
-        logger.info(f"🔗 Acessando: {url}")
-        driver.get(url)
-        time.sleep(5)
-        process_profiles(driver, INFORMACOES_PATH)
+    # Selenium Firefox em modo headless (geckodriver resolvido uma vez só),
+    # reciclado pelo supervisor ao passar do limite de memória ou de páginas
+    perfil = perfil_para("filtro")
+    supervisor = Supervisor(nome="filtro")
+    driver = criar_driver(perfil)
+    supervisor.anotar(driver)
+    ritmo = ControladorTaxa(1)
+    abas = abas or ABAS_FILTRO
+    processador = None
+
+    # O navegador subiu enquanto o painel respondia
+    if not liberado(licenca):
+        supervisor.encerrar(driver)
+        progresso.fechar()
+        indice.fechar()
+        return
 
-    driver.quit()
+    try:
+        with PlanilhaSink(INFORMACOES_PATH, indice=indice) as sink:
+            sink.ao_flush = _ao_flush(progresso, indice)
+            urls = itertools.chain([primeiro], links)
+            if abas > 1:
+                processador = ProcessadorAbas(driver, abas, ritmo=ritmo, supervisor=supervisor,
+                                              fabrica=lambda: criar_driver(perfil))
+                _filtrar_em_abas(processador, urls, sink, progresso, indice, ritmo, apenas_falhas)
+            else:
+                for url in urls:
+                    # Em URLs que já falharam antes, tenta só os containers com falha
+                    somente = _somente(progresso, url, apenas_falhas)
+                    logger.info(f"🔗 Acessando: {url}")
+                    # Páginas de bloqueio/consentimento: quarentena e nova tentativa
+                    for _ in range(RODADAS_MAX):
+                        ritmo.aguardar_sessao(driver)
+                        with ritmo.permissao():
+                            ok = False
+                            try:
+                                with metrics.CARREGAMENTO_PAGINA.cronometrar(pagina="perfil"):
+                                    driver.get(url)
+                                if detectar_bloqueio(driver) is None:
+                                    ok = process_profiles(driver, sink, progresso, url, somente)
+                                    medir_pagina(driver, "perfil")
+                            except Exception as e:
+                                logger.error(f"Erro ao acessar {url}: {e}")
+                                metrics.ERROS.inc(etapa="acesso_url", motivo=type(e).__name__)
+                            if not ok and not driver_saudavel(driver):
+                                # O navegador morreu no meio da URL: refaz em um novo
+                                driver = supervisor.reciclar(driver, lambda: criar_driver(perfil), CAIU)
+                                bloqueio = None
+                                continue
+                            bloqueio = ritmo.avaliar(driver, vazio=not ok)
+                        if not bloqueio:
+                            break
+                    _registrar_url(sink, progresso, indice, url, ok,
+                                   f"bloqueio: {bloqueio}" if bloqueio else "sem containers")
+                    motivo = supervisor.verificar(driver)
+                    if motivo:
+                        driver = supervisor.reciclar(driver, lambda: criar_driver(perfil), motivo)
+    finally:
+        # O processador de abas pode ter reciclado o navegador
+        supervisor.encerrar(processador.driver if processador else driver)
+        progresso.fechar()
+        indice.fechar()
+    REGISTRO.logar_resumo()
+    supervisor.logar_relatorio()
+    logar_resumo_do_processo()
+    logar_consumo("perfil", perfil)
     logger.info("🏁 Automação de filtragem concluída!")
@@ -0,0 +1,413 @@
+# -------------------------------------------------------------------
+# http_backend.py
+# -------------------------------------------------------------------
+# Caminho rápido sem navegador: busca as páginas de pesquisa e de
+# lugar do Maps com um requests.Session compartilhado e lê os dados
+# embutidos em window.APP_INITIALIZATION_STATE. As páginas seguintes da
+# lista vêm do endpoint que o Maps chama ao rolar (/search?tbm=map).
+# Devolve o mesmo formato do caminho Selenium (conjunto de links) e
+# levanta FalhaParser para o chamador cair no Selenium. As requisições
+# passam pelo mesmo controle de ritmo do Selenium (rate_control.py).
+# Só a coleta de links usa HTTP: os registros do filterer vêm dos
+# containers da página do lugar, que só existem no navegador, então
+# parse_lugar/campos_do_lugar servem para inspecionar respostas salvas.
+#
+# Uso: python http_backend.py resposta.html [url]   (resposta salva)
+# -------------------------------------------------------------------
+
+import os
+import re
+import sys
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote, quote_plus
+import requests
+from requests.adapters import HTTPAdapter
+from extraction import montar_registro
+from rate_control import ControladorTaxa, TRAFEGO_INCOMUM, HTTP_429
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# Configuração (vai buscar em variáveis de ambiente)
+# -------------------------------------------------------------
+# selenium: só navegador | http: só HTTP | auto: HTTP com fallback para Selenium
+MAPS_BACKEND = os.environ.get("MAPS_BACKEND", "selenium")
+MAPS_BASE_URL = os.environ.get("MAPS_BASE_URL", "https://www.google.com/maps")
+HTTP_CONEXOES = int(os.environ.get("HTTP_CONEXOES", "16"))
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "15"))
+# Resultados por página da lista (a embutida e as de /search?tbm=map);
+# uma página cheia indica que há mais resultados
+HTTP_RESULTADOS_POR_PAGINA = int(os.environ.get("HTTP_RESULTADOS_POR_PAGINA", "20"))
+# Teto de resultados que o Maps devolve por busca (para de paginar aí)
+LIMITE_RESULTADOS = int(os.environ.get("MAPS_LIMITE_RESULTADOS", "120"))
+# Parâmetro "pb" das páginas seguintes: {distancia} é a altura do
+# viewport em metros, {lat}/{lng} o centro e {offset} o 1º resultado
+HTTP_PB_PAGINA = os.environ.get(
+    "HTTP_PB_PAGINA",
+    "!4m8!1m3!1d{distancia}!2d{lng}!3d{lat}!3m2!1i1024!2i768!7i{por_pagina}!8i{offset}",
+)
+
+CABECALHOS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"
+    ),
+    "Accept-Language": "pt-BR,pt;q=0.9",
+}
+
+# Onde cada dado fica nos arrays do Maps. O formato não é documentado e
+# muda de tempos em tempos: ajuste aqui (ou via HTTP_INDICES, em JSON)
+# sem mexer no parser.
+INDICES = {
+    # APP_INITIALIZATION_STATE -> texto ")]}'" com os dados
+    "estado_busca": [3, 2],
+    "estado_lugar": [3, 6],
+    # dados da busca -> lista de resultados (o 1º item é cabeçalho)
+    "resultados": [0, 1],
+    # resposta de /search?tbm=map (já decodificada) -> lista de resultados
+    "resultados_pagina": [0, 1],
+    "lugar_no_resultado": [14],
+    # dados do lugar -> array do lugar
+    "lugar_na_pagina": [6],
+    # campos dentro do array do lugar
+    "titulo": [11],
+    "feature_id": [10],
+    "endereco": [39],
+    "telefone": [178, 0, 0],
+    "estrelas": [4, 7],
+    "avaliacoes": [4, 8],
+    "nicho": [13],
+    "data_atualizacao": [180, 0],
+}
+INDICES.update(json.loads(os.environ.get("HTTP_INDICES", "{}")))
+
+RE_ESTADO = re.compile(r"window\.APP_INITIALIZATION_STATE\s*=\s*(.*?);\s*window\.", re.DOTALL)
+RE_VIEWPORT = re.compile(r"@(-?[\d.]+),(-?[\d.]+),([\d.]+)z")
+PREFIXO_XSSI = ")]}'"
+SUFIXO_PAGINA = '/*""*/'
+# Circunferência da Terra em metros (altura do viewport no zoom 0)
+CIRCUNFERENCIA_M = 40075016.686
+
+
+class FalhaParser(Exception):
+    """
+    A resposta não tem o formato esperado (mudou, bloqueio, consentimento).
+    """
+
+
+class Bloqueio(FalhaParser):
+    """
+    Resposta de bloqueio (HTTP 429, /sorry/): além de cair no Selenium,
+    reduz o ritmo das requisições (`motivo` como em rate_control).
+    """
+
+    def __init__(self, motivo, mensagem):
+        super().__init__(mensagem)
+        self.motivo = motivo
+
+
+class ResultadosTruncados(FalhaParser):
+    """
+    A lista tem mais resultados, mas a paginação falhou: o resto só
+    aparece rolando a lista no navegador. `links` são os lidos até a
+    falha e `resultado` o que a tarefa devolveria com eles (padrão: `links`).
+    """
+
+    def __init__(self, links, resultado=None):
+        super().__init__(f"paginação interrompida ({len(links)} links)")
+        self.links = links
+        self.resultado = links if resultado is None else resultado
+
+
+_local = threading.local()
+
+
+def sessao():
+    """
+    Session com pool de conexões (uma por thread, todas com keep-alive).
+    """
+    s = getattr(_local, "sessao", None)
+    if s is None:
+        s = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=HTTP_CONEXOES, pool_maxsize=HTTP_CONEXOES)
+        s.mount("https://", adaptador)
+        s.mount("http://", adaptador)
+        s.headers.update(CABECALHOS)
+        # Evita a página de consentimento na UE
+        s.cookies.set("CONSENT", "YES+", domain=".google.com")
+        _local.sessao = s
+    return s
+
+
+def _baixar(url, pagina):
+    with metrics.CARREGAMENTO_PAGINA.cronometrar(pagina=f"http_{pagina}"):
+        r = sessao().get(url, timeout=HTTP_TIMEOUT)
+    metrics.BYTES_PAGINA.observar(len(r.content), pagina=pagina, perfil="http")
+    if r.status_code == 429 or "/sorry/" in r.url:
+        motivo = HTTP_429 if r.status_code == 429 else TRAFEGO_INCOMUM
+        raise Bloqueio(motivo, f"HTTP {r.status_code} em {r.url}")
+    if r.status_code != 200 or "consent." in r.url:
+        raise FalhaParser(f"HTTP {r.status_code} em {r.url}")
+    return r.text
+
+
+# -------------------------------------------------------------
+# Parser
+# -------------------------------------------------------------
+def _caminho(dados, caminho):
+    """
+    Percorre `dados` pelos índices de `caminho`; None se algum faltar.
+    """
+    if caminho is None:
+        return None
+    atual = dados
+    for i in caminho:
+        if not isinstance(atual, list) or i >= len(atual) or atual[i] is None:
+            return None
+        atual = atual[i]
+    return atual
+
+
+def _json_xssi(texto):
+    if not isinstance(texto, str):
+        raise FalhaParser("bloco de dados ausente")
+    if texto.startswith(PREFIXO_XSSI):
+        texto = texto[len(PREFIXO_XSSI):]
+    try:
+        return json.loads(texto)
+    except ValueError as e:
+        raise FalhaParser(f"bloco de dados inválido: {e}")
+
+
+def estado_inicial(html):
+    """
+    Extrai e decodifica window.APP_INITIALIZATION_STATE do HTML.
+    """
+    m = RE_ESTADO.search(html)
+    if not m:
+        raise FalhaParser("APP_INITIALIZATION_STATE não encontrado")
+    try:
+        return json.loads(m.group(1))
+    except ValueError as e:
+        raise FalhaParser(f"APP_INITIALIZATION_STATE inválido: {e}")
+
+
+def campos_do_lugar(lugar):
+    """
+    Converte o array de um lugar nos campos de extraction.SELETORES.
+    """
+    estrelas = _caminho(lugar, INDICES["estrelas"])
+    avaliacoes = _caminho(lugar, INDICES["avaliacoes"])
+    nicho = _caminho(lugar, INDICES["nicho"])
+    return {
+        "titulo": _caminho(lugar, INDICES["titulo"]),
+        "telefone": _caminho(lugar, INDICES["telefone"]),
+        "estrelas": f"{estrelas:.1f}".replace(".", ",") if isinstance(estrelas, (int, float)) else None,
+        "avaliacoes": f"{avaliacoes} avaliações" if avaliacoes is not None else None,
+        "endereco": _caminho(lugar, INDICES["endereco"]),
+        "nicho": ", ".join(nicho) if isinstance(nicho, list) else nicho,
+        "data_atualizacao": _caminho(lugar, INDICES["data_atualizacao"]),
+    }
+
+
+def link_do_lugar(lugar):
+    """
+    Link de perfil no mesmo formato do href de "a.hfpxzc".
+    """
+    feature_id = _caminho(lugar, INDICES["feature_id"])
+    titulo = _caminho(lugar, INDICES["titulo"])
+    if not feature_id or not titulo:
+        return None
+    return (
+        f"{MAPS_BASE_URL}/place/{quote(titulo)}"
+        f"/data=!4m2!3m1!1s{feature_id}?hl=pt-BR"
+    )
+
+
+def parse_busca(html):
+    """
+    Lista de arrays de lugar de uma página de pesquisa. Lista vazia é uma
+    busca sem resultados; formato inesperado levanta FalhaParser.
+    """
+    dados = _json_xssi(_caminho(estado_inicial(html), INDICES["estado_busca"]))
+    resultados = _caminho(dados, INDICES["resultados"])
+    if resultados is None:
+        # Busca com um único resultado abre direto a página do lugar
+        lugar = _caminho(dados, INDICES["lugar_na_pagina"])
+        if lugar is None:
+            raise FalhaParser("lista de resultados não encontrada")
+        return [lugar]
+    lugares = [_caminho(r, INDICES["lugar_no_resultado"]) for r in resultados[1:]]
+    return [l for l in lugares if l]
+
+
+def parse_pagina_busca(texto):
+    """
+    Lista de arrays de lugar de uma resposta de /search?tbm=map: um JSON
+    {"c": ..., "d": ")]}'..."} seguido de /*""*/, em que "d" tem os
+    resultados no mesmo formato do bloco da busca.
+    """
+    texto = texto.strip()
+    if texto.endswith(SUFIXO_PAGINA):
+        texto = texto[:-len(SUFIXO_PAGINA)]
+    dados = _json_xssi(texto)
+    if isinstance(dados, dict):
+        dados = _json_xssi(dados.get("d"))
+    resultados = _caminho(dados, INDICES["resultados_pagina"])
+    if resultados is None:
+        # Passou do último resultado
+        return []
+    lugares = [_caminho(r, INDICES["lugar_no_resultado"]) for r in resultados[1:]]
+    return [l for l in lugares if l]
+
+
+def parse_lugar(html):
+    """
+    Array do lugar de uma página /maps/place/.
+    """
+    dados = _json_xssi(_caminho(estado_inicial(html), INDICES["estado_lugar"]))
+    lugar = _caminho(dados, INDICES["lugar_na_pagina"])
+    if lugar is None:
+        raise FalhaParser("dados do lugar não encontrados")
+    return lugar
+
+
+# -------------------------------------------------------------
+# Mesmo contrato do caminho Selenium
+# -------------------------------------------------------------
+def url_busca(busca, viewport=None):
+    sufixo = f"/{viewport}" if viewport else ""
+    return f"{MAPS_BASE_URL}/search/{quote_plus(busca)}{sufixo}?hl=pt-BR"
+
+
+def url_pagina_busca(busca, viewport, offset):
+    """
+    URL da página da lista que começa em `offset` (o que o Maps pede ao
+    rolar a lista até o fim).
+    """
+    pb = ""
+    m = RE_VIEWPORT.match(viewport or "")
+    if m:
+        lat, lng, zoom = (float(v) for v in m.groups())
+        pb = HTTP_PB_PAGINA.format(
+            distancia=round(CIRCUNFERENCIA_M / 2 ** zoom, 1), lat=f"{lat:.7f}", lng=f"{lng:.7f}",
+            por_pagina=HTTP_RESULTADOS_POR_PAGINA, offset=offset,
+        )
+    origem = MAPS_BASE_URL.rsplit("/maps", 1)[0]
+    return f"{origem}/search?tbm=map&hl=pt-BR&q={quote_plus(busca)}&pb={quote(pb, safe='!')}"
+
+
+def _contar_links(links):
+    metrics.LINKS_COLETADOS.inc(len(links))
+    metrics.LINKS_POR_MINUTO.registrar(len(links))
+
+
+def buscar_links(busca, viewport=None):
+    """
+    Equivalente HTTP de scanner.coletar_links_por_busca: conjunto de links
+    de perfil da busca (`viewport` no formato "@lat,lng,zoomz"). A página
+    de pesquisa traz os primeiros HTTP_RESULTADOS_POR_PAGINA resultados;
+    enquanto as páginas vierem cheias, pede as seguintes (até
+    LIMITE_RESULTADOS, como o Selenium rolando a lista). Se uma delas
+    falhar, levanta ResultadosTruncados com os links lidos até ali.
+    """
+    lugares = parse_busca(_baixar(url_busca(busca, viewport), "busca"))
+    links = {l for l in map(link_do_lugar, lugares) if l}
+    if lugares and not links:
+        raise FalhaParser("resultados sem feature id/título")
+    total, pagina = len(lugares), len(lugares)
+    while pagina >= HTTP_RESULTADOS_POR_PAGINA and total < LIMITE_RESULTADOS:
+        try:
+            lugares = parse_pagina_busca(
+                _baixar(url_pagina_busca(busca, viewport, total), "busca_pagina")
+            )
+        except Bloqueio:
+            raise
+        except (FalhaParser, requests.RequestException) as e:
+            logger.debug(f"Paginação de '{busca}' falhou no offset {total}: {e}")
+            raise ResultadosTruncados(links)
+        pagina = len(lugares)
+        total += pagina
+        links.update(l for l in map(link_do_lugar, lugares) if l)
+    _contar_links(links)
+    return links
+
+
+def executar_http(itens, tarefa, falhas, conexoes=HTTP_CONEXOES, controlador=None,
+                  aceitar_truncados=None):
+    """
+    Como browser_pool.executar_em_paralelo, mas sem navegador: chama
+    `tarefa(item)` em até `conexoes` threads e gera (item, resultado).
+    Cada requisição passa pelo `controlador` (ControladorTaxa; padrão: um
+    novo com `conexoes` vagas): respostas de Bloqueio reduzem concorrência
+    e ritmo e põem a sessão da thread em quarentena.
+    Itens cuja resposta não pôde ser lida vão para a lista `falhas`
+    (para o chamador repetir no Selenium). Buscas truncadas também, a
+    não ser com `aceitar_truncados` (padrão: quando não há fallback),
+    em que entram só com os links lidos antes da falha da paginação.
+    """
+    controlador = controlador or ControladorTaxa(conexoes)
+    if aceitar_truncados is None:
+        aceitar_truncados = not com_fallback()
+
+    def _executar(item):
+        controlador.aguardar_sessao(sessao())
+        with controlador.permissao():
+            try:
+                resultado = tarefa(item)
+            except Bloqueio as e:
+                controlador.bloqueio(e.motivo, sessao())
+                raise
+            except ResultadosTruncados:
+                controlador.sucesso()
+                raise
+            controlador.sucesso()
+            return resultado
+
+    with ThreadPoolExecutor(max_workers=conexoes) as executor:
+        futuros = {executor.submit(_executar, item): item for item in itens}
+        for futuro in as_completed(futuros):
+            item = futuros[futuro]
+            try:
+                yield item, futuro.result()
+            except ResultadosTruncados as e:
+                metrics.ERROS.inc(etapa="http", motivo="truncado")
+                if aceitar_truncados:
+                    logger.warning(f"⚠️ '{item}': resultados incompletos pelo HTTP ({e}).")
+                    _contar_links(e.links)
+                    yield item, e.resultado
+                else:
+                    falhas.append(item)
+            except (FalhaParser, requests.RequestException) as e:
+                metrics.ERROS.inc(etapa="http", motivo=type(e).__name__)
+                logger.warning(f"⚠️ Caminho HTTP falhou para '{item}': {e}")
+                falhas.append(item)
+
+
+def usar_http(backend=None):
+    """
+    True se o backend ("selenium", "http" ou "auto") tenta HTTP primeiro.
+    """
+    return (backend or MAPS_BACKEND) in ("http", "auto")
+
+
+def com_fallback(backend=None):
+    """
+    True se as falhas do caminho HTTP devem ser refeitas no Selenium.
+    """
+    return (backend or MAPS_BACKEND) == "auto"
+
+
+if __name__ == "__main__":
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        html = f.read()
+    if len(sys.argv) > 2 and "/maps/place/" in sys.argv[2]:
+        registro = montar_registro(campos_do_lugar(parse_lugar(html)), sys.argv[2])
+        print(json.dumps(registro, ensure_ascii=False, indent=2))
+    else:
+        for lugar in parse_busca(html):
+            print(json.dumps({"link": link_do_lugar(lugar), **campos_do_lugar(lugar)},
+                             ensure_ascii=False))
@@ -0,0 +1,578 @@
+# -------------------------------------------------------------------
+# instrumented_driver.py
+# -------------------------------------------------------------------
+# Instrumentação dos comandos WebDriver: um proxy na frente do
+# command_executor do Selenium registra cada round trip ao geckodriver
+# (find_element, .text, get_attribute, execute_script, ...) com nome,
+# seletor, latência e tamanho do payload em um trace JSONL, agrupado
+# por contexto (keyword do scanner, perfil do filterer). O trace pode
+# ser resumido (chamadas mais lentas) e reproduzido offline contra as
+# respostas e snapshots do DOM gravados, para comparar quantos
+# comandos o código atual faz em relação ao gravado.
+#
+# Ativação: TRACE_DRIVER=pasta (cada processo grava trace_<pid>.jsonl)
+# Uso: python instrumented_driver.py resumo pasta_ou_arquivos... [--top 20]
+#      python instrumented_driver.py replay pasta_ou_arquivos... --contexto keyword="dentista"
+# -------------------------------------------------------------------
+
+import os
+import sys
+import json
+import glob
+import time
+import hashlib
+import logging
+import argparse
+import threading
+import collections
+from contextlib import contextmanager
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# Configuração (vai buscar em variáveis de ambiente)
+# -------------------------------------------------------------
+# Pasta do trace (vazio = instrumentação desligada)
+TRACE_DRIVER = os.environ.get("TRACE_DRIVER", "")
+# Guarda as respostas completas (necessário para o replay)
+TRACE_RESPOSTAS = os.environ.get("TRACE_RESPOSTAS", "1") == "1"
+# Snapshot do DOM depois de cada navegação e clique (responde no replay
+# os comandos que não existiam na gravação); navegações por JS, como as
+# das abas do multitab, chamam registrar_snapshot()
+TRACE_SNAPSHOTS = os.environ.get("TRACE_SNAPSHOTS", "1") == "1"
+
+CHAVE_ELEMENTO = "element-6066-11e4-a52e-4f735466cecf"
+# Átomos do Selenium (get_attribute, is_displayed) vão como executeScript
+# com o script inteiro; acima deste tamanho o script é tratado como átomo
+TAMANHO_ATOMO = 2000
+COMANDOS_SNAPSHOT = ("get", "clickElement")
+COMANDOS_BUSCA = ("findElement", "findElements", "findChildElement", "findChildElements")
+
+_JS_SNAPSHOT = "return document.documentElement.outerHTML;"
+
+_local = threading.local()
+
+
+# -------------------------------------------------------------
+# Contexto (keyword / perfil) das chamadas da thread atual
+# -------------------------------------------------------------
+@contextmanager
+def contexto(tipo, nome):
+    """
+    Marca os comandos desta thread como pertencentes a (`tipo`, `nome`),
+    ex.: ("keyword", "dentista itabuna") ou ("perfil", url).
+    """
+    anterior = getattr(_local, "contexto", None)
+    _local.contexto = (tipo, nome)
+    try:
+        yield
+    finally:
+        _local.contexto = anterior
+
+
+def contexto_atual():
+    return getattr(_local, "contexto", None)
+
+
+def _elementos(valor):
+    """
+    Ids de elemento presentes em `valor` (resposta ou argumentos).
+    """
+    if isinstance(valor, dict):
+        if CHAVE_ELEMENTO in valor:
+            return [valor[CHAVE_ELEMENTO]]
+        return [i for v in valor.values() for i in _elementos(v)]
+    if isinstance(valor, list):
+        return [i for v in valor for i in _elementos(v)]
+    return []
+
+
+class _Descritor:
+    """
+    Traduz (comando, params) em (chamada, seletor) legíveis, lembrando
+    qual seletor encontrou cada elemento.
+    """
+
+    def __init__(self):
+        self.seletores = {}
+
+    def _do_elemento(self, elemento_id):
+        return self.seletores.get(elemento_id, "?")
+
+    def descrever(self, comando, params):
+        params = params or {}
+        if comando in COMANDOS_BUSCA:
+            seletor = f"{params.get('using')}={params.get('value')}"
+            if "id" in params:
+                seletor = f"{self._do_elemento(params['id'])} >> {seletor}"
+            return comando, seletor
+        if comando in ("executeScript", "executeAsyncScript"):
+            script = params.get("script", "")
+            args = params.get("args") or []
+            if len(script) > TAMANHO_ATOMO:
+                alvo = self._do_elemento(_elementos(args[:1])[0]) if _elementos(args[:1]) else ""
+                if len(args) == 2 and isinstance(args[1], str):
+                    return "getAttribute", f"{alvo} @{args[1]}"
+                return "atom", alvo
+            return comando, " ".join(script.split())[:80]
+        if comando == "get":
+            return comando, params.get("url")
+        if "id" in params:
+            seletor = self._do_elemento(params["id"])
+            if "name" in params:
+                seletor += f" @{params['name']}"
+            return comando, seletor
+        return comando, None
+
+    def aprender(self, seletor, resposta):
+        for elemento_id in _elementos((resposta or {}).get("value")):
+            self.seletores.setdefault(elemento_id, seletor)
+
+
+def _tamanho(valor):
+    try:
+        return len(json.dumps(valor, ensure_ascii=False, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+# -------------------------------------------------------------
+# Gravação
+# -------------------------------------------------------------
+class Gravador:
+    """
+    Trace JSONL de um processo. Cada linha é um comando:
+      {"sessao", "seq", "contexto", "comando", "chamada", "seletor", "ms",
+       "bytes_envio", "bytes_resposta", "params", "resposta", "erro"}
+    ou um snapshot do DOM: {"sessao", "seq", "snapshot": <hash>}, com o HTML
+    em <pasta>/snapshots/<hash>.html.
+    """
+
+    def __init__(self, pasta, respostas=TRACE_RESPOSTAS, snapshots=TRACE_SNAPSHOTS):
+        self.pasta = pasta
+        self.respostas = respostas
+        self.snapshots = snapshots
+        os.makedirs(os.path.join(pasta, "snapshots"), exist_ok=True)
+        self.caminho = os.path.join(pasta, f"trace_{os.getpid()}.jsonl")
+        self._arquivo = open(self.caminho, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def escrever(self, entrada):
+        linha = json.dumps(entrada, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._arquivo.write(linha)
+            self._arquivo.flush()
+
+    def snapshot(self, sessao, seq, html):
+        nome = hashlib.sha1(html.encode("utf-8")).hexdigest()[:16]
+        caminho = os.path.join(self.pasta, "snapshots", f"{nome}.html")
+        if not os.path.exists(caminho):
+            with open(caminho, "w", encoding="utf-8") as f:
+                f.write(html)
+        self.escrever({"sessao": sessao, "seq": seq, "snapshot": nome})
+
+    def fechar(self):
+        with self._lock:
+            self._arquivo.close()
+
+
+_gravador = None
+_gravador_lock = threading.Lock()
+
+
+def gravador_padrao():
+    """
+    Gravador do processo em TRACE_DRIVER (None se desligado).
+    """
+    global _gravador
+    if not TRACE_DRIVER:
+        return None
+    with _gravador_lock:
+        if _gravador is None:
+            _gravador = Gravador(TRACE_DRIVER)
+            logger.info(f"🔬 Trace de comandos do navegador em {_gravador.caminho}")
+        return _gravador
+
+
+class ExecutorInstrumentado:
+    """
+    Proxy do command_executor: mede e grava cada comando e repassa o
+    resto (atributos, close) para o executor original.
+    """
+
+    def __init__(self, original, gravador, sessao):
+        self._original = original
+        self._gravador = gravador
+        self._sessao = sessao
+        self._descritor = _Descritor()
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, nome):
+        return getattr(self._original, nome)
+
+    def _proximo(self):
+        with self._lock:
+            self._seq += 1
+            return self._seq
+
+    def execute(self, comando, params):
+        chamada, seletor = self._descritor.descrever(comando, params)
+        seq = self._proximo()
+        resposta = erro = None
+        inicio = time.monotonic()
+        try:
+            resposta = self._original.execute(comando, params)
+            return resposta
+        except Exception as e:
+            erro = repr(e)
+            raise
+        finally:
+            duracao = time.monotonic() - inicio
+            metrics.COMANDOS_DRIVER.observar(duracao, chamada=chamada)
+            if comando in COMANDOS_BUSCA:
+                self._descritor.aprender(seletor, resposta)
+            entrada = {
+                "sessao": self._sessao, "seq": seq, "contexto": contexto_atual(),
+                "comando": comando, "chamada": chamada, "seletor": seletor,
+                "ms": round(duracao * 1000, 2),
+                "bytes_envio": _tamanho(params), "bytes_resposta": _tamanho(resposta),
+                "erro": erro,
+            }
+            if self._gravador.respostas:
+                entrada["params"] = params
+                entrada["resposta"] = resposta
+            self._gravador.escrever(entrada)
+            if self._gravador.snapshots and comando in COMANDOS_SNAPSHOT and erro is None:
+                self._capturar_snapshot(seq)
+
+    def _capturar_snapshot(self, seq):
+        # Vai direto no executor original: não entra no trace
+        try:
+            resposta = self._original.execute(
+                "executeScript", {"script": _JS_SNAPSHOT, "args": [], "sessionId": self._sessao}
+            )
+            html = (resposta or {}).get("value")
+            if isinstance(html, str):
+                self._gravador.snapshot(self._sessao, seq, html)
+        except Exception as e:
+            logger.debug(f"Snapshot do DOM falhou: {e}")
+
+
+def registrar_snapshot(driver):
+    """
+    Grava um snapshot do DOM atual de `driver`, para navegações que não
+    passam por "get" (ex.: abas do multitab, que navegam com
+    execute_script). Nada acontece se o driver não estiver instrumentado.
+    """
+    executor = getattr(driver, "command_executor", None)
+    if isinstance(executor, ExecutorInstrumentado) and executor._gravador.snapshots:
+        # Mesmo seq do último comando: vale para os comandos seguintes
+        executor._capturar_snapshot(executor._seq)
+
+
+def instrumentar(driver, gravador=None):
+    """
+    Passa a gravar todos os comandos de `driver` (e dos seus WebElements)
+    em `gravador` (padrão: TRACE_DRIVER). Retorna o próprio driver.
+    """
+    gravador = gravador or gravador_padrao()
+    if gravador is None or isinstance(driver.command_executor, ExecutorInstrumentado):
+        return driver
+    driver.command_executor = ExecutorInstrumentado(
+        driver.command_executor, gravador, driver.session_id
+    )
+    return driver
+
+
+# -------------------------------------------------------------
+# Leitura e resumo do trace
+# -------------------------------------------------------------
+def arquivos_trace(caminhos):
+    arquivos = []
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            arquivos.extend(sorted(glob.glob(os.path.join(caminho, "trace_*.jsonl"))))
+        else:
+            arquivos.append(caminho)
+    return arquivos
+
+
+def ler_trace(caminhos):
+    """
+    Gera as entradas (comandos e snapshots) dos arquivos de trace.
+    """
+    for arquivo in arquivos_trace(caminhos):
+        with open(arquivo, "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    entrada = json.loads(linha)
+                except ValueError:
+                    continue
+                entrada["_pasta"] = os.path.dirname(arquivo)
+                yield entrada
+
+
+def resumir(entradas, top=20):
+    """
+    Totais por contexto (comandos, ms, por chamada) e as `top` chamadas
+    (chamada + seletor) que mais somaram tempo.
+    """
+    por_contexto = {}
+    por_chamada = collections.defaultdict(lambda: [0, 0.0, 0])
+    for e in entradas:
+        if "comando" not in e:
+            continue
+        tipo, nome = e["contexto"] or ("sem_contexto", "")
+        ctx = por_contexto.setdefault(f"{tipo}:{nome}", {
+            "comandos": 0, "ms": 0.0, "bytes": 0, "chamadas": collections.Counter()
+        })
+        ctx["comandos"] += 1
+        ctx["ms"] += e["ms"]
+        ctx["bytes"] += e["bytes_envio"] + e["bytes_resposta"]
+        ctx["chamadas"][e["chamada"]] += 1
+        total = por_chamada[(e["chamada"], e["seletor"])]
+        total[0] += 1
+        total[1] += e["ms"]
+        total[2] += e["bytes_resposta"]
+    lentas = sorted(por_chamada.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+    return {
+        "por_contexto": por_contexto,
+        "mais_lentas": [
+            {"chamada": c, "seletor": s, "n": n, "ms_total": round(ms, 1),
+             "ms_medio": round(ms / n, 2), "bytes_resposta": b}
+            for (c, s), (n, ms, b) in lentas
+        ],
+    }
+
+
+def logar_resumo_do_processo(top=10):
+    """
+    Resumo do trace gravado por este processo (nada se TRACE_DRIVER vazio).
+    """
+    if _gravador is not None:
+        logar_resumo(resumir(ler_trace([_gravador.caminho]), top))
+
+
+def logar_resumo(resumo):
+    for nome, ctx in sorted(resumo["por_contexto"].items(), key=lambda kv: -kv[1]["ms"]):
+        chamadas = ", ".join(f"{c}×{n}" for c, n in ctx["chamadas"].most_common(5))
+        logger.info(f"🔬 {nome}: {ctx['comandos']} comandos, {ctx['ms'] / 1000:.2f}s, "
+                    f"{ctx['bytes'] / 1024:.0f} KB ({chamadas})")
+    logger.info("🐢 Chamadas que mais somaram tempo:")
+    for c in resumo["mais_lentas"]:
+        logger.info(f"  {c['ms_total']:>9.1f} ms  {c['n']:>5}×  {c['ms_medio']:>7.2f} ms  "
+                    f"{c['chamada']} {c['seletor'] or ''}")
+
+
+# -------------------------------------------------------------
+# Replay
+# -------------------------------------------------------------
+def _erro_webdriver(erro, mensagem):
+    return {"value": {"error": erro, "message": mensagem, "stacktrace": ""}}
+
+
+class ExecutorReplay:
+    """
+    command_executor que responde com as respostas gravadas de um contexto.
+    Comandos são casados por (chamada, seletor, elementos, params); um
+    comando que não existia na gravação é "extra" e é respondido repetindo
+    a última resposta igual ou, para buscas por CSS/tag, a partir do último
+    snapshot do DOM antes daquele ponto.
+    """
+
+    def __init__(self, entradas):
+        entradas = list(entradas)
+        self._descritor = _Descritor()
+        self._filas = collections.defaultdict(collections.deque)
+        self._ultima = {}
+        self.gravados = collections.Counter()
+        self.reproduzidos = collections.Counter()
+        self.extras = collections.Counter()
+        comandos = [e for e in entradas if "comando" in e]
+        if comandos and "resposta" not in comandos[0]:
+            raise ValueError("Trace gravado sem respostas (TRACE_RESPOSTAS=0).")
+        descritor = _Descritor()
+        for e in comandos:
+            chamada, seletor = descritor.descrever(e["comando"], e.get("params"))
+            if e["comando"] in COMANDOS_BUSCA:
+                descritor.aprender(seletor, e["resposta"])
+            self._filas[self._chave(e["comando"], e.get("params"), chamada, seletor)].append(e)
+            self.gravados[(e["chamada"], e["seletor"])] += 1
+        self._snapshots = sorted(
+            (e["seq"], os.path.join(e["_pasta"], "snapshots", f"{e['snapshot']}.html"))
+            for e in entradas if "snapshot" in e
+        )
+        self._posicao = comandos[0]["seq"] if comandos else 0
+        self._dom = {}
+
+    @staticmethod
+    def _chave(comando, params, chamada, seletor):
+        params = dict(params or {})
+        params.pop("sessionId", None)
+        return chamada, seletor, json.dumps(params, sort_keys=True, default=str)
+
+    def execute(self, comando, params):
+        if comando == "newSession":
+            return {"value": {"sessionId": "replay", "capabilities": {"browserName": "firefox"}}}
+        if comando == "quit":
+            return {"value": None}
+        chamada, seletor = self._descritor.descrever(comando, params)
+        chave = self._chave(comando, params, chamada, seletor)
+        self.reproduzidos[(chamada, seletor)] += 1
+        fila = self._filas.get(chave)
+        if fila:
+            entrada = fila.popleft()
+            self._posicao = max(self._posicao, entrada["seq"])
+            resposta = entrada["resposta"]
+            if entrada["erro"] and resposta is None:
+                resposta = _erro_webdriver("unknown error", entrada["erro"])
+        else:
+            self.extras[(chamada, seletor)] += 1
+            resposta = self._ultima.get(chave) or self._do_snapshot(comando, params)
+        self._ultima[chave] = resposta
+        if comando in COMANDOS_BUSCA:
+            self._descritor.aprender(seletor, resposta)
+        return resposta
+
+    def _do_snapshot(self, comando, params):
+        """
+        Responde buscas por CSS/tag e leitura de texto/atributo dos
+        elementos encontrados no snapshot vigente.
+        """
+        from extraction import parse_html, selecionar
+        params = params or {}
+        if comando in COMANDOS_BUSCA and params.get("using") in ("css selector", "tag name"):
+            anteriores = [c for s, c in self._snapshots if s <= self._posicao]
+            if not anteriores:
+                return _erro_webdriver("no such element", "sem snapshot do DOM")
+            raiz = self._dom.get(anteriores[-1])
+            if raiz is None:
+                with open(anteriores[-1], "r", encoding="utf-8") as f:
+                    raiz = self._dom[anteriores[-1]] = parse_html(f.read())
+            base = self._dom.get(params.get("id"), raiz) if "id" in params else raiz
+            nos = selecionar(base, params["value"])
+            ids = []
+            for no in nos:
+                elemento_id = f"snapshot-{id(no)}"
+                self._dom[elemento_id] = no
+                ids.append({CHAVE_ELEMENTO: elemento_id})
+            if comando.endswith("Elements"):
+                return {"value": ids}
+            if not ids:
+                return _erro_webdriver("no such element", params["value"])
+            return {"value": ids[0]}
+        no = self._dom.get(params.get("id"))
+        if no is not None and comando == "getElementText":
+            return {"value": no.texto()}
+        if no is not None and comando in ("getElementAttribute", "getElementProperty"):
+            return {"value": no.attrs.get(params.get("name"))}
+        if comando in ("executeScript", "executeAsyncScript"):
+            return {"value": None}
+        return _erro_webdriver("no such element", f"{comando} sem resposta gravada")
+
+    def close(self):
+        pass
+
+    def comparar(self):
+        """
+        Diferenças de contagem por (chamada, seletor) entre gravação e replay.
+        """
+        chaves = set(self.gravados) | set(self.reproduzidos)
+        return sorted(
+            ({"chamada": c, "seletor": s, "gravados": self.gravados[(c, s)],
+              "reproduzidos": self.reproduzidos[(c, s)]}
+             for c, s in chaves if self.gravados[(c, s)] != self.reproduzidos[(c, s)]),
+            key=lambda d: -abs(d["reproduzidos"] - d["gravados"])
+        )
+
+
+def driver_replay(entradas):
+    """
+    WebDriver que responde a partir do trace (sem navegador).
+    Retorna (driver, executor).
+    """
+    from selenium import webdriver
+    from selenium.webdriver.firefox.options import Options
+    executor = ExecutorReplay(entradas)
+    return webdriver.Remote(command_executor=executor, options=Options()), executor
+
+
+class _SinkMemoria:
+    def __init__(self):
+        self.registros = []
+
+    def adicionar(self, registro) -> bool:
+        self.registros.append(registro)
+        return True
+
+
+def _reproduzir_keyword(driver, nome):
+    from scanner import coletar_links_por_busca
+    return coletar_links_por_busca(nome, driver)
+
+
+def _reproduzir_perfil(driver, nome):
+    from filterer import process_profiles
+    sink = _SinkMemoria()
+    process_profiles(driver, sink, url=nome)
+    return sink.registros
+
+
+# Função reexecutada no replay de cada tipo de contexto
+REPRODUTORES = {
+    "keyword": _reproduzir_keyword,
+    "perfil": _reproduzir_perfil,
+}
+
+
+def reproduzir(caminhos, tipo, nome, sessao=None):
+    """
+    Reexecuta o código atual do contexto (`tipo`, `nome`) contra o trace e
+    retorna as diferenças de comandos em relação à gravação.
+    """
+    entradas = [e for e in ler_trace(caminhos) if sessao is None or e["sessao"] == sessao]
+    do_contexto = [e for e in entradas if e.get("contexto") == [tipo, nome]]
+    if not do_contexto:
+        raise ValueError(f"Contexto {tipo}={nome} não encontrado no trace.")
+    sessao = do_contexto[0]["sessao"]
+    snapshots = [e for e in entradas if "snapshot" in e and e["sessao"] == sessao]
+    driver, executor = driver_replay(
+        [e for e in do_contexto if e["sessao"] == sessao] + snapshots
+    )
+    try:
+        REPRODUTORES[tipo](driver, nome)
+    finally:
+        driver.quit()
+    diferencas = executor.comparar()
+    for d in diferencas:
+        logger.warning(f"🔁 {d['chamada']} {d['seletor'] or ''}: "
+                       f"{d['gravados']} gravados → {d['reproduzidos']} no código atual")
+    if not diferencas:
+        logger.info(f"✅ {tipo}={nome}: mesmos comandos da gravação.")
+    return diferencas
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Trace de comandos do WebDriver.")
+    sub = parser.add_subparsers(dest="acao", required=True)
+    p_resumo = sub.add_parser("resumo")
+    p_resumo.add_argument("trace", nargs="+")
+    p_resumo.add_argument("--top", type=int, default=20)
+    p_resumo.add_argument("--json", action="store_true")
+    p_replay = sub.add_parser("replay")
+    p_replay.add_argument("trace", nargs="+")
+    p_replay.add_argument("--contexto", required=True, help='tipo=nome, ex.: keyword="dentista"')
+    p_replay.add_argument("--sessao")
+    args = parser.parse_args()
+    if args.acao == "resumo":
+        resumo = resumir(ler_trace(args.trace), args.top)
+        if args.json:
+            print(json.dumps(resumo, ensure_ascii=False, indent=2))
+        else:
+            logar_resumo(resumo)
+    else:
+        tipo, _, nome = args.contexto.partition("=")
+        sys.exit(1 if reproduzir(args.trace, tipo, nome, args.sessao) else 0)
@@ -0,0 +1,169 @@
+# -------------------------------------------------------------------
+# jobs.py
+# -------------------------------------------------------------------
+# Jobs assíncronos para o app Flask: a busca roda em um executor com
+# concorrência limitada e fila de tamanho máximo, enquanto o cliente
+# consulta o status e recebe os links parciais à medida que chegam.
+# -------------------------------------------------------------------
+
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# Limites (vão buscar em variáveis de ambiente)
+# -------------------------------------------------------------
+JOBS_CONCORRENCIA = int(os.environ.get("JOBS_CONCORRENCIA", "2"))
+JOBS_FILA_MAX = int(os.environ.get("JOBS_FILA_MAX", "10"))
+JOBS_RETIDOS = int(os.environ.get("JOBS_RETIDOS", "100"))
+
+NA_FILA = "na_fila"
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+
+
+class FilaCheia(Exception):
+    """Levantada quando já há JOBS_FILA_MAX jobs aguardando ou executando."""
+
+
+class Job:
+    """
+    Estado de uma busca: palavras-chave, status e links encontrados até agora.
+    Leitores podem aguardar novos links com `aguardar_novos`.
+    """
+
+    def __init__(self, keywords, opcoes=None):
+        self.id = uuid.uuid4().hex
+        self.keywords = keywords
+        self.opcoes = opcoes or {}
+        self.status = NA_FILA
+        self.erro = None
+        self.links = []
+        self.estatisticas = {}
+        self.criado_em = time.time()
+        self.iniciado_em = None
+        self.concluido_em = None
+        self._vistos = set()
+        self._cond = threading.Condition()
+
+    @property
+    def terminado(self):
+        return self.status in (CONCLUIDO, ERRO)
+
+    def iniciar(self):
+        with self._cond:
+            self.status = EXECUTANDO
+            self.iniciado_em = time.time()
+            self._cond.notify_all()
+
+    def adicionar_links(self, links):
+        with self._cond:
+            for link in links:
+                if link not in self._vistos:
+                    self._vistos.add(link)
+                    self.links.append(link)
+            self._cond.notify_all()
+
+    def finalizar(self, erro=None):
+        with self._cond:
+            self.status = ERRO if erro else CONCLUIDO
+            self.erro = erro
+            self.concluido_em = time.time()
+            self._cond.notify_all()
+
+    def aguardar_novos(self, desde, timeout=15.0):
+        """
+        Bloqueia até haver links além da posição `desde` ou o job terminar.
+        Retorna (novos_links, terminado).
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: len(self.links) > desde or self.terminado, timeout=timeout
+            )
+            return self.links[desde:], self.terminado
+
+    def como_dict(self, desde=0):
+        with self._cond:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "erro": self.erro,
+                "keywords": self.keywords,
+                "opcoes": dict(self.opcoes),
+                "total_links": len(self.links),
+                "links": self.links[desde:],
+                "estatisticas": dict(self.estatisticas),
+                "criado_em": self.criado_em,
+                "iniciado_em": self.iniciado_em,
+                "concluido_em": self.concluido_em,
+            }
+
+
+class GerenciadorJobs:
+    """
+    Executa `executar(keywords, ao_encontrar, estatisticas, **opcoes)` em até
+    `concorrencia` threads. `ao_encontrar(links)` é chamado pela busca a cada
+    lote de links; `estatisticas` é um dict que a busca preenche e que é
+    devolvido no status do job.
+    Recusa novos jobs (FilaCheia) quando `fila_max` já estão pendentes.
+    """
+
+    def __init__(self, executar, concorrencia=None, fila_max=None, retidos=None):
+        self.executar = executar
+        self.concorrencia = concorrencia or JOBS_CONCORRENCIA
+        self.fila_max = fila_max or JOBS_FILA_MAX
+        self.retidos = retidos or JOBS_RETIDOS
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concorrencia, thread_name_prefix="job"
+        )
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def pendentes(self):
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if not j.terminado)
+
+    def submeter(self, keywords, **opcoes):
+        with self._lock:
+            pendentes = sum(1 for j in self._jobs.values() if not j.terminado)
+            if pendentes >= self.fila_max:
+                raise FilaCheia(f"{pendentes} jobs pendentes (máximo {self.fila_max}).")
+            job = Job(keywords, opcoes)
+            self._jobs[job.id] = job
+            self._descartar_antigos()
+        self._executor.submit(self._rodar, job)
+        logger.info(f"📥 Job {job.id} na fila ({len(keywords)} palavras-chave).")
+        return job
+
+    def obter(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _descartar_antigos(self):
+        terminados = [jid for jid, j in self._jobs.items() if j.terminado]
+        for jid in terminados[:max(0, len(self._jobs) - self.retidos)]:
+            del self._jobs[jid]
+
+    def _rodar(self, job):
+        job.iniciar()
+        try:
+            links = self.executar(
+                job.keywords, ao_encontrar=job.adicionar_links, estatisticas=job.estatisticas,
+                **job.opcoes
+            )
+            job.adicionar_links(links or [])
+            job.finalizar()
+            logger.info(f"✅ Job {job.id} concluído com {len(job.links)} links.")
+        except Exception as e:
+            logger.error(f"Erro no job {job.id}: {e}")
+            job.finalizar(erro=str(e))
+
+    def encerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
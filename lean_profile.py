@@ -0,0 +1,291 @@
+# -------------------------------------------------------------------
+# lean_profile.py
+# -------------------------------------------------------------------
+# Perfis "enxutos" do Firefox: bloqueiam imagens, tiles do mapa,
+# fontes e mídia (só lemos texto e hrefs). As regras de bloqueio e
+# liberação ficam todas aqui; cada ponto de entrada escolhe seu perfil
+# por variável de ambiente. O bloqueio usa prefs do Firefox e um
+# arquivo PAC que manda as URLs negadas para um proxy inexistente.
+# -------------------------------------------------------------------
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+from urllib.parse import urlparse
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# Regras (padrões de shExpMatch aplicados à URL completa)
+# -------------------------------------------------------------
+BLOQUEIOS = {
+    "imagens": [
+        "*.googleusercontent.com/*", "*streetviewpixels*", "*/maps/vt/icon*",
+        "*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*",
+    ],
+    "tiles": [
+        "*/maps/vt?*", "*/maps/vt/*", "*/kh/v*", "*/maps/rt/*", "*khms*.google*",
+    ],
+    "fontes": [
+        "*fonts.gstatic.com/*", "*fonts.googleapis.com/*",
+        "*.woff2*", "*.woff*", "*.ttf*", "*.otf*",
+    ],
+    "midia": [
+        "*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*/videoplayback*",
+    ],
+}
+
+# Sempre liberados, mesmo que casem com algum bloqueio acima
+PERMITIDOS = [
+    "*/maps/_/js/*", "*/maps/api/js*", "*/maps/preview/*", "*/search?tbm=map*",
+]
+
+# Prefs aplicadas por categoria (além do PAC)
+PREFS = {
+    "imagens": {"permissions.default.image": 2},
+    "tiles": {"webgl.disabled": True},
+    "fontes": {"browser.display.use_document_fonts": 0, "gfx.downloadable_fonts.enabled": False},
+    "midia": {
+        "media.autoplay.default": 5,
+        "media.autoplay.blocking_policy": 2,
+        "media.navigator.enabled": False,
+        "media.peerconnection.enabled": False,
+    },
+}
+
+# Prefs comuns a qualquer perfil enxuto (menos memória por aba)
+PREFS_ENXUTO = {
+    "browser.sessionhistory.max_total_viewers": 0,
+    "browser.sessionstore.max_tabs_undo": 0,
+    "image.animation_mode": "none",
+    "dom.webnotifications.enabled": False,
+    "geo.enabled": False,
+}
+
+PERFIS = {
+    "completo": (),
+    "leve": ("imagens", "tiles", "fontes", "midia"),
+    # O filterer clica nas fotos dos containers; mantém as imagens
+    "leve_com_imagens": ("tiles", "fontes", "midia"),
+}
+
+# Perfil padrão de cada ponto de entrada, sobrescrito por
+# PERFIL_NAVEGADOR_<ENTRADA> ou, para todos, por PERFIL_NAVEGADOR.
+PADRAO_POR_ENTRADA = {
+    "scanner": "leve",
+    "filtro": "leve_com_imagens",
+    "web": "leve",
+}
+
+# Destino das requisições liberadas ("DIRECT" ou "PROXY host:porta")
+PROXY_SAIDA = os.environ.get("PROXY_SAIDA", "DIRECT")
+# Proxy morto para onde vão as bloqueadas (falha imediata)
+PROXY_BLOQUEIO = "PROXY 127.0.0.1:9"
+
+# Médias por página de cada perfil, guardadas entre execuções para que a
+# economia de um perfil enxuto possa ser comparada com um "completo"
+# medido em outra execução
+ARQUIVO_CONSUMO = os.environ.get(
+    "ARQUIVO_CONSUMO_PERFIS",
+    os.path.join(tempfile.gettempdir(), "automacao_maps_consumo.json"),
+)
+
+
+def perfil_para(entrada):
+    """
+    Nome do perfil a usar em `entrada` ("scanner", "filtro", "web").
+    """
+    nome = (
+        os.environ.get(f"PERFIL_NAVEGADOR_{entrada.upper()}")
+        or os.environ.get("PERFIL_NAVEGADOR")
+        or PADRAO_POR_ENTRADA.get(entrada, "completo")
+    )
+    if nome not in PERFIS:
+        logger.warning(f"⚠️ Perfil de navegador desconhecido '{nome}'. Usando 'completo'.")
+        return "completo"
+    return nome
+
+
+def gerar_pac(categorias):
+    """
+    Monta o arquivo PAC: permitidos passam, bloqueados caem no proxy morto.
+    """
+    padroes = [p for c in categorias for p in BLOQUEIOS[c]]
+
+    def _lista(itens):
+        return "[" + ",".join(f'"{p}"' for p in itens) + "]"
+
+    return (
+        "var PERMITIDOS = " + _lista(PERMITIDOS) + ";\n"
+        "var BLOQUEADOS = " + _lista(padroes) + ";\n"
+        "function FindProxyForURL(url, host) {\n"
+        "  for (var i = 0; i < PERMITIDOS.length; i++)\n"
+        f'    if (shExpMatch(url, PERMITIDOS[i])) return "{PROXY_SAIDA}";\n'
+        "  for (var j = 0; j < BLOQUEADOS.length; j++)\n"
+        f'    if (shExpMatch(url, BLOQUEADOS[j])) return "{PROXY_BLOQUEIO}";\n'
+        f'  return "{PROXY_SAIDA}";\n'
+        "}\n"
+    )
+
+
+def _arquivo_pac(conteudo):
+    """
+    Grava o PAC em um arquivo temporário nomeado pelo hash do conteúdo,
+    reaproveitado por todos os navegadores do mesmo perfil.
+    """
+    nome = hashlib.sha1(conteudo.encode("utf-8")).hexdigest()[:12]
+    caminho = os.path.join(tempfile.gettempdir(), f"automacao_maps_{nome}.pac")
+    if not os.path.exists(caminho):
+        tmp = caminho + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(conteudo)
+        os.replace(tmp, caminho)
+    return caminho
+
+
+def aplicar_perfil(options, perfil):
+    """
+    Configura as Options do Firefox para o perfil `perfil`.
+    """
+    categorias = PERFIS[perfil]
+    if not categorias:
+        return options
+    for chave, valor in PREFS_ENXUTO.items():
+        options.set_preference(chave, valor)
+    for categoria in categorias:
+        for chave, valor in PREFS[categoria].items():
+            options.set_preference(chave, valor)
+
+    pac = _arquivo_pac(gerar_pac(categorias))
+    options.set_preference("network.proxy.type", 2)
+    options.set_preference("network.proxy.autoconfig_url", "file://" + pac)
+    # Sem isso o PAC só enxerga o host das URLs https
+    options.set_preference("network.proxy.autoconfig_url.include_path", True)
+    options.set_preference("network.proxy.failover_direct", False)
+    # Aplica o PAC também a localhost (servidor de teste do fake_maps.py)
+    options.set_preference("network.proxy.allow_hijacking_localhost", True)
+    return options
+
+
+# -------------------------------------------------------------
+# Medição por página
+# -------------------------------------------------------------
+_JS_RECURSOS = """
+var nav = window.__medido ? null : performance.getEntriesByType('navigation')[0];
+var recursos = performance.getEntriesByType('resource');
+var bytes = nav ? (nav.transferSize || 0) : 0;
+for (var i = 0; i < recursos.length; i++) bytes += recursos[i].transferSize || 0;
+// A próxima medição (ex.: nova busca na mesma página) só conta o que vier depois
+window.__medido = true;
+performance.clearResourceTimings();
+performance.setResourceTimingBufferSize(2000);
+return [recursos.length + (nav ? 1 : 0), bytes];
+"""
+
+
+def medir_pagina(driver, pagina):
+    """
+    Conta requisições e bytes transferidos pela página atual (Resource
+    Timing) desde a última medição e registra por perfil. A economia por página é a diferença
+    entre as médias do perfil "completo" e do perfil enxuto.
+    """
+    perfil = getattr(driver, "perfil_navegador", "completo")
+    try:
+        requisicoes, transferidos = driver.execute_script(_JS_RECURSOS)
+    except Exception as e:
+        logger.debug(f"Não foi possível medir a página: {e}")
+        return None
+    metrics.REQUISICOES_PAGINA.observar(requisicoes, pagina=pagina, perfil=perfil)
+    metrics.BYTES_PAGINA.observar(transferidos, pagina=pagina, perfil=perfil)
+    return {"requisicoes": requisicoes, "bytes": transferidos}
+
+
+def _origem():
+    """
+    Host que está sendo medido; medições contra o fake_maps.py e contra o
+    Google ficam separadas no arquivo de consumo.
+    """
+    base = os.environ.get("MAPS_BASE_URL", "https://www.google.com/maps")
+    return urlparse(base).hostname or base
+
+
+def _ler_consumo():
+    try:
+        with open(ARQUIVO_CONSUMO, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _salvar_consumo(pagina, perfil, medias):
+    """
+    Grava (substituindo a anterior) a média desta execução para
+    `pagina`/`perfil`.
+    """
+    consumo = _ler_consumo()
+    consumo.setdefault(_origem(), {}).setdefault(pagina, {})[perfil] = dict(medias, em=time.time())
+    tmp = ARQUIVO_CONSUMO + f".{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(consumo, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, ARQUIVO_CONSUMO)
+    except OSError as e:
+        logger.debug(f"Não foi possível salvar o consumo do perfil: {e}")
+
+
+def _medias(pagina, perfil):
+    req = metrics.REQUISICOES_PAGINA.media(pagina=pagina, perfil=perfil)
+    transferidos = metrics.BYTES_PAGINA.media(pagina=pagina, perfil=perfil)
+    if req is None or transferidos is None:
+        return None
+    return {"requisicoes": req, "bytes": transferidos}
+
+
+def _medias_salvas(pagina, perfil):
+    salvo = _ler_consumo().get(_origem(), {}).get(pagina, {}).get(perfil)
+    if not salvo:
+        return None
+    return {"requisicoes": salvo["requisicoes"], "bytes": salvo["bytes"]}
+
+
+def economia(pagina, perfil):
+    """
+    Requisições e bytes poupados em média por página de `pagina` pelo
+    `perfil` em relação ao "completo". A base vem das medições do próprio
+    processo ou, se não houver, da última execução salva com o "completo"
+    (None se faltar uma das medições).
+    """
+    atual = _medias(pagina, perfil) or _medias_salvas(pagina, perfil)
+    base = _medias(pagina, "completo") or _medias_salvas(pagina, "completo")
+    if atual is None or base is None:
+        return None
+    return {
+        "requisicoes": base["requisicoes"] - atual["requisicoes"],
+        "bytes": base["bytes"] - atual["bytes"],
+    }
+
+
+def logar_consumo(pagina, perfil):
+    """
+    Loga a média de requisições/bytes por página, salva essa média para
+    execuções futuras e, se houver medições do perfil "completo" (desta
+    ou de uma execução anterior), quanto o perfil economizou.
+    """
+    medias = _medias(pagina, perfil)
+    if medias is None:
+        return
+    logger.info(
+        f"🪶 Perfil '{perfil}', página '{pagina}': {medias['requisicoes']:.0f} requisições e "
+        f"{medias['bytes'] / 1024:.0f} KB em média."
+    )
+    _salvar_consumo(pagina, perfil, medias)
+    poupado = economia(pagina, perfil) if perfil != "completo" else None
+    if poupado:
+        logger.info(
+            f"🪶 Economia vs 'completo': {poupado['requisicoes']:.0f} requisições e "
+            f"{poupado['bytes'] / 1024:.0f} KB por página."
+        )
@@ -0,0 +1,167 @@
+# -------------------------------------------------------------------
+# licenca.py
+# -------------------------------------------------------------------
+# Verificação de liberação no painel remoto, compartilhada por
+# scanner.py, filterer.py e main.py. O MAC e o último veredito do
+# painel ficam em cache (memória + arquivo) com TTL, e a verificação
+# pode rodar em paralelo com a inicialização do navegador.
+# -------------------------------------------------------------------
+
+import os
+import re
+import sys
+import json
+import time
+import logging
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# Configuração (vai buscar em variáveis de ambiente). As URLs podem
+# apontar para um painel local de teste (ver fake_maps.py).
+# -------------------------------------------------------------
+PAINEL_URL = os.environ.get("PAINEL_URL", "https://painel-api-k2v2.onrender.com/command")
+IP_URL = os.environ.get("IP_URL", "https://api.ipify.org")
+LICENCA_TTL = float(os.environ.get("LICENCA_TTL", "600"))
+LICENCA_TTL_NEGATIVO = float(os.environ.get("LICENCA_TTL_NEGATIVO", "60"))
+MAC_TTL = float(os.environ.get("MAC_TTL", "86400"))
+LICENCA_CACHE = os.environ.get(
+    "LICENCA_CACHE", os.path.join(tempfile.gettempdir(), "automacao_maps_licenca.json")
+)
+
+_lock = threading.Lock()
+_memoria = {}
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="licenca")
+
+
+def _ler_cache():
+    if _memoria:
+        return _memoria
+    try:
+        with open(LICENCA_CACHE, "r", encoding="utf-8") as f:
+            _memoria.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    return _memoria
+
+
+def _gravar_cache(**valores):
+    _memoria.update(valores)
+    tmp = LICENCA_CACHE + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_memoria, f)
+        os.replace(tmp, LICENCA_CACHE)
+    except OSError as e:
+        logger.warning(f"Não foi possível gravar o cache de licença: {e}")
+
+
+def _ler_mac_do_sistema():
+    if sys.platform.startswith("win"):
+        output = subprocess.check_output("getmac", encoding="cp1252", errors="ignore")
+        macs = re.findall(r"([0-9A-Fa-f]{2}[-:]){5}[0-9A-Fa-f]{2}", output)
+        return macs[0].replace("-", ":").lower() if macs else None
+    output = subprocess.check_output("ifconfig", encoding="utf-8", errors="ignore")
+    macs = re.findall(r"([0-9A-Fa-f]{2}[:]){5}[0-9A-Fa-f]{2}", output)
+    return macs[0].lower() if macs else None
+
+
+def get_mac():
+    """
+    Retorna o endereço MAC principal do sistema:
+    Windows: via 'getmac'
+    Linux/Mac: via 'ifconfig'
+    O resultado fica em cache por MAC_TTL segundos, evitando o subprocess
+    a cada execução. Se falhar, retorna None e loga o erro.
+    """
+    with _lock:
+        cache = _ler_cache()
+        if cache.get("mac") and time.time() - cache.get("mac_em", 0) < MAC_TTL:
+            return cache["mac"]
+        try:
+            mac = _ler_mac_do_sistema()
+        except Exception as e:
+            logger.error(f"Erro ao obter MAC: {e}")
+            return None
+        if mac:
+            _gravar_cache(mac=mac, mac_em=time.time())
+        return mac
+
+
+def _veredito_em_cache(mac):
+    cache = _ler_cache()
+    if cache.get("veredito_mac") != mac or "ativo" not in cache:
+        return None
+    ttl = LICENCA_TTL if cache["ativo"] else LICENCA_TTL_NEGATIVO
+    if time.time() - cache.get("veredito_em", 0) >= ttl:
+        return None
+    return cache["ativo"]
+
+
+def verificar_liberacao(mac, tentativas=3, intervalo=2, usar_cache=True) -> bool:
+    """
+    Tenta até `tentativas` vezes verificar no painel se o cliente está ativo.
+    Se JSON retornar {"ativo": true}, devolve True, caso contrário False.
+    Respostas do painel ficam em cache (LICENCA_TTL para liberado,
+    LICENCA_TTL_NEGATIVO para bloqueado); falhas de rede não são guardadas.
+    """
+    if usar_cache:
+        with _lock:
+            ativo = _veredito_em_cache(mac)
+        if ativo is not None:
+            logger.info(f"→ Liberação em cache: {'ativo' if ativo else 'bloqueado'}.")
+            return ativo
+
+    for tentativa in range(1, tentativas + 1):
+        try:
+            ip = requests.get(IP_URL, timeout=5).text
+            r = requests.get(PAINEL_URL, params={"mac": mac, "public_ip": ip}, timeout=10)
+            r.raise_for_status()
+            ativo = bool(r.json().get("ativo", False))
+            with _lock:
+                _gravar_cache(veredito_mac=mac, ativo=ativo, veredito_em=time.time())
+            return ativo
+        except Exception as e:
+            logger.error(f"Tentativa {tentativa}/{tentativas} falhou: {e}")
+            if tentativa < tentativas:
+                time.sleep(intervalo)
+    return False
+
+
+def _verificar():
+    with metrics.LICENCA.cronometrar():
+        mac = get_mac()
+        if not mac:
+            logger.error("Não foi possível obter o endereço MAC.")
+            metrics.ERROS.inc(etapa="licenca", motivo="sem_mac")
+            return False
+        return verificar_liberacao(mac)
+
+
+def verificar_em_segundo_plano():
+    """
+    Dispara a verificação completa (MAC + painel) em outra thread e retorna
+    um Future[bool], para que o navegador possa subir enquanto isso.
+    """
+    logger.info("→ Verificando liberação junto ao painel remoto…")
+    return _executor.submit(_verificar)
+
+
+def liberado(futuro) -> bool:
+    """
+    Aguarda o resultado de `verificar_em_segundo_plano` e loga o bloqueio.
+    """
+    try:
+        ativo = futuro.result()
+    except Exception as e:
+        logger.error(f"Erro na verificação de liberação: {e}")
+        ativo = False
+    if not ativo:
+        logger.error("Cliente BLOQUEADO. Abortando.")
+    return ativo
@@ -1,15 +1,22 @@
 # app.py
-from flask import Flask, request, render_template_string, flash
+from flask import (
+    Flask, request, render_template_string, flash, jsonify, url_for, Response
+)
+import json
 import os
 import time
 import logging
+import threading
 import requests
-from selenium import webdriver
-from selenium.webdriver.firefox.service import Service
-from selenium.webdriver.firefox.options import Options
-from webdriver_manager.firefox import GeckoDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
+from rate_control import ControladorTaxa, executar_com_ritmo
+from browser_service import ServicoNavegadores
+from scanner import coletar_links_por_busca, save_new_links, VIEWPORT_INICIAL
+from jobs import GerenciadorJobs, FilaCheia
+from search_cache import CacheBuscas
+from licenca import verificar_em_segundo_plano, liberado
+from lean_profile import perfil_para
+import http_backend
+import metrics
 
 # Configuração de logging
 tlogging = logging.getLogger(__name__)
@@ -18,6 +25,21 @@ tlogging.setLevel(logging.INFO)
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET', 'changeme')
 
+# Exige liberação no painel também nas buscas via web (com cache de TTL)
+VERIFICAR_LICENCA = os.environ.get('VERIFICAR_LICENCA_WEB', '0') == '1'
+
+# Navegadores de vida longa, aquecidos na página do Maps e reaproveitados
+# entre os jobs (resetados a cada devolução), com o perfil enxuto da web
+navegadores = ServicoNavegadores(perfil=perfil_para('web'))
+# Ritmo compartilhado por todos os jobs: um bloqueio em um job desacelera os demais
+ritmo = ControladorTaxa(navegadores.pool.tamanho)
+# Nos backends "http"/"auto" o Firefox só sobe se alguma busca precisar
+if not http_backend.usar_http():
+    navegadores.iniciar()
+
+# Links por keyword reaproveitados entre jobs (TTL/LRU, ver search_cache.py)
+cache = CacheBuscas()
+
 # Diretório para salvar resultados
 data_dir = os.path.join(os.getcwd(), 'data')
 os.makedirs(data_dir, exist_ok=True)
@@ -37,90 +59,261 @@ TEMPLATE = '''
 <form method="post">
   <label for="keywords">Palavras-chave (uma por linha):</label><br>
   <textarea name="keywords" rows="5" cols="40">{{ request.form.keywords or '' }}</textarea><br>
+  <label><input type="checkbox" name="atualizar" value="1"> Ignorar resultados em cache</label><br>
   <button type="submit">Pesquisar</button>
 </form>
-{% if results %}
+{% if job %}
   <h2>Resultados Encontrados</h2>
-  <ul>
-  {% for url in results %}
+  <p>Job <code>{{ job.id }}</code>: <span id="status">{{ job.status }}</span>
+     (<span id="total">{{ job.links|length }}</span> links)</p>
+  <ul id="results">
+  {% for url in job.links %}
     <li><a href="{{ url }}" target="_blank">{{ url }}</a></li>
   {% endfor %}
   </ul>
+  <script>
+  (function () {
+    var desde = {{ job.links|length }};
+    function atualizar() {
+      fetch("{{ url_for('job_status', job_id=job.id) }}?desde=" + desde)
+        .then(function (r) { return r.json(); })
+        .then(function (j) {
+          var ul = document.getElementById("results");
+          j.links.forEach(function (url) {
+            var li = document.createElement("li"), a = document.createElement("a");
+            a.href = url; a.target = "_blank"; a.textContent = url;
+            li.appendChild(a); ul.appendChild(li);
+          });
+          desde = j.total_links;
+          document.getElementById("total").textContent = desde;
+          document.getElementById("status").textContent = j.status + (j.erro ? " (" + j.erro + ")" : "");
+          if (j.status !== "concluido" && j.status !== "erro") setTimeout(atualizar, 2000);
+        });
+    }
+    {% if job.status not in ('concluido', 'erro') %}atualizar();{% endif %}
+  })();
+  </script>
 {% endif %}
 '''
 
+def _ler_keywords():
+    if request.is_json:
+        dados = request.get_json(silent=True) or {}
+        raw = dados.get('keywords', '')
+        if isinstance(raw, list):
+            raw = '\n'.join(raw)
+    else:
+        raw = request.form.get('keywords', '')
+    return [k.strip() for k in raw.splitlines() if k.strip()]
+
+
+def _ler_atualizar():
+    """
+    Pedido de busca nova, ignorando o cache (`atualizar` no JSON, no
+    formulário ou na query string).
+    """
+    if request.is_json:
+        valor = (request.get_json(silent=True) or {}).get('atualizar', False)
+    else:
+        valor = request.values.get('atualizar', '')
+    return str(valor).lower() in ('1', 'true', 'sim', 'on')
+
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
-    results = []
+    job = None
     if request.method == 'POST':
-        raw = request.form.get('keywords', '').strip()
-        if not raw:
+        keywords = _ler_keywords()
+        if not keywords:
             flash('Informe pelo menos uma palavra-chave.')
-            return render_template_string(TEMPLATE, results=None)
-        keywords = [k.strip() for k in raw.splitlines() if k.strip()]
+            return render_template_string(TEMPLATE, job=None)
         try:
-            results = run_search(keywords)
-        except Exception as e:
-            tlogging.error(f"Erro na busca: {e}")
-            flash('Erro ao executar pesquisa. Verifique os logs.')
-    return render_template_string(TEMPLATE, results=results)
+            job = jobs.submeter(keywords, atualizar=_ler_atualizar())
+        except FilaCheia as e:
+            tlogging.warning(f"Fila de jobs cheia: {e}")
+            flash('Servidor ocupado. Tente novamente em alguns minutos.')
+    elif request.args.get('job'):
+        job = jobs.obter(request.args['job'])
+    return render_template_string(TEMPLATE, job=job.como_dict() if job else None)
+
+
+@app.route('/jobs', methods=['POST'])
+def job_criar():
+    """
+    Cria um job de busca e retorna imediatamente (202) com o id e as URLs
+    de status e de stream.
+    """
+    keywords = _ler_keywords()
+    if not keywords:
+        return jsonify(erro='Informe pelo menos uma palavra-chave.'), 400
+    try:
+        job = jobs.submeter(keywords, atualizar=_ler_atualizar())
+    except FilaCheia as e:
+        return jsonify(erro=str(e)), 503
+    return jsonify(
+        id=job.id,
+        status=job.status,
+        status_url=url_for('job_status', job_id=job.id),
+        stream_url=url_for('job_stream', job_id=job.id),
+    ), 202
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """
+    Status e resultados parciais. `?desde=N` devolve só os links após o N-ésimo.
+    """
+    job = jobs.obter(job_id)
+    if job is None:
+        return jsonify(erro='Job não encontrado.'), 404
+    return jsonify(job.como_dict(desde=request.args.get('desde', 0, type=int)))
 
 
-def run_search(keywords):
+@app.route('/jobs/<job_id>/stream')
+def job_stream(job_id):
+    """
+    Server-sent events: um evento `link` por link encontrado e um evento
+    `fim` com o status final. Comentários periódicos mantêm a conexão viva.
+    """
+    job = jobs.obter(job_id)
+    if job is None:
+        return jsonify(erro='Job não encontrado.'), 404
+
+    inicio = request.args.get('desde', 0, type=int)
+
+    def eventos():
+        desde = inicio
+        while True:
+            novos, terminado = job.aguardar_novos(desde)
+            for link in novos:
+                yield f"event: link\ndata: {link}\n\n"
+            desde += len(novos)
+            if terminado:
+                fim = {k: v for k, v in job.como_dict(desde=desde).items() if k != 'links'}
+                yield f"event: fim\ndata: {json.dumps(fim)}\n\n"
+                return
+            if not novos:
+                yield ": ping\n\n"
+
+    return Response(
+        eventos(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@app.route('/metrics')
+def metricas():
+    """
+    Métricas do pipeline no formato de texto do Prometheus.
+    """
+    return Response(metrics.exportar(), mimetype='text/plain; version=0.0.4')
+
+
+def run_search(keywords, ao_encontrar=None, estatisticas=None, atualizar=False):
     """
     Executa busca headless no Google Maps para cada palavra-chave e retorna lista de perfis.
+    As palavras-chave são distribuídas entre os navegadores aquecidos do serviço.
+    `ao_encontrar(links)` é chamado a cada palavra-chave concluída e
+    `estatisticas` (dict) recebe a latência até a primeira consulta e os
+    acertos do cache.
+    Com MAPS_BACKEND "http"/"auto" as buscas vão primeiro sem navegador.
+    Keywords em cache não são buscadas de novo (exceto com `atualizar`) e
+    keywords já em busca por outro job esperam o resultado dele.
     """
-    options = Options()
-    options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
+    estatisticas = estatisticas if estatisticas is not None else {}
+    inicio = time.monotonic()
+    primeira = threading.Lock()
 
-    service = Service(GeckoDriverManager().install())
-    driver = webdriver.Firefox(service=service, options=options)
-    driver.get('https://www.google.com/maps?hl=pt-BR')
-    time.sleep(3)
+    def _marcar_primeira():
+        with primeira:
+            if 'latencia_primeira_consulta' not in estatisticas:
+                latencia = time.monotonic() - inicio
+                estatisticas['latencia_primeira_consulta'] = round(latencia, 3)
+                tlogging.info(f'⏱️ Início→primeira consulta: {latencia:.2f}s')
 
-    collected = set()
-    for kw in keywords:
+    def _buscar(driver, kw):
+        _marcar_primeira()
         tlogging.info(f'Buscando: {kw}')
-        campo = driver.find_element(By.ID, 'searchboxinput')
-        campo.clear()
-        campo.send_keys(kw)
-        campo.send_keys(Keys.ENTER)
-        time.sleep(5)
-
-        prev = 0
-        for _ in range(15):
-            perfis = driver.find_elements(By.CSS_SELECTOR, 'a.hfpxzc')
-            curr = len(perfis)
-            if curr == prev:
-                break
-            prev = curr
-            driver.execute_script('arguments[0].scrollIntoView();', perfis[-1])
-            time.sleep(2)
-
-        for p in perfis:
-            href = p.get_attribute('href')
-            if href:
-                collected.add(href)
-
-    driver.quit()
-
-    # Grava em arquivo
+        return coletar_links_por_busca(kw, driver, max_scrolls=15)
+
+    def _buscar_http(kw):
+        _marcar_primeira()
+        tlogging.info(f'Buscando (HTTP): {kw}')
+        return http_backend.buscar_links(kw, VIEWPORT_INICIAL)
+
+    def _coletar(keywords):
+        """
+        Gera (keyword, links) pelo backend configurado.
+        """
+        pendentes = list(keywords)
+        if http_backend.usar_http():
+            falhas = []
+            yield from http_backend.executar_http(keywords, _buscar_http, falhas)
+            pendentes = falhas if http_backend.com_fallback() else []
+            estatisticas['fallback_selenium'] = estatisticas.get('fallback_selenium', 0) + len(pendentes)
+            if falhas and not pendentes:
+                tlogging.error(f'❌ Falharam no caminho HTTP: {falhas}')
+        if pendentes:
+            yield from executar_com_ritmo(navegadores.pool, pendentes, _buscar, ritmo)
+
+    if VERIFICAR_LICENCA and not liberado(verificar_em_segundo_plano()):
+        raise RuntimeError('Cliente bloqueado no painel.')
+
+    collected = set()
+
+    def _acumular(links):
+        collected.update(links)
+        if ao_encontrar:
+            ao_encontrar(sorted(links))
+
+    reserva = cache.reservar(keywords, VIEWPORT_INICIAL, forcar=atualizar)
+    estatisticas['cache'] = {
+        'hits': len(reserva.prontos),
+        'misses': len(reserva.coletar),
+        'compartilhadas': len(reserva.aguardar),
+        'atualizar': atualizar,
+    }
+    tlogging.info(
+        f'🗃️ Cache: {len(reserva.prontos)} hits, {len(reserva.coletar)} misses, '
+        f'{len(reserva.aguardar)} aguardando outro job.'
+    )
+    for links in reserva.prontos.values():
+        _acumular(links)
+    try:
+        for kw, links in _coletar(reserva.coletar):
+            cache.publicar(reserva, kw, links)
+            _acumular(links)
+    finally:
+        cache.liberar(reserva)
+    # Coletas de outros jobs que falharam são refeitas por este
+    refazer = []
+    for kw, links in cache.aguardar(reserva):
+        if links is None:
+            refazer.append(kw)
+        else:
+            _acumular(links)
+    for _, links in _coletar(refazer):
+        _acumular(links)
+
+    # Anexa ao arquivo apenas os lugares que ainda não estão no índice
     out_file = os.path.join(data_dir, 'links.txt')
-    with open(out_file, 'w', encoding='utf-8') as f:
-        for url in sorted(collected):
-            f.write(url + '\n')
+    save_new_links(collected, out_file, origem='web')
 
     return sorted(collected)
 
+
+# Jobs rodam em threads deste processo: use um único worker do gunicorn
+# com várias threads (ver Procfile abaixo).
+jobs = GerenciadorJobs(run_search)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port)
 
 # Procfile
 # --
-# web: gunicorn app:app --bind 0.0.0.0:$PORT
+# web: gunicorn app:app --bind 0.0.0.0:$PORT --workers 1 --worker-class gthread --threads 8
 
 # requirements.txt
 # --
@@ -0,0 +1,272 @@
+# -------------------------------------------------------------------
+# metrics.py
+# -------------------------------------------------------------------
+# Métricas no formato de texto do Prometheus (contadores, histogramas
+# e medidores), sem dependências externas. Registradas pelo scanner,
+# filterer e demais módulos e expostas em /metrics pelo main.py.
+# -------------------------------------------------------------------
+
+import time
+import bisect
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+BUCKETS_PADRAO = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _rotulos(labels):
+    if not labels:
+        return ""
+    partes = []
+    for chave, valor in sorted(labels.items()):
+        valor = str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        partes.append(f'{chave}="{valor}"')
+    return "{" + ",".join(partes) + "}"
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda):
+        self.nome = nome
+        self.ajuda = ajuda
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def _chave(self, labels):
+        return tuple(sorted(labels.items()))
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        with self._lock:
+            for chave, valor in sorted(self._valores.items()):
+                linhas.extend(self._linhas(dict(chave), valor))
+        return linhas
+
+    def _linhas(self, labels, valor):
+        return [f"{self.nome}{_rotulos(labels)} {valor}"]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor=1, **labels):
+        chave = self._chave(labels)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def total(self, **filtro):
+        """
+        Soma das séries cujos rótulos contêm `filtro`.
+        """
+        with self._lock:
+            return sum(
+                v for chave, v in self._valores.items()
+                if all(dict(chave).get(k) == f for k, f in filtro.items())
+            )
+
+
+class Medidor(_Metrica):
+    tipo = "gauge"
+
+    def definir(self, valor, **labels):
+        with self._lock:
+            self._valores[self._chave(labels)] = valor
+
+    def maximo(self, **filtro):
+        """
+        Maior valor entre as séries cujos rótulos contêm `filtro`
+        (None se não houver nenhuma).
+        """
+        with self._lock:
+            valores = [
+                v for chave, v in self._valores.items()
+                if all(dict(chave).get(k) == f for k, f in filtro.items())
+            ]
+        return max(valores) if valores else None
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, buckets=BUCKETS_PADRAO):
+        super().__init__(nome, ajuda)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, **labels):
+        chave = self._chave(labels)
+        with self._lock:
+            estado = self._valores.get(chave)
+            if estado is None:
+                estado = self._valores[chave] = [[0] * len(self.buckets), 0.0, 0]
+            i = bisect.bisect_left(self.buckets, valor)
+            if i < len(self.buckets):
+                estado[0][i] += 1
+            estado[1] += valor
+            estado[2] += 1
+
+    @contextmanager
+    def cronometrar(self, **labels):
+        inicio = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observar(time.monotonic() - inicio, **labels)
+
+    def media(self, **filtro):
+        """
+        Média das observações das séries cujos rótulos contêm `filtro`
+        (None se não houver nenhuma).
+        """
+        soma = total = 0
+        with self._lock:
+            for chave, (_, s, n) in self._valores.items():
+                if all(dict(chave).get(k) == f for k, f in filtro.items()):
+                    soma += s
+                    total += n
+        return soma / total if total else None
+
+    def _linhas(self, labels, estado):
+        contagens, soma, total = estado
+        linhas = []
+        acumulado = 0
+        for limite, n in zip(self.buckets, contagens):
+            acumulado += n
+            linhas.append(f"{self.nome}_bucket{_rotulos(dict(labels, le=limite))} {acumulado}")
+        linhas.append(f"{self.nome}_bucket{_rotulos(dict(labels, le='+Inf'))} {total}")
+        linhas.append(f"{self.nome}_sum{_rotulos(labels)} {soma}")
+        linhas.append(f"{self.nome}_count{_rotulos(labels)} {total}")
+        return linhas
+
+
+class Vazao(_Metrica):
+    """
+    Medidor de eventos por minuto, calculado em uma janela deslizante.
+    """
+    tipo = "gauge"
+
+    def __init__(self, nome, ajuda, janela=300.0):
+        super().__init__(nome, ajuda)
+        self.janela = janela
+        self._eventos = deque()
+
+    def _descartar_antigos(self, agora):
+        while self._eventos and agora - self._eventos[0][0] > self.janela:
+            self._eventos.popleft()
+
+    def registrar(self, quantidade=1):
+        agora = time.monotonic()
+        with self._lock:
+            self._descartar_antigos(agora)
+            self._eventos.append((agora, quantidade))
+
+    def por_minuto(self):
+        agora = time.monotonic()
+        with self._lock:
+            self._descartar_antigos(agora)
+            total = sum(q for _, q in self._eventos)
+        return total * 60.0 / self.janela
+
+    def exportar(self):
+        return [
+            f"# HELP {self.nome} {self.ajuda}",
+            f"# TYPE {self.nome} {self.tipo}",
+            f"{self.nome} {self.por_minuto()}",
+        ]
+
+
+class Registro:
+    def __init__(self):
+        self._metricas = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nome, ajuda):
+        return self._registrar(Contador(nome, ajuda))
+
+    def medidor(self, nome, ajuda):
+        return self._registrar(Medidor(nome, ajuda))
+
+    def histograma(self, nome, ajuda, buckets=BUCKETS_PADRAO):
+        return self._registrar(Histograma(nome, ajuda, buckets))
+
+    def vazao(self, nome, ajuda, janela=300.0):
+        return self._registrar(Vazao(nome, ajuda, janela))
+
+    def exportar(self):
+        linhas = []
+        for metrica in self._metricas:
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+REGISTRO = Registro()
+
+# -------------------------------------------------------------
+# Métricas do pipeline
+# -------------------------------------------------------------
+INICIO_DRIVER = REGISTRO.histograma(
+    "maps_driver_inicio_segundos", "Tempo para iniciar uma instância do Firefox.")
+CARREGAMENTO_PAGINA = REGISTRO.histograma(
+    "maps_carregamento_pagina_segundos", "Tempo de driver.get por tipo de página.")
+ITERACAO_SCROLL = REGISTRO.histograma(
+    "maps_scroll_iteracao_segundos", "Duração de cada iteração de scroll em coletar_links_por_busca.")
+CONTAINER = REGISTRO.histograma(
+    "maps_container_segundos", "Duração do processamento de cada container em process_profiles.")
+DATA_CHECK = REGISTRO.histograma(
+    "maps_data_check_segundos", "Duração de data_check (leitura e parse da data).")
+ESCRITA_PLANILHA = REGISTRO.histograma(
+    "maps_escrita_planilha_segundos", "Duração das escritas do PlanilhaSink por etapa.")
+LICENCA = REGISTRO.histograma(
+    "maps_licenca_segundos", "Duração da verificação de liberação no painel.")
+ESPERA = REGISTRO.histograma(
+    "maps_espera_segundos", "Duração das esperas do DOM por etapa.")
+REQUISICOES_PAGINA = REGISTRO.histograma(
+    "maps_pagina_requisicoes", "Requisições feitas por página, por perfil de navegador.",
+    buckets=(10, 25, 50, 100, 200, 400, 800))
+RSS_NAVEGADOR = REGISTRO.histograma(
+    "maps_navegador_rss_bytes", "RSS da árvore de processos do navegador a cada página.",
+    buckets=(2.5e8, 5e8, 7.5e8, 1e9, 1.5e9, 2e9, 3e9, 4e9))
+COMANDOS_DRIVER = REGISTRO.histograma(
+    "maps_comando_driver_segundos", "Round trips ao geckodriver por chamada (com TRACE_DRIVER).",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+BYTES_PAGINA = REGISTRO.histograma(
+    "maps_pagina_bytes", "Bytes transferidos por página, por perfil de navegador.",
+    buckets=(1e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7))
+
+LINKS_COLETADOS = REGISTRO.contador(
+    "maps_links_coletados_total", "Links de perfil coletados pelo scanner.")
+PERFIS_PROCESSADOS = REGISTRO.contador(
+    "maps_perfis_processados_total", "Containers processados pelo filterer, por estado.")
+ERROS = REGISTRO.contador(
+    "maps_erros_total", "Erros por etapa e motivo.")
+PULADOS = REGISTRO.contador(
+    "maps_pulados_total", "Perfis pulados por motivo.")
+BLOQUEIOS = REGISTRO.contador(
+    "maps_bloqueios_total", "Páginas de bloqueio/consentimento detectadas, por motivo.")
+PRE_FILTRO = REGISTRO.contador(
+    "maps_prefiltro_containers_total", "Containers classificados pelo pré-filtro da lista, por decisão.")
+CACHE_BUSCAS = REGISTRO.contador(
+    "maps_cache_buscas_total", "Keywords atendidas pelo cache de buscas, por resultado (hit/miss/compartilhado).")
+
+RECICLAGENS = REGISTRO.contador(
+    "maps_navegador_reciclagens_total", "Navegadores reciclados pelo supervisor, por motivo.")
+
+LIMITE_CONCORRENCIA = REGISTRO.medidor(
+    "maps_ritmo_concorrencia", "Requisições simultâneas permitidas pelo controle de ritmo.")
+PICO_RSS_NAVEGADOR = REGISTRO.medidor(
+    "maps_navegador_rss_pico_bytes", "Maior RSS de um navegador na execução, por supervisor.")
+INTERVALO_REQUISICOES = REGISTRO.medidor(
+    "maps_ritmo_intervalo_segundos", "Intervalo mínimo entre requisições do controle de ritmo.")
+
+LINKS_POR_MINUTO = REGISTRO.vazao(
+    "maps_links_por_minuto", "Links coletados por minuto (janela de 5 minutos).")
+PERFIS_POR_MINUTO = REGISTRO.vazao(
+    "maps_perfis_por_minuto", "Perfis processados por minuto (janela de 5 minutos).")
+
+
+def exportar():
+    return REGISTRO.exportar()
@@ -0,0 +1,227 @@
+# -------------------------------------------------------------------
+# multitab.py
+# -------------------------------------------------------------------
+# Extração com várias abas em um único navegador: enquanto a página da
+# aba atual é processada, as próximas URLs já carregam nas outras abas
+# (round-robin entre os window handles). As abas dividem o processo
+# principal do Firefox, então em máquinas com pouca RAM rendem mais
+# perfis por GB do que abrir mais navegadores. Com 1 aba (padrão)
+# scanner e filterer seguem no modo antigo: driver.get e processa.
+# -------------------------------------------------------------------
+
+import os
+import logging
+from collections import deque, Counter
+import metrics
+from waits import esperar
+from browser_pool import driver_saudavel
+from supervisor import CAIU
+from rate_control import RODADAS_MAX
+from instrumented_driver import registrar_snapshot
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# Configuração (vai buscar em variáveis de ambiente)
+# -------------------------------------------------------------
+# Abas por navegador no filterer (run_filter serial) e no scanner
+ABAS_FILTRO = int(os.environ.get("ABAS_FILTRO", "1"))
+ABAS_SCANNER = int(os.environ.get("ABAS_SCANNER", "1"))
+# Tempo máximo esperando a página de uma aba terminar de carregar
+TIMEOUT_CARREGAMENTO = float(os.environ.get("ABAS_TIMEOUT_CARREGAMENTO", "30"))
+
+# Navega sem esperar o load (driver.get bloquearia até o fim). A marca
+# some junto com o documento antigo: a aba só conta como carregada
+# quando o documento novo estiver completo.
+JS_NAVEGAR = "window.__aba_anterior = true; window.location.href = arguments[0];"
+JS_CARREGADA = "return !window.__aba_anterior && document.readyState === 'complete';"
+
+
+def pagina_carregada(driver):
+    return driver.execute_script(JS_CARREGADA)
+
+
+class _Aba:
+    __slots__ = ("handle", "item")
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.item = None
+
+
+class ProcessadorAbas:
+    """
+    Processa itens em `abas` abas do mesmo driver:
+        processador = ProcessadorAbas(driver, abas, url_de=..., ritmo=...)
+        try:
+            for item, resultado in processador.executar(itens, tarefa, refazer): ...
+        finally:
+            processador.fechar()
+    `tarefa(driver, item)` roda com a aba do item em foco e a página já
+    carregada, e não deve navegar. Quando `refazer(resultado)` é verdadeiro
+    (ex.: página de bloqueio) o item volta para a fila, até `rodadas` vezes.
+    Resultado None = a tarefa levantou exceção ou o navegador caiu duas
+    vezes no mesmo item.
+    Com `supervisor` e `fabrica`, o navegador é reciclado entre itens
+    (RSS/páginas) e quando cai; as URLs que carregavam nas outras abas
+    voltam para a fila. Sem eles, a queda é repassada ao chamador.
+    """
+
+    def __init__(self, driver, abas, url_de=lambda item: item, ritmo=None,
+                 supervisor=None, fabrica=None, rodadas=RODADAS_MAX):
+        self.driver = driver
+        self.abas = max(1, abas)
+        self.url_de = url_de
+        self.ritmo = ritmo
+        self.supervisor = supervisor
+        self.fabrica = fabrica
+        self.rodadas = rodadas
+        self._fila = deque()      # itens devolvidos (passam na frente da fonte)
+        self._fonte = iter(())
+        self._tentativas = Counter()
+        self._quedas = Counter()
+        self._refazer = lambda resultado: False
+        self._abrir_abas()
+
+    # ---------------------------------------------------------
+    # Abas
+    # ---------------------------------------------------------
+    def _abrir_abas(self):
+        self._principal = self.driver.current_window_handle
+        self._abas = [_Aba(self._principal)]
+        for _ in range(self.abas - 1):
+            self.driver.switch_to.new_window("tab")
+            self._abas.append(_Aba(self.driver.current_window_handle))
+        self._foco = self._abas[-1].handle
+        logger.info(f"🗂️ {self.abas} abas abertas no navegador.")
+
+    def _focar(self, aba):
+        if self._foco != aba.handle:
+            self.driver.switch_to.window(aba.handle)
+            self._foco = aba.handle
+
+    def _proximo(self):
+        if self._fila:
+            return self._fila.popleft()
+        return next(self._fonte, None)
+
+    def _carregar(self, aba):
+        """
+        Começa a carregar o próximo item na `aba` sem esperar o load.
+        """
+        aba.item = self._proximo()
+        if aba.item is None:
+            return
+        if self.ritmo is not None:
+            self.ritmo.aguardar_sessao(self.driver)
+            # Só o intervalo entre inícios: a concorrência já é limitada
+            # pelo número de abas
+            with self.ritmo.permissao():
+                pass
+        self._focar(aba)
+        self.driver.execute_script(JS_NAVEGAR, self.url_de(aba.item))
+
+    def _avancar(self, aba):
+        try:
+            self._carregar(aba)
+        except Exception:
+            if self.fabrica is None or driver_saudavel(self.driver):
+                raise
+            self._reiniciar(CAIU)
+
+    def _reiniciar(self, motivo):
+        """
+        Troca o navegador: os itens em andamento voltam para a frente da
+        fila (na mesma ordem) e as abas são reabertas no navegador novo.
+        """
+        pendentes = [aba.item for aba in self._abas if aba.item is not None]
+        for aba in self._abas:
+            aba.item = None
+        self._fila.extendleft(reversed(pendentes))
+        self.driver = self.supervisor.reciclar(self.driver, self.fabrica, motivo)
+        self._abrir_abas()
+        for aba in self._abas:
+            self._avancar(aba)
+
+    # ---------------------------------------------------------
+    # Execução
+    # ---------------------------------------------------------
+    def executar(self, itens, tarefa, refazer=lambda resultado: False):
+        """
+        Gera (item, resultado) na ordem em que as abas são processadas.
+        """
+        self._fonte = iter(itens)
+        self._refazer = refazer
+        while True:
+            # Abas ociosas pegam itens devolvidos à fila
+            for aba in self._abas:
+                if aba.item is None:
+                    self._avancar(aba)
+            ativas = [aba for aba in self._abas if aba.item is not None]
+            if not ativas:
+                return
+            for aba in ativas:
+                # Abas de um navegador já reciclado ficam sem item
+                if aba.item is not None:
+                    yield from self._processar(aba, tarefa)
+
+    def _processar(self, aba, tarefa):
+        item = aba.item
+        try:
+            self._focar(aba)
+            if not esperar(self.driver, pagina_carregada, TIMEOUT_CARREGAMENTO, "carregar_aba"):
+                logger.warning(f"⏳ Aba não terminou de carregar em {TIMEOUT_CARREGAMENTO:.0f}s: {item}")
+            else:
+                # A aba navegou por JS: o trace não tem o "get" que geraria o snapshot
+                registrar_snapshot(self.driver)
+            resultado = tarefa(self.driver, item)
+        except Exception as e:
+            if driver_saudavel(self.driver):
+                logger.error(f"Erro ao processar '{item}' na aba: {e}")
+                metrics.ERROS.inc(etapa="aba", motivo=type(e).__name__)
+                resultado = None
+            elif self.fabrica is None:
+                raise
+            else:
+                # O item é refeito uma vez em um navegador novo
+                self._quedas[item] += 1
+                desistir = self._quedas[item] > 1
+                if desistir:
+                    aba.item = None
+                logger.warning(f"💥 Navegador caiu em '{item}'.")
+                self._reiniciar(CAIU)
+                if desistir:
+                    yield item, None
+                return
+
+        aba.item = None
+        refeito = False
+        if resultado is not None and self._refazer(resultado):
+            if self._tentativas[item] < self.rodadas - 1:
+                self._tentativas[item] += 1
+                self._fila.append(item)
+                refeito = True
+            else:
+                logger.error(f"❌ '{item}' continuou bloqueado após {self.rodadas} rodadas.")
+
+        motivo = self.supervisor.verificar(self.driver) if self.supervisor else None
+        if motivo and self.fabrica is not None:
+            self._reiniciar(motivo)
+        else:
+            # A próxima URL desta aba carrega enquanto as outras são processadas
+            self._avancar(aba)
+        if not refeito:
+            yield item, resultado
+
+    def fechar(self):
+        """
+        Fecha as abas extras e volta o foco para a aba principal.
+        """
+        try:
+            for aba in self._abas[1:]:
+                self._focar(aba)
+                self.driver.close()
+            self.driver.switch_to.window(self._principal)
+            self._foco = self._principal
+        except Exception as e:
+            logger.debug(f"Erro ao fechar as abas: {e}")
@@ -0,0 +1,204 @@
+# -------------------------------------------------------------------
+# place_index.py
+# -------------------------------------------------------------------
+# Índice persistente (SQLite em dados/) de lugares já vistos, chaveado
+# pelo identificador canônico extraído da URL do Maps, com o telefone
+# como chave secundária. Usado por scanner, filterer e main.run_search
+# para deduplicar links e registros entre execuções.
+# -------------------------------------------------------------------
+
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from urllib.parse import urlsplit, unquote
+
+logger = logging.getLogger(__name__)
+
+NOME_ARQUIVO = "indice.sqlite3"
+
+_RE_FID = re.compile(r"!1s(0x[0-9a-fA-F]+):(0x[0-9a-fA-F]+)")
+_RE_CID = re.compile(r"[?&]cid=(\d+)")
+_RE_PLACE_ID = re.compile(r"place_id[:=](ChIJ[\w-]+)")
+_RE_KGMID = re.compile(r"!16s(/g/[\w-]+)")
+
+
+def extrair_place_id(url):
+    """
+    Retorna o identificador canônico do lugar a partir de uma URL do Maps.
+    URLs do mesmo lugar com parâmetros de query/data diferentes geram o
+    mesmo identificador. Ordem de preferência:
+      - CID (segunda metade do feature id `!1s0x...:0x...` ou `?cid=`)
+      - place_id `ChIJ...`
+      - kgmid `!16s/g/...`
+      - URL sem query/fragmento
+    """
+    if not url:
+        return None
+    url = url.strip()
+    texto = unquote(url)
+    m = _RE_FID.search(texto)
+    if m:
+        return f"cid:{int(m.group(2), 16)}"
+    m = _RE_CID.search(texto)
+    if m:
+        return f"cid:{int(m.group(1))}"
+    m = _RE_PLACE_ID.search(texto)
+    if m:
+        return f"pid:{m.group(1)}"
+    m = _RE_KGMID.search(texto)
+    if m:
+        return f"kg:{m.group(1)}"
+    partes = urlsplit(url)
+    return f"url:{partes.netloc.lower()}{partes.path.rstrip('/')}"
+
+
+class IndiceLugares:
+    """
+    Tabela `lugares` com um registro por lugar:
+      - place_id: identificador canônico (chave primária)
+      - url: primeira URL vista para o lugar
+      - telefone: preenchido quando o registro é salvo na planilha
+      - origem: quem viu o lugar primeiro (scanner, web, filterer)
+      - processado_em: quando o filterer terminou a URL
+    Todas as consultas são por chave (O(1) via índice do SQLite).
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self.novo = not os.path.exists(caminho)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS lugares (
+                place_id      TEXT PRIMARY KEY,
+                url           TEXT NOT NULL,
+                telefone      TEXT,
+                origem        TEXT,
+                criado_em     REAL NOT NULL,
+                processado_em REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_lugares_telefone ON lugares(telefone);
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def para_dados(cls, dados_dir):
+        return cls(os.path.join(dados_dir, NOME_ARQUIVO))
+
+    def contem(self, url) -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT 1 FROM lugares WHERE place_id = ?", (extrair_place_id(url),)
+            )
+            return cur.fetchone() is not None
+
+    def processado(self, url) -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT 1 FROM lugares WHERE place_id = ? AND processado_em IS NOT NULL",
+                (extrair_place_id(url),)
+            )
+            return cur.fetchone() is not None
+
+    def telefone_existe(self, telefone) -> bool:
+        if not telefone:
+            return False
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT 1 FROM lugares WHERE telefone = ? LIMIT 1", (telefone,)
+            )
+            return cur.fetchone() is not None
+
+    def adicionar(self, url, origem=None) -> bool:
+        """
+        Registra o lugar da URL. Retorna True se ele ainda não existia.
+        """
+        return bool(self.filtrar_novos([url], origem))
+
+    def filtrar_novos(self, urls, origem=None):
+        """
+        Registra as URLs e retorna, na ordem recebida, apenas as de lugares
+        ainda não vistos (uma URL por lugar, mesmo que repetido no lote).
+        """
+        novos = []
+        agora = time.time()
+        with self._lock:
+            for url in urls:
+                place_id = extrair_place_id(url)
+                if not place_id:
+                    continue
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO lugares (place_id, url, origem, criado_em) "
+                    "VALUES (?, ?, ?, ?)",
+                    (place_id, url, origem, agora)
+                )
+                if cur.rowcount:
+                    novos.append(url)
+            self._conn.commit()
+        return novos
+
+    def registrar_telefones(self, pares):
+        """
+        Associa telefones aos lugares: `pares` é uma sequência de (url, telefone).
+        """
+        agora = time.time()
+        with self._lock:
+            for url, telefone in pares:
+                place_id = extrair_place_id(url)
+                if not place_id:
+                    continue
+                self._conn.execute(
+                    "INSERT INTO lugares (place_id, url, telefone, origem, criado_em) "
+                    "VALUES (?, ?, ?, 'filterer', ?) "
+                    "ON CONFLICT(place_id) DO UPDATE SET telefone = excluded.telefone",
+                    (place_id, url, telefone, agora)
+                )
+            self._conn.commit()
+
+    def marcar_processado(self, url):
+        agora = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO lugares (place_id, url, origem, criado_em, processado_em) "
+                "VALUES (?, ?, 'filterer', ?, ?) "
+                "ON CONFLICT(place_id) DO UPDATE SET processado_em = excluded.processado_em",
+                (extrair_place_id(url), url, agora, agora)
+            )
+            self._conn.commit()
+
+    def limpar_processados(self):
+        """
+        Esquece quais lugares o filterer já terminou (execução do zero).
+        Os telefones continuam valendo para deduplicar registros.
+        """
+        with self._lock:
+            self._conn.execute("UPDATE lugares SET processado_em = NULL")
+            self._conn.commit()
+
+    def importar_arquivo(self, caminho, origem=None) -> int:
+        """
+        Registra todas as URLs de um arquivo de links (uma por linha).
+        Usado para popular um índice recém-criado a partir de links.txt.
+        """
+        if not os.path.exists(caminho):
+            return 0
+        with open(caminho, "r", encoding="utf-8") as f:
+            novos = self.filtrar_novos((l.strip() for l in f if l.strip()), origem)
+        logger.info(f"📇 {len(novos)} lugares importados de {os.path.basename(caminho)}.")
+        return len(novos)
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
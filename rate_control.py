@@ -0,0 +1,279 @@
+# -------------------------------------------------------------------
+# rate_control.py
+# -------------------------------------------------------------------
+# Controle adaptativo de ritmo compartilhado por scanner, filterer e
+# filter_pipeline: detecta páginas de bloqueio ("tráfego incomum",
+# captcha, HTTP 429) e de consentimento, ajusta concorrência e intervalo entre
+# requisições com AIMD (aumento aditivo, redução multiplicativa), põe
+# a sessão culpada em quarentena e devolve o trabalho para a fila.
+# -------------------------------------------------------------------
+
+import os
+import time
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# Configuração (vai buscar em variáveis de ambiente)
+# -------------------------------------------------------------
+INTERVALO_MIN = float(os.environ.get("RITMO_INTERVALO_MIN", "0"))
+INTERVALO_MAX = float(os.environ.get("RITMO_INTERVALO_MAX", "30"))
+# Sucessos seguidos para +1 de concorrência e -PASSO_INTERVALO no intervalo
+SUCESSOS_PARA_AUMENTAR = int(os.environ.get("RITMO_SUCESSOS", "10"))
+PASSO_INTERVALO = float(os.environ.get("RITMO_PASSO_INTERVALO", "0.5"))
+FATOR_REDUCAO = 0.5
+QUARENTENA = float(os.environ.get("RITMO_QUARENTENA", "120"))
+RODADAS_MAX = int(os.environ.get("RITMO_RODADAS_MAX", "3"))
+
+CONSENTIMENTO = "consentimento"
+TRAFEGO_INCOMUM = "trafego_incomum"
+CAPTCHA = "captcha"
+HTTP_429 = "http_429"
+
+# Devolvido por ControladorTaxa.envolver quando o item precisa ser refeito
+BLOQUEADO = object()
+
+_JS_PAGINA = """
+var corpo = document.body ? document.body.innerText.slice(0, 4000).toLowerCase() : '';
+return [
+  location.href,
+  corpo,
+  !!document.querySelector("iframe[src*='recaptcha'], .g-recaptcha, #captcha-form"),
+  !!document.querySelector("form[action*='consent.google'], form[action*='consent.youtube']"),
+  (performance.getEntriesByType('navigation')[0] || {}).responseStatus || 0
+];
+"""
+
+TEXTOS_TRAFEGO = ("unusual traffic", "tráfego incomum", "trafego incomum", "não é um robô")
+TEXTOS_CONSENTIMENTO = ("antes de ir para o google", "before you continue to google")
+
+_JS_ACEITAR = """
+var alvo = Array.prototype.find.call(document.querySelectorAll('button, input[type=submit]'),
+  function (b) { return /aceitar tudo|accept all|rejeitar tudo|reject all/i.test(b.innerText || b.value || ''); });
+if (alvo) { alvo.click(); return true; }
+return false;
+"""
+
+
+def detectar_bloqueio(driver):
+    """
+    Classifica a página atual: CONSENTIMENTO, TRAFEGO_INCOMUM, CAPTCHA,
+    HTTP_429 ou None (página normal). Uma única chamada ao navegador.
+    """
+    try:
+        url, corpo, recaptcha, form_consentimento, status = driver.execute_script(_JS_PAGINA)
+    except Exception:
+        return None
+    if status == 429:
+        return HTTP_429
+    if "/sorry/" in url or any(t in corpo for t in TEXTOS_TRAFEGO):
+        return TRAFEGO_INCOMUM
+    if recaptcha:
+        return CAPTCHA
+    if "consent." in url.split("?")[0] or form_consentimento or any(
+            t in corpo for t in TEXTOS_CONSENTIMENTO):
+        return CONSENTIMENTO
+    return None
+
+
+def resolver_consentimento(driver, timeout=5.0):
+    """
+    Clica em "Aceitar tudo"/"Rejeitar tudo" e espera sair da página de
+    consentimento. Retorna True se conseguiu.
+    """
+    try:
+        if not driver.execute_script(_JS_ACEITAR):
+            return False
+    except Exception:
+        return False
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if detectar_bloqueio(driver) != CONSENTIMENTO:
+            logger.info("🍪 Consentimento aceito.")
+            return True
+        time.sleep(0.2)
+    return False
+
+
+class ControladorTaxa:
+    """
+    AIMD sobre duas grandezas compartilhadas entre as sessões:
+      - `limite`: quantas requisições podem estar em andamento ao mesmo tempo
+      - `intervalo`: tempo mínimo entre o início de duas requisições
+    A cada SUCESSOS_PARA_AUMENTAR sucessos seguidos, limite +1 e intervalo
+    -PASSO_INTERVALO; a cada bloqueio, limite × FATOR_REDUCAO e intervalo × 2,
+    e a sessão culpada fica QUARENTENA segundos sem trabalhar.
+    Só conta como bloqueio uma página com indicador positivo (ver
+    detectar_bloqueio): lista vazia sozinha é uma busca sem resultados.
+    """
+
+    def __init__(self, concorrencia_max, concorrencia_min=1, intervalo=INTERVALO_MIN):
+        self.concorrencia_max = max(1, concorrencia_max)
+        self.concorrencia_min = max(1, min(concorrencia_min, self.concorrencia_max))
+        self.limite = float(self.concorrencia_max)
+        self.intervalo = intervalo
+        self._em_andamento = 0
+        self._ultimo_inicio = 0.0
+        self._sucessos = 0
+        # Sessão (driver ou requests.Session) -> fim da quarentena; some
+        # junto com a sessão, sem confundir com outra no mesmo endereço
+        self._quarentena = weakref.WeakKeyDictionary()
+        self._cond = threading.Condition()
+        self._publicar()
+
+    def _publicar(self):
+        metrics.LIMITE_CONCORRENCIA.definir(int(self.limite))
+        metrics.INTERVALO_REQUISICOES.definir(self.intervalo)
+
+    # ---------------------------------------------------------
+    # Admissão
+    # ---------------------------------------------------------
+    def _espera_necessaria(self):
+        if self._em_andamento >= int(self.limite):
+            return None
+        return max(0.0, self._ultimo_inicio + self.intervalo - time.monotonic())
+
+    def tentar_iniciar(self):
+        """
+        Versão sem bloqueio de `permissao()`: retorna True e ocupa uma vaga
+        se a requisição pode começar agora (chamar `terminar()` depois).
+        """
+        with self._cond:
+            if self._espera_necessaria() != 0.0:
+                return False
+            self._em_andamento += 1
+            self._ultimo_inicio = time.monotonic()
+            return True
+
+    def terminar(self):
+        with self._cond:
+            self._em_andamento -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def permissao(self):
+        """
+        Bloqueia até haver vaga dentro do `limite` e ter passado o
+        `intervalo` desde o início da requisição anterior.
+        """
+        with self._cond:
+            while True:
+                espera = self._espera_necessaria()
+                if espera == 0.0:
+                    break
+                self._cond.wait(timeout=espera)
+            self._em_andamento += 1
+            self._ultimo_inicio = time.monotonic()
+        try:
+            yield
+        finally:
+            self.terminar()
+
+    # ---------------------------------------------------------
+    # Realimentação
+    # ---------------------------------------------------------
+    def sucesso(self):
+        with self._cond:
+            self._sucessos += 1
+            if self._sucessos < SUCESSOS_PARA_AUMENTAR:
+                return
+            self._sucessos = 0
+            self.limite = min(self.concorrencia_max, self.limite + 1)
+            self.intervalo = max(INTERVALO_MIN, self.intervalo - PASSO_INTERVALO)
+            self._publicar()
+            self._cond.notify_all()
+
+    def bloqueio(self, motivo, sessao=None):
+        """
+        Reduz o ritmo e põe `sessao` (driver) em quarentena.
+        """
+        metrics.BLOQUEIOS.inc(motivo=motivo)
+        with self._cond:
+            self._sucessos = 0
+            self.limite = max(self.concorrencia_min, self.limite * FATOR_REDUCAO)
+            self.intervalo = min(INTERVALO_MAX, max(self.intervalo * 2, PASSO_INTERVALO))
+            if sessao is not None:
+                self._quarentena[sessao] = time.monotonic() + QUARENTENA
+            self._publicar()
+        logger.warning(
+            f"🚦 Bloqueio detectado ({motivo}). Concorrência {int(self.limite)}, "
+            f"intervalo {self.intervalo:.1f}s, sessão em quarentena por {QUARENTENA:.0f}s."
+        )
+
+    def aguardar_sessao(self, sessao):
+        """
+        Dorme até o fim da quarentena de `sessao`, se houver.
+        """
+        with self._cond:
+            fim = self._quarentena.pop(sessao, 0)
+        restante = fim - time.monotonic()
+        if restante > 0:
+            logger.info(f"😴 Sessão em quarentena por mais {restante:.0f}s.")
+            time.sleep(restante)
+
+    def avaliar(self, driver, sessao=None, vazio=False):
+        """
+        Confere a página atual depois de uma tarefa e alimenta o controle.
+        Retorna o motivo do bloqueio (item deve ser refeito) ou None.
+        Resultado `vazio` sem página de bloqueio não conta como sucesso nem
+        como bloqueio.
+        """
+        motivo = detectar_bloqueio(driver)
+        if motivo == CONSENTIMENTO:
+            metrics.BLOQUEIOS.inc(motivo=motivo)
+            resolver_consentimento(driver)
+            return motivo
+        if motivo:
+            self.bloqueio(motivo, sessao if sessao is not None else driver)
+            return motivo
+        if not vazio:
+            self.sucesso()
+        return None
+
+    def envolver(self, tarefa, vazio=lambda resultado: not resultado):
+        """
+        Adapta `tarefa(driver, item)` para executar_em_paralelo: respeita
+        quarentena/limite/intervalo e retorna BLOQUEADO quando a página
+        for de bloqueio (também se a tarefa falhar por causa dele).
+        """
+        def _tarefa(driver, item):
+            self.aguardar_sessao(driver)
+            with self.permissao():
+                try:
+                    resultado = tarefa(driver, item)
+                except Exception:
+                    if self.avaliar(driver):
+                        return BLOQUEADO
+                    raise
+                if self.avaliar(driver, vazio=vazio(resultado)):
+                    return BLOQUEADO
+                return resultado
+        return _tarefa
+
+
+def executar_com_ritmo(pool, itens, tarefa, controlador=None, rodadas=RODADAS_MAX):
+    """
+    executar_em_paralelo com controle de ritmo: itens bloqueados voltam
+    para a fila em novas rodadas (até `rodadas`). Gera (item, resultado).
+    """
+    # Import local: o controle em si não depende do Selenium (http_backend)
+    from browser_pool import executar_em_paralelo
+    controlador = controlador or ControladorTaxa(pool.tamanho)
+    pendentes = list(itens)
+    for rodada in range(1, rodadas + 1):
+        bloqueados = []
+        for item, resultado in executar_em_paralelo(pool, pendentes, controlador.envolver(tarefa)):
+            if resultado is BLOQUEADO:
+                bloqueados.append(item)
+            else:
+                yield item, resultado
+        if not bloqueados:
+            return
+        logger.warning(f"🔁 Rodada {rodada}: {len(bloqueados)} itens bloqueados voltam para a fila.")
+        pendentes = bloqueados
+    logger.error(f"❌ {len(pendentes)} itens continuaram bloqueados após {rodadas} rodadas: {pendentes}")
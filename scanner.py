@@ -6,17 +6,21 @@
 # -------------------------------------------------------------------
 
 import os
-import sys
-import time
 import logging
-import re
-import requests
-from selenium import webdriver
-from selenium.webdriver.firefox.service import Service
-from selenium.webdriver.firefox.options import Options
-from webdriver_manager.firefox import GeckoDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
+from place_index import IndiceLugares
+from licenca import verificar_em_segundo_plano, liberado
+from browser_pool import BrowserPool, executar_em_paralelo
+from rate_control import ControladorTaxa, executar_com_ritmo
+from multitab import ProcessadorAbas, ABAS_SCANNER
+import http_backend
+import metrics
+from lean_profile import perfil_para, medir_pagina, logar_consumo
+from instrumented_driver import contexto, logar_resumo_do_processo
+from waits import (
+    esperar, elemento_presente, atributo_mudou, hrefs_novos, REGISTRO
+)
 
 # -------------------------------------------------------------
 # Configuração de logging
@@ -27,128 +31,240 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# -------------------------------------------------------------
-# URL do painel remoto (vai buscar em variável de ambiente)
-# -------------------------------------------------------------
-PAINEL_URL = os.environ.get("PAINEL_URL", "https://painel-api-k2v2.onrender.com/command")
-
-def get_mac():
+def abrir_indice(links_file, origem):
     """
-    Retorna o endereço MAC principal do sistema:
-    Windows: via 'getmac'
-    Linux/Mac: via 'ifconfig'
-    Se falhar, retorna None e loga o erro.
+    Abre o índice de lugares ao lado de `links_file`. Se o índice acabou de
+    ser criado, importa os links já existentes no arquivo.
     """
-    try:
-        if sys.platform.startswith("win"):
-            import subprocess
-            output = subprocess.check_output("getmac", encoding="cp1252", errors="ignore")
-            macs = re.findall(r"([0-9A-Fa-f]{2}[-:]){5}[0-9A-Fa-f]{2}", output)
-            return macs[0].replace("-", ":").lower() if macs else None
-        else:
-            import subprocess
-            output = subprocess.check_output("ifconfig", encoding="utf-8", errors="ignore")
-            macs = re.findall(r"([0-9A-Fa-f]{2}[:]){5}[0-9A-Fa-f]{2}", output)
-            return macs[0].lower() if macs else None
-    except Exception as e:
-        logger.error(f"Erro ao obter MAC: {e}")
-        return None
+    indice = IndiceLugares.para_dados(os.path.dirname(links_file) or ".")
+    if indice.novo:
+        indice.importar_arquivo(links_file, origem)
+    return indice
 
-def verificar_liberacao(mac, tentativas=3, intervalo=2) -> bool:
+def save_new_links(new_links, links_file, indice=None, origem="scanner"):
     """
-    Tenta até `tentativas` vezes verificar no painel se o cliente está ativo.
-    Se JSON retornar {"ativo": true}, devolve True, caso contrário False.
+    Anexa a `links_file` apenas os links de lugares que ainda não estão no
+    índice (comparando pelo identificador canônico do lugar, não pela URL).
+    Retorna a lista de links adicionados.
     """
-    for tentativa in range(1, tentativas + 1):
-        try:
-            ip = requests.get("https://api.ipify.org", timeout=5).text
-            r = requests.get(PAINEL_URL, params={"mac": mac, "public_ip": ip}, timeout=10)
-            r.raise_for_status()
-            return r.json().get("ativo", False)
-        except Exception as e:
-            logger.error(f"Tentativa {tentativa}/{tentativas} falhou: {e}")
-            if tentativa < tentativas:
-                time.sleep(intervalo)
-    return False
-
-def load_saved_links(links_file):
-    if not os.path.exists(links_file):
-        return set()
-    with open(links_file, 'r', encoding='utf-8') as f:
-        return set(line.strip() for line in f if line.strip())
-
-def save_new_links(new_links, links_file):
-    existing = load_saved_links(links_file)
-    to_add = new_links - existing
+    proprio = indice is None
+    if proprio:
+        indice = abrir_indice(links_file, origem)
+    try:
+        to_add = indice.filtrar_novos(sorted(new_links), origem)
+    finally:
+        if proprio:
+            indice.fechar()
     if not to_add:
         logger.warning("Nenhum link novo para adicionar.")
-        return
+        return []
     with open(links_file, 'a', encoding='utf-8') as f:
-        for link in sorted(to_add):
+        for link in to_add:
             f.write(link + '\n')
-    logger.info(f"Adicionados {len(to_add)} novos links. Total: {len(existing | new_links)}")
+    logger.info(f"Adicionados {len(to_add)} novos links.")
+    return to_add
+
+# Base do Maps (pode apontar para o fake_maps.py em benchmarks)
+MAPS_BASE_URL = os.environ.get("MAPS_BASE_URL", "https://www.google.com/maps")
+VIEWPORT_INICIAL = "@-16.4932735,-39.3111171,12z"
+MAPS_URL_INICIAL = f"{MAPS_BASE_URL}/{VIEWPORT_INICIAL}?hl=pt-BR"
 
-def coletar_links_por_busca(busca, driver, links_file):
+# Timeouts (segundos) de cada etapa de espera
+TIMEOUT_CAMPO_BUSCA = 10
+TIMEOUT_RESULTADOS = 10
+TIMEOUT_SCROLL = 3
+
+# Hrefs atuais da lista + scroll até o último resultado, em um só round trip
+JS_COLETAR_E_ROLAR = """
+var itens = document.querySelectorAll(arguments[0]), hrefs = [];
+for (var i = 0; i < itens.length; i++) if (itens[i].href) hrefs.push(itens[i].href);
+if (itens.length) itens[itens.length - 1].scrollIntoView();
+return hrefs;
+"""
+
+def rolar_e_coletar(driver, max_scrolls=20):
     """
-    Dado um termo `busca`, faz scroll na página de resultados do Google Maps e
-    coleta todos os links de perfil (CSS selector "a.hfpxzc"), gravando-os.
-    """
-    logger.info(f"🔍 Buscando: {busca}")
-    campo = driver.find_element(By.ID, 'searchboxinput')
-    campo.clear()
-    campo.send_keys(busca)
-    campo.send_keys(Keys.ENTER)
-    time.sleep(5)
-
-    prev = 0
-    for i in range(20):
-        perfis = driver.find_elements(By.CSS_SELECTOR, 'a.hfpxzc')
-        curr = len(perfis)
-        logger.info(f"  ▶️ Scroll {i+1}: {curr} perfis carregados")
-        if curr == prev:
+    Rola a lista de resultados já aberta no driver e retorna o conjunto de
+    hrefs de perfil ("a.hfpxzc") coletados.
+    """
+    # Cada passo coleta os hrefs visíveis e rola até o último em uma só
+    # chamada; a lista virtualiza os itens antigos, então acumulamos tudo
+    # e paramos quando um passo não traz nenhum href novo
+    links = set()
+    for i in range(max_scrolls):
+        with metrics.ITERACAO_SCROLL.cronometrar():
+            antes = len(links)
+            links.update(driver.execute_script(JS_COLETAR_E_ROLAR, 'a.hfpxzc') or ())
+            if not links:
+                metrics.ERROS.inc(etapa="busca", motivo="sem_resultados")
+                break
+            chegaram = esperar(driver, hrefs_novos('a.hfpxzc', links),
+                               TIMEOUT_SCROLL, "scroll_resultados")
+            if chegaram:
+                links |= chegaram
+        logger.info(f"  ▶️ Scroll {i+1}: +{len(links) - antes} links novos ({len(links)} no total)")
+        if not chegaram:
             break
-        prev = curr
-        driver.execute_script("arguments[0].scrollIntoView();", perfis[-1])
-        time.sleep(2)
+    return links
+
+def coletar_links_por_busca(busca, driver, links_file=None, max_scrolls=20):
+    """
+    Dado um termo `busca`, faz scroll na página de resultados do Google Maps e
+    coleta todos os links de perfil (CSS selector "a.hfpxzc").
+    Retorna o conjunto de links; se `links_file` for informado, também os grava.
+    """
+    with contexto("keyword", busca):
+        logger.info(f"🔍 Buscando: {busca}")
+        campo = esperar(driver, elemento_presente(By.ID, 'searchboxinput'),
+                        TIMEOUT_CAMPO_BUSCA, "campo_busca", obrigatorio=True)
+        # Resultados da busca anterior continuam no DOM até serem substituídos
+        anteriores = driver.find_elements(By.CSS_SELECTOR, 'a.hfpxzc')
+        primeiro_anterior = anteriores[0].get_attribute('href') if anteriores else None
+        campo.clear()
+        campo.send_keys(busca)
+        campo.send_keys(Keys.ENTER)
+        esperar(driver, atributo_mudou('a.hfpxzc', 'href', primeiro_anterior),
+                TIMEOUT_RESULTADOS, "resultados_busca")
+
+        links = rolar_e_coletar(driver, max_scrolls)
+        medir_pagina(driver, "busca")
+        metrics.LINKS_COLETADOS.inc(len(links))
+        metrics.LINKS_POR_MINUTO.registrar(len(links))
+        if links_file:
+            save_new_links(links, links_file)
+        return links
 
-    links = {p.get_attribute('href') for p in perfis if p.get_attribute('href')}
-    save_new_links(links, links_file)
+def coletar_links_na_aba(busca, driver, max_scrolls=20):
+    """
+    Versão de coletar_links_por_busca para a página de resultados de
+    `busca` já carregada na aba atual (multitab.py), sem digitar na caixa
+    de busca.
+    """
+    with contexto("keyword", busca):
+        if esperar(driver, hrefs_novos('a.hfpxzc', set()), TIMEOUT_RESULTADOS, "resultados_aba"):
+            links = rolar_e_coletar(driver, max_scrolls)
+        elif "/maps/place/" in driver.current_url:
+            # Resultado único: o Maps abre o lugar direto
+            links = {driver.current_url}
+        else:
+            links = set()
+        medir_pagina(driver, "busca")
+        metrics.LINKS_COLETADOS.inc(len(links))
+        metrics.LINKS_POR_MINUTO.registrar(len(links))
+        return links
 
-def run_scanner(keywords, dados_dir):
+def run_scanner(keywords, dados_dir, workers=None, bbox=None, cidade=None, zoom=None, abas=None):
     """
     Ponto de entrada para disparar a coleta de links:
-      - Verifica liberação no painel remoto
+      - Verifica liberação no painel remoto (em paralelo com a subida dos navegadores)
       - Cria/usa o arquivo dados/links.txt
-      - Inicia Selenium headless, navega no Maps, coleta para cada keyword
+      - Distribui as keywords entre `workers` navegadores headless (BrowserPool)
+      - Junta os links de todas as keywords e grava em um único ponto
+    Com `bbox` (sul, oeste, norte, leste) ou `cidade`, roda o modo em tiles
+    (tiling.py) em vez do viewport fixo de MAPS_URL_INICIAL.
+    Com MAPS_BACKEND "http"/"auto", busca primeiro sem navegador
+    (http_backend.py); no "auto", só as keywords que falharem abrem o Firefox.
+    Com `abas` > 1 (ou ABAS_SCANNER), cada navegador carrega as próximas
+    buscas em outras abas enquanto rola a atual (multitab.py).
     """
-    mac = get_mac()
-    if not mac:
-        logger.error("Não foi possível obter o endereço MAC. Abortando.")
-        return
+    if bbox or cidade:
+        from tiling import run_scanner_em_tiles
+        return run_scanner_em_tiles(keywords, dados_dir, bbox=bbox, cidade=cidade,
+                                    zoom=zoom, workers=workers)
 
-    logger.info("→ Verificando liberação junto ao painel remoto…")
-    if not verificar_liberacao(mac):
-        logger.error("Cliente BLOQUEADO. Abortando.")
-        return
+    licenca = verificar_em_segundo_plano()
 
     LINKS_FILE = os.path.join(dados_dir, "links.txt")
     logger.info(f"⚙️ Iniciando coleta para {len(keywords)} palavras-chave.")
 
-    # Configura Selenium Firefox em modo headless
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    service = Service(GeckoDriverManager().install())
-    driver = webdriver.Firefox(service=service, options=options)
+    coletados = set()
+    pendentes = list(keywords)
+    if http_backend.usar_http():
+        if not liberado(licenca):
+            return
+        falhas = []
+        resultados = http_backend.executar_http(
+            keywords, lambda kw: http_backend.buscar_links(kw, VIEWPORT_INICIAL), falhas
+        )
+        for idx, (chave, links) in enumerate(resultados, 1):
+            logger.info(f"=== CONCLUÍDO (HTTP) {idx}/{len(keywords)}: '{chave}' ({len(links)} links) ===")
+            coletados |= links
+        pendentes = falhas if http_backend.com_fallback() else []
+        if pendentes:
+            logger.warning(f"🦊 {len(pendentes)} palavras-chave voltam para o Selenium.")
+        elif falhas:
+            logger.error(f"❌ {len(falhas)} palavras-chave falharam no caminho HTTP: {falhas}")
 
-    # Navega no Google Maps
-    driver.get("https://www.google.com/maps/@-16.4932735,-39.3111171,12z?hl=pt-BR")
-    time.sleep(5)
-
-    for idx, chave in enumerate(keywords, 1):
-        logger.info(f"=== EXECUTANDO {idx}/{len(keywords)}: '{chave}' ===")
-        coletar_links_por_busca(chave, driver, LINKS_FILE)
+    perfil = perfil_para("scanner")
+    abas = abas or ABAS_SCANNER
+    if pendentes and not _buscar_no_navegador(pendentes, licenca, coletados, workers, perfil, abas):
+        return
 
-    driver.quit()
+    save_new_links(coletados, LINKS_FILE)
+    REGISTRO.logar_resumo()
+    logar_resumo_do_processo()
+    logar_consumo("busca", perfil)
     logger.info("🏁 Processo de coleta de links finalizado.")
+
+def _buscar_no_navegador(keywords, licenca, coletados, workers, perfil, abas=1):
+    """
+    Coleta as `keywords` no BrowserPool e acumula os links em `coletados`.
+    Retorna False se o cliente estiver bloqueado no painel.
+    """
+    with BrowserPool(tamanho=workers, url_inicial=MAPS_URL_INICIAL, perfil=perfil) as pool:
+        # Os navegadores sobem enquanto o painel responde; se o cliente
+        # estiver bloqueado, o pool é fechado ao sair do bloco.
+        pool.aquecer()
+        if not liberado(licenca):
+            return False
+        logger.info(f"🧵 Usando até {pool.tamanho} navegadores em paralelo.")
+        if abas > 1:
+            resultados = _buscar_em_abas(pool, keywords, abas)
+        else:
+            # Keywords que caírem em página de bloqueio voltam para a fila
+            resultados = executar_com_ritmo(pool, keywords, coletar_links_por_busca)
+        for idx, (chave, links) in enumerate(resultados, 1):
+            logger.info(f"=== CONCLUÍDO {idx}/{len(keywords)}: '{chave}' ({len(links)} links) ===")
+            coletados |= links
+    return True
+
+def _buscar_em_abas(pool, keywords, abas):
+    """
+    Distribui as `keywords` em lotes entre os navegadores do pool; cada
+    lote roda em `abas` abas do mesmo navegador. Gera (keyword, links).
+    """
+    controlador = ControladorTaxa(pool.tamanho * abas)
+    tamanho_lote = abas * 4
+    lotes = [tuple(keywords[i:i + tamanho_lote]) for i in range(0, len(keywords), tamanho_lote)]
+
+    def _coletar(driver, busca):
+        try:
+            links = coletar_links_na_aba(busca, driver)
+        except Exception:
+            if controlador.avaliar(driver):
+                return set(), True
+            raise
+        return links, controlador.avaliar(driver, vazio=not links) is not None
+
+    def _lote(driver, lote):
+        # Com o supervisor do pool, cada keyword conta como página para a
+        # reciclagem e, se o navegador cair, as keywords das abas voltam
+        # para a fila em um navegador novo
+        processador = ProcessadorAbas(
+            driver, abas, url_de=lambda busca: http_backend.url_busca(busca, VIEWPORT_INICIAL),
+            ritmo=controlador, supervisor=pool.supervisor, fabrica=pool.fabrica
+        )
+        try:
+            # Keywords que caírem em página de bloqueio voltam para a fila
+            return [
+                (busca, resultado[0])
+                for busca, resultado in processador.executar(lote, _coletar, lambda r: r[1])
+                if resultado is not None and not resultado[1]
+            ]
+        finally:
+            processador.fechar()
+            # Quem volta ao pool é o navegador com que o processador terminou
+            pool.adotar(driver, processador.driver)
+
+    for _, resultados in executar_em_paralelo(pool, lotes, _lote):
+        yield from resultados
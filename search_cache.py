@@ -0,0 +1,258 @@
+# -------------------------------------------------------------------
+# search_cache.py
+# -------------------------------------------------------------------
+# Cache dos links por palavra-chave na frente de main.run_search:
+# chave = keyword normalizada + viewport, validade (TTL) configurável,
+# descarte LRU acima de CACHE_MAXIMO entradas e journal JSONL opcional
+# em disco, compactado ao abrir e sempre que acumula CACHE_MAXIMO
+# linhas de entradas substituídas, expiradas ou descartadas. Buscas iguais ao mesmo tempo compartilham uma única coleta
+# (single-flight): a primeira coleta, as demais esperam o resultado.
+# -------------------------------------------------------------------
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# Configuração (vai buscar em variáveis de ambiente)
+# -------------------------------------------------------------
+CACHE_TTL = float(os.environ.get("CACHE_BUSCAS_TTL", "1800"))
+CACHE_MAXIMO = int(os.environ.get("CACHE_BUSCAS_MAXIMO", "500"))
+# Journal em disco (vazio = só memória)
+CACHE_ARQUIVO = os.environ.get("CACHE_BUSCAS_ARQUIVO", "")
+# Tempo máximo esperando a coleta de outro job antes de coletar por conta própria
+CACHE_ESPERA_MAX = float(os.environ.get("CACHE_BUSCAS_ESPERA", "600"))
+
+HIT = "hit"
+MISS = "miss"
+COMPARTILHADO = "compartilhado"
+
+
+def normalizar(keyword):
+    """
+    "  Dentista   Itabúna " -> "dentista itabuna": sem acentos, caixa ou
+    espaços repetidos (o Maps trata essas variações como a mesma busca).
+    """
+    texto = unicodedata.normalize("NFKD", keyword)
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", texto).strip().casefold()
+
+
+class _Coleta:
+    """
+    Coleta em andamento de uma chave; quem espera recebe `links`
+    (None se o responsável desistiu ou falhou).
+    """
+
+    def __init__(self):
+        self.pronta = threading.Event()
+        self.links = None
+
+
+class Reserva:
+    """
+    Resultado de `CacheBuscas.reservar` para um lote de keywords:
+      - `prontos`: {keyword: links} já em cache
+      - `coletar`: keywords que este chamador deve coletar e `publicar`
+      - `aguardar`: {keyword: coleta} em andamento por outro chamador
+    """
+
+    def __init__(self, viewport):
+        self.viewport = viewport
+        self.prontos = {}
+        self.coletar = []
+        self.aguardar = {}
+        self._proprias = {}
+
+
+class CacheBuscas:
+    """
+    Cache LRU com TTL de {(keyword normalizada, viewport): links}.
+    Uso típico:
+        reserva = cache.reservar(keywords, viewport)
+        try:
+            for kw, links in coletar(reserva.coletar):
+                cache.publicar(reserva, kw, links)
+        finally:
+            cache.liberar(reserva)
+        for kw, links in cache.aguardar(reserva): ...
+    """
+
+    def __init__(self, ttl=CACHE_TTL, maximo=CACHE_MAXIMO, arquivo=CACHE_ARQUIVO or None):
+        self.ttl = ttl
+        self.maximo = max(1, maximo)
+        self.arquivo = arquivo
+        self._entradas = OrderedDict()   # chave -> (expira_em, links)
+        self._coletas = {}               # chave -> _Coleta
+        self._lock = threading.Lock()
+        self._journal = None
+        self._linhas_journal = 0
+        if arquivo:
+            self._carregar()
+            self._journal = open(arquivo, "a", encoding="utf-8")
+
+    @staticmethod
+    def chave(keyword, viewport=None):
+        return normalizar(keyword), viewport or ""
+
+    # ---------------------------------------------------------
+    # Persistência
+    # ---------------------------------------------------------
+    def _carregar(self):
+        """
+        Relê o journal (a última entrada de cada chave vale), descarta as
+        expiradas e o reescreve compactado se sobrou alguma linha morta.
+        """
+        if not os.path.exists(self.arquivo):
+            return
+        linhas = 0
+        agora = time.time()
+        with open(self.arquivo, "r", encoding="utf-8") as f:
+            for linha in f:
+                linhas += 1
+                try:
+                    e = json.loads(linha)
+                except ValueError:
+                    continue
+                chave = (e["keyword"], e["viewport"])
+                self._entradas.pop(chave, None)
+                if e["expira_em"] > agora:
+                    self._entradas[chave] = (e["expira_em"], e["links"])
+        while len(self._entradas) > self.maximo:
+            self._entradas.popitem(last=False)
+        self._linhas_journal = linhas
+        if linhas > len(self._entradas):
+            self._compactar()
+        logger.info(f"🗃️ Cache de buscas retomado: {len(self._entradas)} entradas válidas.")
+
+    def _compactar(self):
+        """
+        Reescreve o journal só com as entradas válidas em memória (com o
+        lock, ou antes de o journal ser aberto).
+        """
+        agora = time.time()
+        for chave in [c for c, (expira_em, _) in self._entradas.items() if expira_em <= agora]:
+            del self._entradas[chave]
+        if self._journal:
+            self._journal.close()
+        tmp = self.arquivo + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for chave, (expira_em, links) in self._entradas.items():
+                f.write(self._linha(chave, expira_em, links))
+        os.replace(tmp, self.arquivo)
+        self._linhas_journal = len(self._entradas)
+        if self._journal:
+            self._journal = open(self.arquivo, "a", encoding="utf-8")
+
+    @staticmethod
+    def _linha(chave, expira_em, links):
+        return json.dumps({"keyword": chave[0], "viewport": chave[1],
+                           "expira_em": expira_em, "links": links}, ensure_ascii=False) + "\n"
+
+    # ---------------------------------------------------------
+    # Consulta
+    # ---------------------------------------------------------
+    def _valida(self, chave):
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            return None
+        if entrada[0] <= time.time():
+            del self._entradas[chave]
+            return None
+        self._entradas.move_to_end(chave)
+        return entrada[1]
+
+    def reservar(self, keywords, viewport=None, forcar=False):
+        """
+        Separa `keywords` entre prontas, a coletar e em coleta por outro
+        chamador. Com `forcar`, ignora o cache (mas ainda se junta a uma
+        coleta que já esteja em andamento).
+        """
+        reserva = Reserva(viewport)
+        with self._lock:
+            for kw in keywords:
+                chave = self.chave(kw, viewport)
+                links = None if forcar else self._valida(chave)
+                if links is not None:
+                    reserva.prontos[kw] = links
+                    metrics.CACHE_BUSCAS.inc(resultado=HIT)
+                elif chave in self._coletas:
+                    reserva.aguardar[kw] = self._coletas[chave]
+                    metrics.CACHE_BUSCAS.inc(resultado=COMPARTILHADO)
+                elif chave in reserva._proprias:
+                    # Mesma keyword repetida (com outra grafia) no lote
+                    reserva.aguardar[kw] = reserva._proprias[chave]
+                else:
+                    coleta = _Coleta()
+                    self._coletas[chave] = reserva._proprias[chave] = coleta
+                    reserva.coletar.append(kw)
+                    metrics.CACHE_BUSCAS.inc(resultado=MISS)
+        return reserva
+
+    def publicar(self, reserva, keyword, links):
+        """
+        Guarda os `links` coletados de `keyword` e acorda quem espera.
+        """
+        chave = self.chave(keyword, reserva.viewport)
+        links = sorted(links)
+        expira_em = time.time() + self.ttl
+        with self._lock:
+            self._entradas[chave] = (expira_em, links)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+            coleta = reserva._proprias.pop(chave, None)
+            if coleta is not None and self._coletas.get(chave) is coleta:
+                del self._coletas[chave]
+            if self._journal:
+                self._journal.write(self._linha(chave, expira_em, links))
+                self._journal.flush()
+                self._linhas_journal += 1
+                # Linhas de entradas substituídas, expiradas ou descartadas
+                if self._linhas_journal - len(self._entradas) >= self.maximo:
+                    self._compactar()
+        if coleta is not None:
+            coleta.links = links
+            coleta.pronta.set()
+
+    def liberar(self, reserva):
+        """
+        Encerra as coletas da reserva que não foram publicadas (falha):
+        quem espera por elas recebe None e coleta por conta própria.
+        """
+        with self._lock:
+            pendentes = list(reserva._proprias.items())
+            reserva._proprias.clear()
+            for chave, coleta in pendentes:
+                if self._coletas.get(chave) is coleta:
+                    del self._coletas[chave]
+        for _, coleta in pendentes:
+            coleta.pronta.set()
+
+    def aguardar(self, reserva, timeout=CACHE_ESPERA_MAX):
+        """
+        Gera (keyword, links) das coletas de outros chamadores; links é None
+        se a coleta falhou ou não terminou em `timeout` segundos.
+        """
+        limite = time.monotonic() + timeout
+        for kw, coleta in reserva.aguardar.items():
+            coleta.pronta.wait(max(0.0, limite - time.monotonic()))
+            yield kw, coleta.links
+
+    def estatisticas(self):
+        with self._lock:
+            return {"entradas": len(self._entradas), "em_coleta": len(self._coletas)}
+
+    def fechar(self):
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
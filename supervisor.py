@@ -0,0 +1,427 @@
+# -------------------------------------------------------------------
+# supervisor.py
+# -------------------------------------------------------------------
+# Supervisão dos navegadores em execuções longas: mede o RSS da árvore
+# de processos de cada driver (geckodriver + Firefox + processos de
+# conteúdo) e conta as páginas abertas; acima dos limites o navegador
+# é reciclado entre dois itens de trabalho. Encerrar um navegador
+# sempre mata a árvore inteira, e processos órfãos de execuções que
+# morreram sem driver.quit() (ex.: OOM) são limpos na próxima.
+# -------------------------------------------------------------------
+
+import os
+import time
+import atexit
+import signal
+import logging
+import tempfile
+import threading
+import subprocess
+import metrics
+
+try:
+    import psutil
+except ImportError:  # /proc é suficiente no Linux; no Windows, taskkill/tasklist
+    psutil = None
+
+WINDOWS = os.name == "nt"
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# Configuração (vai buscar em variáveis de ambiente)
+# -------------------------------------------------------------
+# Recicla o navegador quando a árvore passar deste RSS (0 = sem limite)
+RECICLAR_RSS_MB = int(os.environ.get("RECICLAR_RSS_MB", "1200"))
+# ...ou depois deste número de páginas/itens de trabalho (0 = sem limite)
+RECICLAR_PAGINAS = int(os.environ.get("RECICLAR_PAGINAS", "300"))
+# Tempo para driver.quit() antes de matar a árvore de processos
+TIMEOUT_QUIT = float(os.environ.get("SUPERVISOR_TIMEOUT_QUIT", "15"))
+
+# Um arquivo por geckodriver vivo: <pid do geckodriver> contendo o pid do dono
+PASTA_PIDS = os.path.join(tempfile.gettempdir(), "automacao_maps_navegadores")
+
+RSS = "rss"
+PAGINAS = "paginas"
+CAIU = "caiu"
+
+_PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+# -------------------------------------------------------------
+# Árvore de processos (psutil se instalado, senão /proc)
+# -------------------------------------------------------------
+def _pais():
+    """
+    {pid: ppid} de todos os processos, lido de /proc/<pid>/stat.
+    """
+    pais = {}
+    for nome in os.listdir("/proc"):
+        if not nome.isdigit():
+            continue
+        try:
+            with open(f"/proc/{nome}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # O nome do processo vem entre parênteses e pode conter espaços
+        campos = stat[stat.rfind(b")") + 2:].split()
+        pais[int(nome)] = int(campos[1])
+    return pais
+
+
+def arvore(pid):
+    """
+    `pid` e todos os seus descendentes ainda vivos.
+    """
+    if psutil is not None:
+        try:
+            processo = psutil.Process(pid)
+            return [pid] + [p.pid for p in processo.children(recursive=True)]
+        except psutil.Error:
+            return []
+    if not os.path.exists(f"/proc/{pid}"):
+        return []
+    filhos = {}
+    for filho, pai in _pais().items():
+        filhos.setdefault(pai, []).append(filho)
+    resultado, pilha = [], [pid]
+    while pilha:
+        atual = pilha.pop()
+        resultado.append(atual)
+        pilha.extend(filhos.get(atual, ()))
+    return resultado
+
+
+def _rss(pid):
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return 0
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGINA
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def rss_arvore(pid):
+    """
+    RSS somado (bytes) de `pid` e descendentes. Páginas compartilhadas
+    entre os processos do Firefox contam mais de uma vez: é um teto.
+    """
+    return sum(_rss(p) for p in arvore(pid))
+
+
+def _vivo_windows(pid):
+    # os.kill(pid, 0) no Windows chama TerminateProcess: consulta o
+    # código de saída pela API em vez de sinalizar
+    import ctypes
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+    if not handle:
+        return False
+    try:
+        codigo = ctypes.c_ulong()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(codigo)):
+            return False
+        return codigo.value == 259  # STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _vivo(pid):
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+        except psutil.Error:
+            return False
+    if WINDOWS:
+        return _vivo_windows(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return True
+    if stat[stat.rfind(b")") + 2:][:1] != b"Z":
+        return True
+    # Zumbi: já morreu; se for filho nosso (geckodriver), recolhe
+    try:
+        os.waitpid(pid, os.WNOHANG)
+    except ChildProcessError:
+        pass
+    return False
+
+
+def matar_arvore(pid, espera=3.0):
+    """
+    Encerra `pid` e descendentes; quem sobrar após `espera` é morto à força
+    (SIGTERM/SIGKILL no POSIX, terminate/kill com psutil, taskkill /T no
+    Windows sem psutil).
+    """
+    if psutil is not None:
+        try:
+            raiz = psutil.Process(pid)
+            processos = [raiz] + raiz.children(recursive=True)
+        except psutil.Error:
+            return
+        for metodo in ("terminate", "kill"):
+            for p in processos:
+                try:
+                    getattr(p, metodo)()
+                except psutil.Error:
+                    pass
+            _, processos = psutil.wait_procs(processos, timeout=espera)
+            if not processos:
+                return
+        return
+    if WINDOWS:
+        subprocess.run(["taskkill", "/PID", str(pid), "/T", "/F"],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return
+    pids = arvore(pid)
+    for sinal in (signal.SIGTERM, signal.SIGKILL):
+        for p in pids:
+            try:
+                os.kill(p, sinal)
+            except (ProcessLookupError, PermissionError):
+                pass
+        limite = time.monotonic() + espera
+        while time.monotonic() < limite and any(_vivo(p) for p in pids):
+            time.sleep(0.1)
+        pids = [p for p in pids if _vivo(p)]
+        if not pids:
+            return
+
+
+def eh_geckodriver(pid):
+    """
+    True se `pid` ainda é um geckodriver: o pid de um navegador que já
+    morreu pode ter sido reaproveitado por outro processo.
+    """
+    if psutil is not None:
+        try:
+            processo = psutil.Process(pid)
+            return "geckodriver" in " ".join(processo.cmdline() or [processo.name()])
+        except psutil.Error:
+            return False
+    if WINDOWS:
+        try:
+            saida = subprocess.run(
+                ["tasklist", "/FI", f"PID eq {pid}", "/FO", "CSV", "/NH"],
+                capture_output=True, text=True, errors="ignore"
+            ).stdout
+        except OSError:
+            return False
+        return "geckodriver" in saida.lower()
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return b"geckodriver" in f.read()
+    except OSError:
+        return False
+
+
+def pid_do_driver(driver):
+    """
+    Pid do geckodriver (raiz da árvore do navegador) ou None.
+    """
+    processo = getattr(getattr(driver, "service", None), "process", None)
+    return getattr(processo, "pid", None)
+
+
+def _arquivo_pid(pid):
+    return os.path.join(PASTA_PIDS, str(pid))
+
+
+def limpar_orfaos():
+    """
+    Mata as árvores de geckodrivers registrados por processos que já
+    morreram (execuções derrubadas antes do driver.quit()).
+    """
+    if not os.path.isdir(PASTA_PIDS):
+        return 0
+    mortos = 0
+    for nome in os.listdir(PASTA_PIDS):
+        caminho = os.path.join(PASTA_PIDS, nome)
+        try:
+            with open(caminho, "r") as f:
+                dono = int(f.read().strip() or 0)
+            pid = int(nome)
+        except (OSError, ValueError):
+            continue
+        if _vivo(dono):
+            continue
+        if eh_geckodriver(pid):
+            matar_arvore(pid)
+            mortos += 1
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+    if mortos:
+        logger.warning(f"🧹 {mortos} navegadores órfãos de execuções anteriores encerrados.")
+    return mortos
+
+
+_orfaos_limpos = False
+_vivos = set()
+_vivos_lock = threading.Lock()
+
+
+def _encerrar_restantes():
+    with _vivos_lock:
+        pids = list(_vivos)
+    for pid in pids:
+        if eh_geckodriver(pid):
+            matar_arvore(pid, espera=1.0)
+        try:
+            os.remove(_arquivo_pid(pid))
+        except OSError:
+            pass
+
+
+atexit.register(_encerrar_restantes)
+
+
+class _Estado:
+    __slots__ = ("pid", "paginas", "criado_em")
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.paginas = 0
+        self.criado_em = time.monotonic()
+
+
+class Supervisor:
+    """
+    Acompanha os navegadores de um pool ou loop:
+      - `anotar(driver)` ao criar
+      - `verificar(driver)` entre itens de trabalho: conta a página, mede o
+        RSS e retorna o motivo para reciclar (RSS, PAGINAS) ou None
+      - `encerrar(driver, motivo)` fecha e mata a árvore de processos
+      - `reciclar(driver, fabrica, motivo)` troca por um navegador novo
+    """
+
+    def __init__(self, nome="navegadores", rss_max_mb=RECICLAR_RSS_MB, paginas_max=RECICLAR_PAGINAS):
+        global _orfaos_limpos
+        self.nome = nome
+        self.rss_max = rss_max_mb * 1024 * 1024
+        self.paginas_max = paginas_max
+        self._estados = {}
+        self._lock = threading.Lock()
+        self.pico_rss = 0
+        self.paginas = 0
+        self.navegadores = 0
+        self.reciclagens = {}
+        if not _orfaos_limpos:
+            _orfaos_limpos = True
+            limpar_orfaos()
+
+    def anotar(self, driver):
+        pid = pid_do_driver(driver)
+        with self._lock:
+            self._estados[id(driver)] = _Estado(pid)
+            self.navegadores += 1
+        if pid is None:
+            return
+        with _vivos_lock:
+            _vivos.add(pid)
+        try:
+            os.makedirs(PASTA_PIDS, exist_ok=True)
+            with open(_arquivo_pid(pid), "w") as f:
+                f.write(str(os.getpid()))
+        except OSError as e:
+            logger.debug(f"Não foi possível registrar o pid {pid}: {e}")
+
+    def verificar(self, driver):
+        """
+        Conta uma página/item para `driver` e diz se ele deve ser reciclado.
+        """
+        with self._lock:
+            estado = self._estados.get(id(driver))
+            if estado is None:
+                return None
+            estado.paginas += 1
+            self.paginas += 1
+        rss = rss_arvore(estado.pid) if estado.pid else 0
+        with self._lock:
+            self.pico_rss = max(self.pico_rss, rss)
+        metrics.RSS_NAVEGADOR.observar(rss)
+        metrics.PICO_RSS_NAVEGADOR.definir(self.pico_rss, supervisor=self.nome)
+        if self.rss_max and rss >= self.rss_max:
+            return RSS
+        if self.paginas_max and estado.paginas >= self.paginas_max:
+            return PAGINAS
+        return None
+
+    def encerrar(self, driver, motivo=None):
+        """
+        driver.quit() com prazo e, em seguida, mata o que sobrou da árvore.
+        Com `motivo`, conta como reciclagem.
+        """
+        with self._lock:
+            estado = self._estados.pop(id(driver), None)
+            if motivo:
+                self.reciclagens[motivo] = self.reciclagens.get(motivo, 0) + 1
+        if motivo:
+            metrics.RECICLAGENS.inc(motivo=motivo)
+            paginas = estado.paginas if estado else 0
+            logger.info(f"♻️ Reciclando navegador ({motivo}) após {paginas} páginas.")
+        encerrador = threading.Thread(target=self._quit, args=(driver,), daemon=True)
+        encerrador.start()
+        encerrador.join(TIMEOUT_QUIT)
+        if encerrador.is_alive():
+            logger.warning("⚠️ driver.quit() não respondeu. Matando a árvore de processos.")
+        pid = estado.pid if estado else pid_do_driver(driver)
+        if pid:
+            # Depois do quit() o pid pode já ser de outro processo
+            if eh_geckodriver(pid):
+                matar_arvore(pid)
+            with _vivos_lock:
+                _vivos.discard(pid)
+            try:
+                os.remove(_arquivo_pid(pid))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.debug(f"Erro no driver.quit(): {e}")
+
+    def reciclar(self, driver, fabrica, motivo):
+        """
+        Encerra `driver` e devolve um novo criado por `fabrica()`.
+        """
+        self.encerrar(driver, motivo)
+        novo = fabrica()
+        self.anotar(novo)
+        return novo
+
+    def relatorio(self):
+        with self._lock:
+            return {
+                "pico_rss_mb": round(self.pico_rss / 1024 / 1024, 1),
+                "paginas": self.paginas,
+                "navegadores": self.navegadores,
+                "reciclagens": dict(self.reciclagens),
+            }
+
+    def logar_relatorio(self):
+        r = self.relatorio()
+        if not r["navegadores"]:
+            return
+        reciclagens = ", ".join(f"{m}: {n}" for m, n in r["reciclagens"].items()) or "nenhuma"
+        logger.info(
+            f"🩺 {self.nome}: pico de RSS {r['pico_rss_mb']:.0f} MB, {r['paginas']} páginas, "
+            f"{r['navegadores']} navegadores, reciclagens ({reciclagens})."
+        )
@@ -0,0 +1,14 @@
+import os
+import sys
+
+# Os módulos do projeto ficam na raiz do repositório
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def ler_fixture(nome):
+    with open(os.path.join(FIXTURES, nome), "r", encoding="utf-8") as f:
+        return f.read()
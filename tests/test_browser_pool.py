@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip("selenium")
+
+import browser_pool  # noqa: E402
+
+
+class _Driver:
+    def __init__(self, falhar_get=False):
+        self.falhar_get = falhar_get
+        self.encerrado = False
+
+    def get(self, url):
+        if self.falhar_get:
+            raise TimeoutError("carregamento")
+
+    def execute_script(self, script, *args):
+        return 1
+
+    def quit(self):
+        self.encerrado = True
+
+
+def test_falha_na_pagina_inicial_encerra_o_navegador():
+    criados = []
+
+    def fabrica():
+        criados.append(_Driver(falhar_get=True))
+        return criados[-1]
+
+    pool = browser_pool.BrowserPool(tamanho=1, url_inicial="http://x", fabrica=fabrica)
+    with pytest.raises(TimeoutError):
+        pool.lease()
+    assert criados[0].encerrado
+    assert pool._criados == 0
+    assert not pool._todos
+
+
+def test_pool_fechado_durante_a_criacao():
+    pool = browser_pool.BrowserPool(tamanho=1)
+    driver = _Driver()
+
+    def fabrica():
+        pool._fechado = True
+        return driver
+
+    pool.fabrica = fabrica
+    pool._fechado = False
+    with pytest.raises(RuntimeError):
+        pool.lease()
+    assert driver.encerrado
+    assert pool._criados == 0
+
+
+def test_navegador_reciclado_fora_do_pool_volta_no_lugar_do_antigo():
+    pool = browser_pool.BrowserPool(tamanho=1, fabrica=_Driver)
+    antigo = pool.lease()
+    novo = pool.supervisor.reciclar(antigo, _Driver, "paginas")
+    pool.adotar(antigo, novo)
+    pool.devolver(antigo)
+    assert antigo.encerrado
+    assert pool._todos == {novo}
+    assert pool._criados == 1
+    assert pool.lease() is novo
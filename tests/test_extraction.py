@@ -0,0 +1,73 @@
+import pytest
+from conftest import ler_fixture
+from extraction import (
+    extrair_campos, montar_registro, parse_html, painel_do_lugar, selecionar
+)
+
+LINK = "https://www.google.com/maps/place/Padaria+Estrela/data=!4m2!3m1!1s0x1:0x3"
+
+
+@pytest.fixture(scope="module")
+def campos():
+    return extrair_campos(ler_fixture("painel_lugar.html"))
+
+
+@pytest.mark.parametrize("campo, esperado", [
+    ("titulo", "Padaria Estrela – Padaria"),
+    ("telefone", "(11) 3333-4444"),
+    ("estrelas", "4,6"),
+    ("avaliacoes", "1.234 avaliações"),
+    ("nicho", "Padaria, Confeitaria"),
+    ("endereco", "R. das Flores, 100 - Centro, São Paulo - SP"),
+    ("data_atualizacao", "Atualizado pelo proprietário - mar de 2023"),
+])
+def test_campos_do_painel(campos, campo, esperado):
+    assert campos[campo] == esperado
+
+
+def test_registro_do_painel(campos):
+    registro = montar_registro(campos, LINK)
+    assert registro["nome"] == "Padaria Estrela"
+    assert registro["telefone"] == "(11) 3333-4444"
+    assert registro["link"] == LINK
+
+
+def test_registro_sem_telefone():
+    campos = extrair_campos(ler_fixture("painel_lugar.html").replace("Telefone:", "Site:"))
+    assert campos["telefone"] is None
+    with pytest.raises(ValueError, match="telefone"):
+        montar_registro(campos, LINK)
+
+
+def test_campo_ausente_vira_none():
+    campos = extrair_campos("<div role='main'><h1>Só o título</h1></div>")
+    assert campos["titulo"] == "Só o título"
+    assert campos["estrelas"] is None
+    assert campos["nicho"] is None
+
+
+def test_painel_ignora_lista_de_resultados():
+    campos = extrair_campos(ler_fixture("pagina_lista_e_painel.html"))
+    assert campos["titulo"] == "Padaria Estrela"
+    assert campos["estrelas"] == "4,6"
+    assert campos["avaliacoes"] == "1.234 avaliações"
+    assert campos["nicho"] == "Padaria"
+    assert campos["endereco"] == "R. das Flores, 100"
+    # A data é de um item da lista; o painel só tem Street View
+    assert campos["data_atualizacao"] is None
+
+
+def test_painel_do_lugar_sem_role_main():
+    raiz = parse_html("<div><h1>Sem painel</h1></div>")
+    assert painel_do_lugar(raiz) is raiz
+
+
+@pytest.mark.parametrize("seletor, textos", [
+    ("button.DkEaL", ["Padaria", "Confeitaria"]),
+    ("button[aria-label^='Endereço'] .Io6YTe", ["R. das Flores, 100 - Centro, São Paulo - SP"]),
+    ("button[data-item-id='address'] div.Io6YTe", ["R. das Flores, 100 - Centro, São Paulo - SP"]),
+    ("span:contains('avaliações'), h1", ["Padaria Estrela – Padaria", "1.234 avaliações"]),
+])
+def test_seletores(seletor, textos):
+    raiz = parse_html(ler_fixture("painel_lugar.html"))
+    assert [no.texto() for no in selecionar(raiz, seletor)] == textos
@@ -0,0 +1,178 @@
+import json
+import pytest
+import fake_maps
+import http_backend
+import rate_control
+from conftest import ler_fixture
+from http_backend import (
+    FalhaParser, Bloqueio, ResultadosTruncados, campos_do_lugar, link_do_lugar,
+    parse_busca, parse_lugar, parse_pagina_busca
+)
+
+
+@pytest.fixture(scope="module")
+def busca():
+    return parse_busca(ler_fixture("http_busca.html"))
+
+
+def test_busca_embutida(busca):
+    assert len(busca) == http_backend.HTTP_RESULTADOS_POR_PAGINA
+    campos = campos_do_lugar(busca[0])
+    assert campos["titulo"] == "dentista@-14.7900000,-39.0400000,14z 0"
+    assert campos["telefone"] == "(73) 927326669"
+
+
+def test_links_da_busca(busca):
+    links = {link_do_lugar(l) for l in busca}
+    assert len(links) == len(busca)
+    assert all(
+        l.startswith(http_backend.MAPS_BASE_URL + "/place/") and "/data=!4m2!3m1!1s0x" in l
+        for l in links
+    )
+
+
+@pytest.mark.parametrize("campo, esperado", [
+    ("titulo", "Clinica Sorriso 0"),
+    ("telefone", "(73) 946094304"),
+    ("estrelas", "3,6"),
+    ("avaliacoes", "219 avaliações"),
+    ("endereco", "Rua 81, Centro"),
+    ("nicho", "Clínica"),
+    ("data_atualizacao", "Atualizado pelo proprietário - ago. de 2026"),
+])
+def test_campos_do_lugar(campo, esperado):
+    assert campos_do_lugar(parse_lugar(ler_fixture("http_lugar.html")))[campo] == esperado
+
+
+def test_lugar_sem_data_nem_avaliacoes():
+    lugar = parse_lugar(ler_fixture("http_lugar.html"))
+    lugar[4] = None
+    del lugar[180:]
+    campos = campos_do_lugar(lugar)
+    assert campos["data_atualizacao"] is None
+    assert campos["estrelas"] is None
+    assert campos["avaliacoes"] is None
+
+
+def test_pagina_seguinte_da_busca():
+    lugares = parse_pagina_busca(ler_fixture("http_pagina_busca.txt"))
+    assert [campos_do_lugar(l)["titulo"] for l in lugares] == [
+        "Odonto Sorriso Itabuna", "Clínica Dr. João Mendes", "Espaço Oral Care",
+    ]
+    assert link_do_lugar(lugares[1]) == (
+        http_backend.MAPS_BASE_URL + "/place/Cl%C3%ADnica%20Dr.%20Jo%C3%A3o%20Mendes"
+        "/data=!4m2!3m1!1s0x739a8a43e1c5d7a1:0x9f0e3b2c1d4a5e6f?hl=pt-BR"
+    )
+
+
+def test_pagina_seguinte_depois_do_fim():
+    d = ")]}'\n" + json.dumps([["dentista", None]])
+    assert parse_pagina_busca(json.dumps({"c": 0, "d": d}) + '/*""*/') == []
+
+
+def test_pagina_do_lugar_no_formato_do_maps():
+    campos = campos_do_lugar(parse_lugar(ler_fixture("http_lugar_maps.html")))
+    assert campos == {
+        "titulo": "Odonto Sorriso Itabuna",
+        "telefone": "(73) 3211-4567",
+        "estrelas": "4,8",
+        "avaliacoes": "312 avaliações",
+        "endereco": "Av. Cinquentenário, 1024",
+        "nicho": "Dentista, Clínica odontológica",
+        "data_atualizacao": "Atualizado pelo proprietário - set. de 2026",
+    }
+
+
+def _pagina(estado):
+    return (f"<script>window.APP_INITIALIZATION_STATE={json.dumps(estado)};"
+            f"window.APP_FLAGS=[];</script>")
+
+
+def test_busca_com_resultado_unico_abre_o_lugar():
+    lugar = parse_lugar(ler_fixture("http_lugar.html"))
+    html = _pagina([None, None, None, [None, None, ")]}'\n" + json.dumps([None] * 6 + [lugar])]])
+    assert parse_busca(html) == [lugar]
+
+
+@pytest.mark.parametrize("html", [
+    "<html><body>sem estado</body></html>",
+    "<script>window.APP_INITIALIZATION_STATE=[1,;window.APP_FLAGS=[];</script>",
+    _pagina([None, None, None, [None, None, None]]),
+    _pagina([None, None, None, [None, None, ")]}'\n{invalido"]]),
+    _pagina([None, None, None, [None, None, ")]}'\n" + json.dumps([[None, None]])]]),
+])
+def test_formato_inesperado(html):
+    with pytest.raises(FalhaParser):
+        parse_busca(html)
+
+
+# -------------------------------------------------------------
+# Requisições contra o Maps falso
+# -------------------------------------------------------------
+@pytest.fixture
+def maps(monkeypatch):
+    monkeypatch.setitem(fake_maps.CONFIG, "latencia_ms", 0)
+    monkeypatch.setattr(rate_control, "QUARENTENA", 0)
+    with fake_maps.ServidorFake() as servidor:
+        monkeypatch.setattr(http_backend, "MAPS_BASE_URL", servidor.url + "/maps")
+        yield servidor
+
+
+def test_busca_paginada(maps):
+    links = http_backend.buscar_links("dentista", "@-14.79,-39.04,14z")
+    assert len(links) == 60
+
+
+def test_paginacao_para_no_limite_do_maps(maps):
+    links = http_backend.buscar_links("dentista", "@-14.79,-39.04,12z")
+    assert len(links) == http_backend.LIMITE_RESULTADOS
+
+
+def test_falha_na_paginacao_e_truncada(maps, monkeypatch):
+    monkeypatch.setitem(fake_maps.CONFIG, "paginacao", False)
+    with pytest.raises(ResultadosTruncados) as erro:
+        http_backend.buscar_links("dentista", "@-14.79,-39.04,14z")
+    assert len(erro.value.links) == http_backend.HTTP_RESULTADOS_POR_PAGINA
+
+
+def test_busca_completa_na_primeira_pagina(maps):
+    # 60 resultados no zoom 14 viram 3 no zoom 16
+    links = http_backend.buscar_links("dentista", "@-14.79,-39.04,16z")
+    assert len(links) == 3
+
+
+def test_pagina_de_bloqueio(maps, monkeypatch):
+    monkeypatch.setitem(fake_maps.CONFIG, "bloqueio_a_cada", 1)
+    with pytest.raises(Bloqueio) as erro:
+        http_backend.buscar_links("dentista", "@-14.79,-39.04,16z")
+    assert erro.value.motivo == rate_control.HTTP_429
+
+
+@pytest.mark.parametrize("aceitar", [True, False])
+def test_executar_http_truncados(maps, monkeypatch, aceitar):
+    monkeypatch.setitem(fake_maps.CONFIG, "paginacao", False)
+    falhas = []
+    resultados = dict(http_backend.executar_http(
+        ["dentista"], lambda kw: http_backend.buscar_links(kw, "@-14.79,-39.04,14z"), falhas,
+        aceitar_truncados=aceitar
+    ))
+    if aceitar:
+        assert len(resultados["dentista"]) == http_backend.HTTP_RESULTADOS_POR_PAGINA
+        assert falhas == []
+    else:
+        assert resultados == {}
+        assert falhas == ["dentista"]
+
+
+def test_executar_http_passa_pelo_controle_de_ritmo(maps, monkeypatch):
+    monkeypatch.setitem(fake_maps.CONFIG, "bloqueio_a_cada", 1)
+    controlador = rate_control.ControladorTaxa(4)
+    falhas = []
+    resultados = list(http_backend.executar_http(
+        ["a", "b"], lambda kw: http_backend.buscar_links(kw, "@-14.79,-39.04,16z"), falhas,
+        conexoes=4, controlador=controlador
+    ))
+    assert resultados == []
+    assert sorted(falhas) == ["a", "b"]
+    assert controlador.limite < 4
+    assert controlador.intervalo > 0
@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+import pytest
+from instrumented_driver import (
+    CHAVE_ELEMENTO, TAMANHO_ATOMO, ExecutorInstrumentado, ExecutorReplay, Gravador,
+    ler_trace, registrar_snapshot, resumir
+)
+
+CONTEXTO = ["keyword", "dentista"]
+# Átomo do get_attribute do Selenium: só o tamanho importa para o descritor
+ATOMO = "/* getAttribute */" + " " * TAMANHO_ATOMO
+
+
+def _comando(seq, comando, chamada, seletor, params, resposta, ms=10.0):
+    return {
+        "sessao": "s1", "seq": seq, "contexto": CONTEXTO, "comando": comando,
+        "chamada": chamada, "seletor": seletor, "ms": ms,
+        "bytes_envio": 10, "bytes_resposta": 20, "erro": None,
+        "params": dict(params, sessionId="s1"), "resposta": resposta,
+    }
+
+
+def _elemento(elemento_id):
+    return {CHAVE_ELEMENTO: elemento_id}
+
+
+@pytest.fixture
+def trace(tmp_path):
+    (tmp_path / "snapshots").mkdir()
+    (tmp_path / "snapshots" / "abc.html").write_text(
+        '<div id="feed"><a class="hfpxzc" href="/p/1">Um</a>'
+        '<a class="hfpxzc" href="/p/2">Dois</a></div>', encoding="utf-8"
+    )
+    busca = {"using": "css selector", "value": "h1"}
+    return [
+        _comando(1, "get", "get", "http://maps/busca", {"url": "http://maps/busca"},
+                 {"value": None}, ms=300.0),
+        {"sessao": "s1", "seq": 1, "snapshot": "abc", "_pasta": str(tmp_path)},
+        _comando(2, "findElement", "findElement", "css selector=h1", busca,
+                 {"value": _elemento("e1")}),
+        _comando(3, "getElementText", "getElementText", "css selector=h1", {"id": "e1"},
+                 {"value": "Dentistas"}),
+    ]
+
+
+def _reproduzir(executor, extra_atributo=False):
+    executor.execute("get", {"url": "http://maps/busca", "sessionId": "r"})
+    h1 = executor.execute("findElement", {"using": "css selector", "value": "h1", "sessionId": "r"})
+    elemento_id = h1["value"][CHAVE_ELEMENTO]
+    texto = executor.execute("getElementText", {"id": elemento_id, "sessionId": "r"})
+    if extra_atributo:
+        executor.execute("executeScript", {
+            "script": ATOMO, "args": [_elemento(elemento_id), "href"], "sessionId": "r"
+        })
+    return texto["value"]
+
+
+def test_replay_igual_a_gravacao(trace):
+    executor = ExecutorReplay(trace)
+    assert _reproduzir(executor) == "Dentistas"
+    assert executor.comparar() == []
+
+
+def test_comparar_aponta_get_attribute_novo(trace):
+    executor = ExecutorReplay(trace)
+    _reproduzir(executor, extra_atributo=True)
+    assert executor.comparar() == [{
+        "chamada": "getAttribute", "seletor": "css selector=h1 @href",
+        "gravados": 0, "reproduzidos": 1,
+    }]
+
+
+def test_busca_extra_respondida_pelo_snapshot(trace):
+    executor = ExecutorReplay(trace)
+    _reproduzir(executor)
+    links = executor.execute(
+        "findElements", {"using": "css selector", "value": "a.hfpxzc", "sessionId": "r"}
+    )["value"]
+    textos = [executor.execute("getElementText", {"id": l[CHAVE_ELEMENTO]})["value"] for l in links]
+    assert textos == ["Um", "Dois"]
+    assert executor.extras[("findElements", "css selector=a.hfpxzc")] == 1
+
+
+def test_trace_sem_respostas_nao_reproduz(trace):
+    for e in trace:
+        e.pop("resposta", None)
+    with pytest.raises(ValueError):
+        ExecutorReplay(trace)
+
+
+def test_resumir(trace):
+    resumo = resumir(trace, top=1)
+    ctx = resumo["por_contexto"]["keyword:dentista"]
+    assert ctx["comandos"] == 3
+    assert ctx["ms"] == 320.0
+    assert ctx["chamadas"]["getElementText"] == 1
+    assert resumo["mais_lentas"] == [{
+        "chamada": "get", "seletor": "http://maps/busca", "n": 1,
+        "ms_total": 300.0, "ms_medio": 300.0, "bytes_resposta": 20,
+    }]
+
+
+class _ExecutorFalso:
+    def execute(self, comando, params):
+        if comando == "executeScript" and "outerHTML" in params["script"]:
+            return {"value": "<html><body>aba</body></html>"}
+        return {"value": True}
+
+
+def test_snapshot_depois_de_navegacao_por_js(tmp_path):
+    gravador = Gravador(str(tmp_path))
+    executor = ExecutorInstrumentado(_ExecutorFalso(), gravador, "s1")
+    driver = SimpleNamespace(command_executor=executor)
+    executor.execute("executeScript", {"script": "return document.readyState;", "args": []})
+    registrar_snapshot(driver)
+    gravador.fechar()
+    entradas = list(ler_trace([str(tmp_path)]))
+    assert [e.get("chamada") for e in entradas] == ["executeScript", None]
+    assert entradas[1]["seq"] == entradas[0]["seq"]
+    assert (tmp_path / "snapshots" / f"{entradas[1]['snapshot']}.html").exists()
@@ -0,0 +1,106 @@
+import time
+import pytest
+import requests
+import fake_maps
+import licenca
+
+MAC = "aa:bb:cc:dd:ee:ff"
+
+
+@pytest.fixture(scope="module")
+def painel():
+    with fake_maps.ServidorFake() as servidor:
+        yield servidor
+
+
+@pytest.fixture
+def chamadas(painel, tmp_path, monkeypatch):
+    """
+    Licença apontando para o painel falso, com cache zerado; retorna a
+    lista de URLs consultadas.
+    """
+    monkeypatch.setattr(licenca, "PAINEL_URL", painel.url + "/command")
+    monkeypatch.setattr(licenca, "IP_URL", painel.url + "/ip")
+    monkeypatch.setattr(licenca, "LICENCA_CACHE", str(tmp_path / "licenca.json"))
+    monkeypatch.setattr(licenca, "_memoria", {"mac": MAC, "mac_em": time.time()})
+    monkeypatch.setitem(fake_maps.CONFIG, "ativo", True)
+    urls = []
+    get = requests.get
+
+    def _get(url, **kwargs):
+        urls.append(url)
+        return get(url, **kwargs)
+
+    monkeypatch.setattr(licenca.requests, "get", _get)
+    return urls
+
+
+def _consultas_ao_painel(urls):
+    return sum(1 for url in urls if url.endswith("/command"))
+
+
+def test_cache_dentro_do_ttl(chamadas):
+    assert licenca.verificar_liberacao(MAC) is True
+    assert licenca.verificar_liberacao(MAC) is True
+    assert _consultas_ao_painel(chamadas) == 1
+
+
+def test_cache_sobrevive_ao_processo(chamadas):
+    assert licenca.verificar_liberacao(MAC) is True
+    licenca._memoria.clear()
+    # Relido do arquivo, sem consultar o painel de novo
+    assert licenca.verificar_liberacao(MAC) is True
+    assert _consultas_ao_painel(chamadas) == 1
+
+
+def test_cache_expirado_consulta_de_novo(chamadas, monkeypatch):
+    assert licenca.verificar_liberacao(MAC) is True
+    licenca._memoria["veredito_em"] -= licenca.LICENCA_TTL + 1
+    monkeypatch.setitem(fake_maps.CONFIG, "ativo", False)
+    assert licenca.verificar_liberacao(MAC) is False
+    assert _consultas_ao_painel(chamadas) == 2
+
+
+def test_bloqueio_usa_ttl_negativo(chamadas, monkeypatch):
+    monkeypatch.setitem(fake_maps.CONFIG, "ativo", False)
+    assert licenca.verificar_liberacao(MAC) is False
+    monkeypatch.setitem(fake_maps.CONFIG, "ativo", True)
+    assert licenca.verificar_liberacao(MAC) is False
+    licenca._memoria["veredito_em"] -= licenca.LICENCA_TTL_NEGATIVO + 1
+    assert licenca.verificar_liberacao(MAC) is True
+    assert _consultas_ao_painel(chamadas) == 2
+
+
+def test_cache_de_outro_mac_nao_vale(chamadas):
+    assert licenca.verificar_liberacao(MAC) is True
+    assert licenca.verificar_liberacao("11:22:33:44:55:66") is True
+    assert _consultas_ao_painel(chamadas) == 2
+
+
+@pytest.mark.parametrize("ativo", [True, False])
+def test_verificacao_em_segundo_plano(chamadas, monkeypatch, ativo):
+    monkeypatch.setitem(fake_maps.CONFIG, "ativo", ativo)
+    futuro = licenca.verificar_em_segundo_plano()
+    assert licenca.liberado(futuro) is ativo
+    assert _consultas_ao_painel(chamadas) == 1
+
+
+def test_segundo_plano_sem_mac(chamadas, monkeypatch):
+    monkeypatch.setattr(licenca, "get_mac", lambda: None)
+    assert licenca.liberado(licenca.verificar_em_segundo_plano()) is False
+    assert chamadas == []
+
+
+def test_painel_fora_do_ar(chamadas, monkeypatch):
+    monkeypatch.setattr(licenca, "PAINEL_URL", "http://127.0.0.1:9/command")
+    assert licenca.verificar_liberacao(MAC, tentativas=2, intervalo=0) is False
+    assert _consultas_ao_painel(chamadas) == 2
+    # Falha de rede não vira veredito em cache
+    assert "ativo" not in licenca._memoria
+
+
+def test_painel_fora_do_ar_com_cache_valido(chamadas, monkeypatch):
+    assert licenca.verificar_liberacao(MAC) is True
+    monkeypatch.setattr(licenca, "PAINEL_URL", "http://127.0.0.1:9/command")
+    assert licenca.verificar_liberacao(MAC, tentativas=1, intervalo=0) is True
+    assert _consultas_ao_painel(chamadas) == 1
@@ -0,0 +1,68 @@
+import gc
+import pytest
+import rate_control
+from rate_control import (
+    ControladorTaxa, detectar_bloqueio, CAPTCHA, CONSENTIMENTO, HTTP_429, TRAFEGO_INCOMUM
+)
+
+
+class Pagina:
+    """
+    Driver mínimo: responde ao _JS_PAGINA com a página descrita.
+    """
+
+    def __init__(self, url="https://www.google.com/maps/search/x", corpo="", recaptcha=False,
+                 consentimento=False, status=200):
+        self.resposta = [url, corpo, recaptcha, consentimento, status]
+
+    def execute_script(self, script, *args):
+        return self.resposta
+
+
+@pytest.mark.parametrize("pagina, motivo", [
+    (Pagina(), None),
+    (Pagina(status=429), HTTP_429),
+    (Pagina(url="https://www.google.com/sorry/index"), TRAFEGO_INCOMUM),
+    (Pagina(corpo="nossos sistemas detectaram tráfego incomum"), TRAFEGO_INCOMUM),
+    (Pagina(recaptcha=True), CAPTCHA),
+    (Pagina(url="https://consent.google.com/ml?continue=x"), CONSENTIMENTO),
+])
+def test_detectar_bloqueio(pagina, motivo):
+    assert detectar_bloqueio(pagina) == motivo
+
+
+def test_listas_vazias_nao_sao_bloqueio():
+    controlador = ControladorTaxa(4)
+    pagina = Pagina()
+    for _ in range(10):
+        assert controlador.avaliar(pagina, vazio=True) is None
+    assert controlador.limite == 4
+    assert controlador.intervalo == rate_control.INTERVALO_MIN
+
+
+def test_vazio_com_indicador_positivo_e_bloqueio():
+    controlador = ControladorTaxa(4)
+    assert controlador.avaliar(Pagina(status=429), vazio=True) == HTTP_429
+    assert controlador.limite == 2
+
+
+def test_quarentena_por_sessao(monkeypatch):
+    dormiu = []
+    monkeypatch.setattr(rate_control.time, "sleep", dormiu.append)
+    controlador = ControladorTaxa(2)
+    culpada, outra = Pagina(), Pagina()
+    controlador.bloqueio(TRAFEGO_INCOMUM, culpada)
+    controlador.aguardar_sessao(outra)
+    assert dormiu == []
+    controlador.aguardar_sessao(culpada)
+    assert len(dormiu) == 1 and dormiu[0] > 0
+
+
+def test_quarentena_some_com_a_sessao():
+    controlador = ControladorTaxa(2)
+    sessao = Pagina()
+    controlador.bloqueio(TRAFEGO_INCOMUM, sessao)
+    assert len(controlador._quarentena) == 1
+    del sessao
+    gc.collect()
+    assert len(controlador._quarentena) == 0
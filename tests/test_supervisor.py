@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import subprocess
+import pytest
+import supervisor
+
+pytestmark = pytest.mark.skipif(
+    supervisor.psutil is None and not os.path.isdir("/proc"),
+    reason="sem psutil nem /proc para inspecionar processos",
+)
+
+# Um processo "geckodriver" (pelo cmdline) com um filho, como o Firefox
+SCRIPT = (
+    "import subprocess, sys, time;"
+    "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']);"
+    "time.sleep(60)"
+)
+
+
+def _esperar_filho(pid):
+    for _ in range(50):
+        if len(supervisor.arvore(pid)) > 1:
+            return
+        time.sleep(0.1)
+
+
+@pytest.fixture
+def geckodriver():
+    processo = subprocess.Popen([sys.executable, "-c", SCRIPT, "geckodriver"])
+    # Com o filho de pé, o exec do script (e o cmdline) já aconteceu
+    _esperar_filho(processo.pid)
+    try:
+        yield processo
+    finally:
+        processo.kill()
+        processo.wait()
+
+
+class _Driver:
+    def __init__(self, processo):
+        self.service = type("Service", (), {"process": processo})()
+
+    def quit(self):
+        pass
+
+
+def test_eh_geckodriver(geckodriver):
+    assert supervisor.eh_geckodriver(geckodriver.pid)
+    assert not supervisor.eh_geckodriver(os.getpid())
+
+
+def test_matar_arvore(geckodriver):
+    pids = supervisor.arvore(geckodriver.pid)
+    assert len(pids) == 2
+    supervisor.matar_arvore(geckodriver.pid, espera=2.0)
+    geckodriver.wait(timeout=5)
+    assert not any(supervisor._vivo(p) for p in pids)
+
+
+def test_vivo_nao_sinaliza_o_processo():
+    assert supervisor._vivo(os.getpid())
+
+
+def test_encerrar_nao_mata_pid_reaproveitado(tmp_path, monkeypatch):
+    monkeypatch.setattr(supervisor, "PASTA_PIDS", str(tmp_path))
+    outro = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    try:
+        s = supervisor.Supervisor(nome="teste")
+        driver = _Driver(outro)
+        s.anotar(driver)
+        s.encerrar(driver)
+        assert outro.poll() is None
+    finally:
+        outro.kill()
+        outro.wait()
+
+
+def test_encerrar_mata_geckodriver_que_sobrou(geckodriver, tmp_path, monkeypatch):
+    monkeypatch.setattr(supervisor, "PASTA_PIDS", str(tmp_path))
+    s = supervisor.Supervisor(nome="teste")
+    driver = _Driver(geckodriver)
+    s.anotar(driver)
+    s.encerrar(driver)
+    assert geckodriver.wait(timeout=5) is not None
+    assert not os.listdir(tmp_path)
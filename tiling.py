@@ -0,0 +1,269 @@
+# -------------------------------------------------------------------
+# tiling.py
+# -------------------------------------------------------------------
+# Modo "em tiles" do scanner: divide uma área (bounding box ou cidade)
+# em uma grade de viewports do Maps e roda uma busca por palavra-chave
+# e tile, espalhando as buscas pelo BrowserPool. Como cada busca do
+# Maps devolve no máximo ~120 lugares, tiles que batem no limite são
+# subdivididos em 4 e buscados de novo com mais zoom. O backend HTTP
+# pagina a lista até o mesmo teto; se a paginação falhar, com fallback a
+# busca é refeita no Selenium e, sem fallback, conta como saturada. Tiles
+# subdivididos que não trazem nenhum link novo para a sua palavra-chave
+# não são divididos de novo.
+# -------------------------------------------------------------------
+
+import os
+import json
+import math
+import time
+import logging
+import argparse
+from collections import namedtuple, defaultdict
+from urllib.parse import quote_plus
+import requests
+from browser_pool import BrowserPool
+from rate_control import ControladorTaxa, executar_com_ritmo
+import http_backend
+from licenca import verificar_em_segundo_plano, liberado
+from lean_profile import perfil_para, medir_pagina, logar_consumo
+from scanner import MAPS_BASE_URL, TIMEOUT_RESULTADOS, rolar_e_coletar, save_new_links
+from waits import esperar, hrefs_novos, REGISTRO
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# Configuração (vai buscar em variáveis de ambiente)
+# -------------------------------------------------------------
+# Quantos lugares o Maps devolve no máximo por busca
+LIMITE_RESULTADOS = int(os.environ.get("MAPS_LIMITE_RESULTADOS", "120"))
+# Zoom máximo ao subdividir (tiles saturados neste zoom ficam incompletos)
+ZOOM_MAXIMO = int(os.environ.get("TILE_ZOOM_MAXIMO", "18"))
+ZOOM_PADRAO = int(os.environ.get("TILE_ZOOM", "14"))
+# Largura útil do mapa em pixels (define o tamanho de cada tile)
+TILE_PIXELS = int(os.environ.get("TILE_PIXELS", "800"))
+MAX_SCROLLS_TILE = int(os.environ.get("TILE_MAX_SCROLLS", "40"))
+GEOCODER_URL = os.environ.get("GEOCODER_URL", "https://nominatim.openstreetmap.org/search")
+RELATORIO_TILES = "relatorio_tiles.json"
+
+# Área em graus: sul, oeste, norte, leste
+Tile = namedtuple("Tile", "sul oeste norte leste zoom")
+
+
+def centro(tile):
+    return (tile.sul + tile.norte) / 2, (tile.oeste + tile.leste) / 2
+
+
+def dividir_grade(sul, oeste, norte, leste, zoom=ZOOM_PADRAO):
+    """
+    Divide a bounding box em tiles do tamanho de um viewport de
+    TILE_PIXELS no `zoom` informado.
+    """
+    largura = TILE_PIXELS / 256 * 360 / 2 ** zoom
+    altura = largura * math.cos(math.radians((sul + norte) / 2))
+    colunas = max(1, math.ceil((leste - oeste) / largura))
+    linhas = max(1, math.ceil((norte - sul) / altura))
+    passo_lng = (leste - oeste) / colunas
+    passo_lat = (norte - sul) / linhas
+    return [
+        Tile(sul + l * passo_lat, oeste + c * passo_lng,
+             sul + (l + 1) * passo_lat, oeste + (c + 1) * passo_lng, zoom)
+        for l in range(linhas) for c in range(colunas)
+    ]
+
+
+def subdividir(tile):
+    """
+    Quatro quadrantes do tile, um nível de zoom acima.
+    """
+    lat, lng = centro(tile)
+    z = tile.zoom + 1
+    return [
+        Tile(tile.sul, tile.oeste, lat, lng, z),
+        Tile(tile.sul, lng, lat, tile.leste, z),
+        Tile(lat, tile.oeste, tile.norte, lng, z),
+        Tile(lat, lng, tile.norte, tile.leste, z),
+    ]
+
+
+def bbox_da_cidade(cidade):
+    """
+    Bounding box (sul, oeste, norte, leste) da cidade via geocoder
+    (Nominatim por padrão).
+    """
+    r = requests.get(
+        GEOCODER_URL, params={"q": cidade, "format": "json", "limit": 1},
+        headers={"User-Agent": "automacao-maps"}, timeout=10
+    )
+    r.raise_for_status()
+    resultados = r.json()
+    if not resultados:
+        raise ValueError(f"Cidade não encontrada: {cidade}")
+    sul, norte, oeste, leste = (float(v) for v in resultados[0]["boundingbox"])
+    return sul, oeste, norte, leste
+
+
+def viewport(tile):
+    lat, lng = centro(tile)
+    return f"@{lat:.7f},{lng:.7f},{tile.zoom}z"
+
+
+def url_busca(keyword, tile):
+    return f"{MAPS_BASE_URL}/search/{quote_plus(keyword)}/{viewport(tile)}?hl=pt-BR"
+
+
+def coletar_no_tile(driver, tarefa):
+    """
+    Abre a busca de `keyword` já posicionada no tile e coleta os links.
+    Retorna (links, segundos).
+    """
+    keyword, tile = tarefa
+    inicio = time.monotonic()
+    with metrics.CARREGAMENTO_PAGINA.cronometrar(pagina="busca_tile"):
+        driver.get(url_busca(keyword, tile))
+    if esperar(driver, hrefs_novos('a.hfpxzc', set()), TIMEOUT_RESULTADOS, "resultados_tile"):
+        links = rolar_e_coletar(driver, MAX_SCROLLS_TILE)
+    elif "/maps/place/" in driver.current_url:
+        # Resultado único: o Maps abre o lugar direto
+        links = {driver.current_url}
+    else:
+        links = set()
+    medir_pagina(driver, "busca")
+    metrics.LINKS_COLETADOS.inc(len(links))
+    metrics.LINKS_POR_MINUTO.registrar(len(links))
+    return links, time.monotonic() - inicio
+
+
+def coletar_no_tile_http(tarefa):
+    """
+    Versão sem navegador de coletar_no_tile. Retorna (links, segundos,
+    truncado); `truncado` só é True quando a paginação falhou e o
+    executar_http aceita os links lidos até ali (sem fallback).
+    """
+    keyword, tile = tarefa
+    inicio = time.monotonic()
+    try:
+        links = http_backend.buscar_links(keyword, viewport(tile))
+    except http_backend.ResultadosTruncados as e:
+        raise http_backend.ResultadosTruncados(e.links, (e.links, time.monotonic() - inicio, True))
+    return links, time.monotonic() - inicio, False
+
+
+def _buscas_da_rodada(pool, rodada, controlador):
+    """
+    Roda as buscas (keyword, tile) e gera (tarefa, (links, segundos), saturado).
+    Saturado é a busca que bateu no teto real do Maps (LIMITE_RESULTADOS,
+    com a lista rolada ou paginada até o fim) ou, sem fallback, a busca
+    HTTP cuja paginação falhou, já que o resto não é visível.
+    """
+    pendentes = rodada
+    if http_backend.usar_http():
+        falhas = []
+        for tarefa, (links, segundos, truncado) in http_backend.executar_http(
+                rodada, coletar_no_tile_http, falhas):
+            yield tarefa, (links, segundos), truncado or len(links) >= LIMITE_RESULTADOS
+        pendentes = falhas if http_backend.com_fallback() else []
+    if pendentes:
+        for tarefa, (links, segundos) in executar_com_ritmo(pool, pendentes, coletar_no_tile, controlador):
+            yield tarefa, (links, segundos), len(links) >= LIMITE_RESULTADOS
+
+
+def run_scanner_em_tiles(keywords, dados_dir, bbox=None, cidade=None, zoom=None, workers=None):
+    """
+    Ponto de entrada do modo em tiles:
+      - Monta a grade a partir de `bbox` (sul, oeste, norte, leste) ou `cidade`
+      - Roda keyword × tile no BrowserPool (ou via HTTP, conforme
+        MAPS_BACKEND), em rodadas: tiles que batem no limite de resultados
+        viram 4 tiles na rodada seguinte, desde que tenham trazido links
+        novos para a mesma keyword (ou sejam da grade inicial)
+      - Junta e deduplica os links em dados/links.txt
+      - Grava dados/relatorio_tiles.json com, por busca, a fração de links
+        novos da keyword, a cobertura (links / LIMITE_RESULTADOS) e
+        links/hora
+    """
+    licenca = verificar_em_segundo_plano()
+    zoom = zoom or ZOOM_PADRAO
+    if bbox is None:
+        bbox = bbox_da_cidade(cidade)
+    grade = dividir_grade(*bbox, zoom=zoom)
+    logger.info(f"🗺️ Área dividida em {len(grade)} tiles no zoom {zoom} "
+                f"({len(grade) * len(keywords)} buscas iniciais).")
+
+    # Links por keyword: keywords parecidas repetem lugares entre si, e isso
+    # não pode fazer um tile parecer esgotado para a outra keyword
+    coletados = defaultdict(set)
+    relatorio = []
+    perfil = perfil_para("scanner")
+    with BrowserPool(tamanho=workers, perfil=perfil) as pool:
+        # No backend HTTP os navegadores só sobem para as buscas que falharem
+        if not http_backend.usar_http():
+            pool.aquecer()
+        if not liberado(licenca):
+            return
+        controlador = ControladorTaxa(pool.tamanho)
+        rodada = [(kw, tile) for kw in keywords for tile in grade]
+        nivel = 0
+        while rodada:
+            nivel += 1
+            logger.info(f"🧵 Rodada {nivel}: {len(rodada)} buscas em até {pool.tamanho} navegadores.")
+            proxima = []
+            resultados = _buscas_da_rodada(pool, rodada, controlador)
+            for (kw, tile), (links, segundos), saturado in resultados:
+                novos = links - coletados[kw]
+                coletados[kw] |= links
+                # Um filho que só repete links do pai não vale mais 4 buscas
+                rende = bool(novos) or tile.zoom == zoom
+                subdividido = saturado and rende and tile.zoom < ZOOM_MAXIMO
+                if subdividido:
+                    proxima.extend((kw, filho) for filho in subdividir(tile))
+                elif saturado and rende:
+                    logger.warning(f"⚠️ Tile {tuple(round(v, 5) for v in tile[:4])} saturado "
+                                   f"no zoom máximo para '{kw}': cobertura incompleta.")
+                relatorio.append({
+                    "keyword": kw,
+                    "tile": [round(v, 7) for v in tile[:4]],
+                    "zoom": tile.zoom,
+                    "links": len(links),
+                    "novos": len(novos),
+                    "fracao_novos": round(len(novos) / len(links), 3) if links else 0.0,
+                    # Quanto do teto de resultados do Maps a busca usou (1.0 = saturou)
+                    "cobertura": round(min(len(links) / LIMITE_RESULTADOS, 1.0), 3),
+                    "saturado": saturado,
+                    "subdividido": subdividido,
+                    "segundos": round(segundos, 2),
+                    "links_por_hora": round(len(links) * 3600 / segundos, 1) if segundos else 0.0,
+                })
+                logger.info(
+                    f"  🧩 '{kw}' z{tile.zoom} {centro(tile)[0]:.4f},{centro(tile)[1]:.4f}: "
+                    f"{len(links)} links ({len(novos)} novos) em {segundos:.1f}s"
+                    f"{' → subdividindo' if subdividido else ''}"
+                )
+            rodada = proxima
+
+    unicos = set().union(*coletados.values())
+    save_new_links(unicos, os.path.join(dados_dir, "links.txt"))
+    with open(os.path.join(dados_dir, RELATORIO_TILES), "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    REGISTRO.logar_resumo()
+    logar_consumo("busca", perfil)
+    logger.info(f"🏁 Coleta em tiles finalizada: {len(unicos)} links únicos "
+                f"em {len(relatorio)} buscas.")
+    return unicos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scanner do Maps em modo tiles.")
+    parser.add_argument("keywords", help="palavras-chave separadas por vírgula")
+    parser.add_argument("--dados", default="dados")
+    area = parser.add_mutually_exclusive_group(required=True)
+    area.add_argument("--bbox", help="sul,oeste,norte,leste")
+    area.add_argument("--cidade")
+    parser.add_argument("--zoom", type=int)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+    os.makedirs(args.dados, exist_ok=True)
+    run_scanner_em_tiles(
+        [k.strip() for k in args.keywords.split(",") if k.strip()], args.dados,
+        bbox=tuple(float(v) for v in args.bbox.split(",")) if args.bbox else None,
+        cidade=args.cidade, zoom=args.zoom, workers=args.workers
+    )
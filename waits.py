@@ -0,0 +1,155 @@
+# -------------------------------------------------------------------
+# waits.py
+# -------------------------------------------------------------------
+# Esperas orientadas a eventos do DOM, no lugar dos time.sleep fixos.
+# Cada espera retorna assim que a condição é satisfeita, tem timeout
+# próprio por etapa e registra quanto tempo realmente levou.
+# -------------------------------------------------------------------
+
+import time
+import logging
+import threading
+from selenium.common.exceptions import (
+    TimeoutException, NoSuchElementException, StaleElementReferenceException
+)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+import metrics
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_PADRAO = 0.1
+
+
+class RegistroEsperas:
+    """
+    Acumula, por etapa, quantas esperas ocorreram, o tempo total/máximo
+    gasto e quantas estouraram o timeout.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._etapas = {}
+
+    def registrar(self, etapa, duracao, ok):
+        with self._lock:
+            e = self._etapas.setdefault(
+                etapa, {"n": 0, "total": 0.0, "max": 0.0, "timeouts": 0}
+            )
+            e["n"] += 1
+            e["total"] += duracao
+            e["max"] = max(e["max"], duracao)
+            if not ok:
+                e["timeouts"] += 1
+
+    def resumo(self):
+        with self._lock:
+            return {
+                etapa: dict(e, media=e["total"] / e["n"])
+                for etapa, e in self._etapas.items()
+            }
+
+    def logar_resumo(self):
+        for etapa, e in sorted(self.resumo().items()):
+            logger.info(
+                f"⏱️ {etapa}: {e['n']} esperas, média {e['media']:.2f}s, "
+                f"máx {e['max']:.2f}s, {e['timeouts']} timeouts"
+            )
+
+
+REGISTRO = RegistroEsperas()
+
+
+def esperar(driver, condicao, timeout, etapa, intervalo=INTERVALO_PADRAO,
+            obrigatorio=False, registro=REGISTRO):
+    """
+    Espera até `condicao(driver)` retornar um valor verdadeiro, por no máximo
+    `timeout` segundos. Retorna esse valor, ou None se o tempo acabar
+    (com `obrigatorio=True` o TimeoutException é repassado).
+    """
+    inicio = time.monotonic()
+    ok = False
+    try:
+        resultado = WebDriverWait(
+            driver, timeout, poll_frequency=intervalo,
+            ignored_exceptions=(NoSuchElementException, StaleElementReferenceException)
+        ).until(condicao)
+        ok = True
+        return resultado
+    except TimeoutException:
+        if obrigatorio:
+            raise
+        return None
+    finally:
+        duracao = time.monotonic() - inicio
+        registro.registrar(etapa, duracao, ok)
+        metrics.ESPERA.observar(duracao, etapa=etapa)
+        logger.debug(f"⏱️ {etapa}: {duracao:.2f}s ({'ok' if ok else 'timeout'})")
+
+
+# -------------------------------------------------------------
+# Condições
+# -------------------------------------------------------------
+def elemento_presente(by, seletor):
+    return EC.presence_of_element_located((by, seletor))
+
+
+def elemento_clicavel(elemento):
+    return EC.element_to_be_clickable(elemento)
+
+
+def texto_atual(driver, by, seletor):
+    """
+    Texto do primeiro elemento para (by, seletor), ou None se não existir.
+    """
+    elementos = driver.find_elements(by, seletor)
+    try:
+        return elementos[0].text if elementos else None
+    except StaleElementReferenceException:
+        return None
+
+
+def texto_mudou(by, seletor, anterior):
+    """
+    Satisfeita quando o texto do elemento é não-vazio e diferente de
+    `anterior` (ex.: o h1 passou a mostrar o lugar recém-clicado).
+    """
+    def _condicao(driver):
+        texto = texto_atual(driver, by, seletor)
+        return texto if texto and texto.strip() and texto != anterior else False
+    return _condicao
+
+
+def atributo_mudou(seletor_css, atributo, anterior):
+    """
+    Satisfeita quando o primeiro elemento de `seletor_css` existe e o valor
+    de `atributo` é diferente de `anterior`; retorna o novo valor.
+    """
+    def _condicao(driver):
+        elementos = driver.find_elements(By.CSS_SELECTOR, seletor_css)
+        if not elementos:
+            return False
+        valor = elementos[0].get_attribute(atributo)
+        return valor if valor and valor != anterior else False
+    return _condicao
+
+
+_JS_HREFS = """
+var vistos = {}, hrefs = [];
+document.querySelectorAll(arguments[0]).forEach(function (a) {
+  if (a.href && !vistos[a.href]) { vistos[a.href] = 1; hrefs.push(a.href); }
+});
+return hrefs;
+"""
+
+
+def hrefs_novos(seletor_css, conhecidos):
+    """
+    Satisfeita quando algum href de `seletor_css` ainda não está em
+    `conhecidos` (um único execute_script por tentativa); retorna os novos.
+    """
+    def _condicao(driver):
+        novos = set(driver.execute_script(_JS_HREFS, seletor_css) or ()) - conhecidos
+        return novos or False
+    return _condicao